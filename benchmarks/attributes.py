@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Measures how many attributes a second can be read and written on Models
+that are @DEPTH classes below Model, and how long naming the Properties
+of new Model classes takes; 'search' scans class dictionaries for every
+Property like Properties used to, 'bound' is the name ModelType gave the
+Property when its class was created. No Cassandra is needed.
+
+Usage:
+$ python benchmarks/attributes.py [operations]
+"""
+import sys
+import time
+
+sys.path.extend(["./src", "./lib"])
+from homer.core.models import Model, Property
+from homer.core.commons import String
+
+OPERATIONS = 200000 # Number of reads and of writes.
+DEPTH = 5 # Number of classes between Model and the benchmarked Model.
+PROPERTIES = 10 # Number of Properties each class adds.
+CLASSES = 200 # Number of Model classes that are named.
+
+def search(instance, descriptor):
+    '''Finds the name of @descriptor the way Property.search used to'''
+    for name, value in instance.__class__.__dict__.items():
+        if value is descriptor:
+            return name
+    for cls in type(instance).__bases__:
+        for name, value in cls.__dict__.items():
+            if value is descriptor:
+                return name
+    return None
+
+def hierarchy():
+    '''Returns a new Model that is @DEPTH classes below Model'''
+    cls = Model
+    for depth in range(DEPTH):
+        attributes = dict(("p%s_%s" % (depth, i), String()) for i in range(PROPERTIES))
+        cls = type("Level%s" % depth, (cls,), attributes)
+    return cls
+
+def report(name, count, elapsed, unit):
+    '''Prints the number of @unit done per second'''
+    print "%-8s %8d %s in %.3fs, %10.0f %s/s" % (name, count, unit, elapsed, count / elapsed, unit)
+
+def access(count):
+    '''Reads and writes attributes of the deepest and the shallowest class of a Model'''
+    model = hierarchy()()
+    names = ["p%s_0" % (DEPTH - 1), "p0_0"]
+    start = time.time()
+    for i in xrange(count):
+        setattr(model, names[i % 2], "value")
+    report("set", count, time.time() - start, "writes")
+    start = time.time()
+    for i in xrange(count):
+        getattr(model, names[i % 2])
+    report("get", count, time.time() - start, "reads")
+
+def naming(count):
+    '''Names every Property of @count new Models, by searching and by reading the bound name'''
+    classes = [hierarchy() for i in range(count)]
+    instances = [(cls(), [prop for root in cls.__mro__ for prop in root.__dict__.values()
+        if isinstance(prop, Property)]) for cls in classes]
+    for name, find in [("search", search), ("bound", lambda instance, prop: prop.name)]:
+        start = time.time()
+        for instance, props in instances:
+            for prop in props:
+                find(instance, prop)
+        report(name, count, time.time() - start, "classes")
+
+def main(count):
+    '''Runs the benchmarks'''
+    access(count)
+    naming(CLASSES)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else OPERATIONS)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Measures how many rows a second MetaModel.load turns into Models, for
+a Model with @PROPERTIES properties; 'legacy' scans the descriptors of
+the Model for every row like MetaModel.load used to, 'codec' uses the
+Codec that Schema compiles once per Model. No Cassandra is needed.
+
+Usage:
+$ python benchmarks/codec.py [rows]
+"""
+import sys
+import time
+import pickle
+
+sys.path.extend(["./src", "./lib"])
+from cql.cassandra.ttypes import Column, ColumnOrSuperColumn
+from homer.core.models import key, Model, Key, Schema, Property
+from homer.core.builtins import fields
+from homer.core.commons import String, Integer
+from homer.backend.db import MetaModel
+
+ROWS = 20000 # Number of rows that are loaded.
+PROPERTIES = 20 # Number of properties of the Model.
+DYNAMIC = 2 # Number of dynamic columns in each row.
+
+def legacy(key, coscs):
+    '''Creates a Model from @coscs the way MetaModel.load used to'''
+    cls = Schema.ClassForModel(key.namespace, key.kind)
+    info = Schema.Get(cls)
+    model = cls()
+    descriptors = fields(cls, Property)
+    for cosc in coscs:
+        name = cosc.column.name
+        if name in descriptors:
+            model[name] = descriptors[name].deconvert(cosc.column.value)
+        else:
+            k, v = model.default
+            k = k() if isinstance(k, type) else k
+            v = v() if isinstance(v, type) else v
+            model[k.deconvert(cosc.column.name)] = v.deconvert(cosc.column.value)
+    setattr(model, info[2], key.id)
+    model.key().saved = True
+    return model
+
+def measure(name, load, rows):
+    '''Loads every row in @rows with @load and prints the rows loaded per second'''
+    start = time.time()
+    for key, coscs in rows:
+        load(key, coscs)
+    elapsed = time.time() - start
+    print "%-8s %8d rows in %.3fs, %10.0f rows/s" % (name, len(rows), elapsed, len(rows) / elapsed)
+
+def main(count):
+    '''Loads @count rows of a Model with @PROPERTIES properties'''
+    attributes = dict(("p%s" % i, Integer() if i % 2 else String()) for i in range(PROPERTIES))
+    attributes["id"] = String(required = True)
+    Wide = key("id", namespace = "Bench")(type("Wide", (Model,), attributes))
+    columns = [("p%s" % i, str(i) if i % 2 else "value %s" % i) for i in range(PROPERTIES)]
+    columns += [(pickle.dumps("extra%s" % i), pickle.dumps("dynamic")) for i in range(DYNAMIC)]
+    rows = []
+    for i in range(count):
+        coscs = [ColumnOrSuperColumn(column = Column(name = name, value = value)) for name, value in columns]
+        rows.append((Key("Bench", "Wide", str(i)), coscs))
+    measure("legacy", legacy, rows)
+    measure("codec", MetaModel.load, rows)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
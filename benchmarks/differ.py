@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Measures how many saves a second the Differ of a Model with a @BLOB byte
+Blob and a @LIST item List can diff and commit when only a String changed,
+and which columns each save writes; 'legacy' deep copies and compares every value like Differs used to, 'cow'
+is the Differ that tracks the names that were set. No Cassandra is needed.
+
+Usage:
+$ python benchmarks/differ.py [saves]
+"""
+import sys
+import copy
+import time
+
+sys.path.extend(["./src", "./lib"])
+from homer.core.models import Model
+from homer.core.differ import Differ
+from homer.core.commons import String, Blob, List
+
+SAVES = 200 # Number of saves that are diffed.
+BLOB = 1024 * 1024 # Size of the Blob in bytes.
+LIST = 1000 # Number of items in the List.
+
+class Legacy(Differ):
+    '''A Differ that copies and compares everything, like Differs used to'''
+
+    def commit(self):
+        '''Deep copies the Model'''
+        self.replica = copy.deepcopy(self.instance.__store__)
+        self.dirty, self.revisions, self.copies = set(), {}, {}
+
+    def modified(self):
+        '''Compares every value'''
+        for name in self.replica:
+            if name in self.model and self.replica[name] != self.model[name]:
+                yield name
+
+class Document(Model):
+    '''A Model with a large Blob'''
+    title = String()
+    content = Blob()
+    tags = List(String)
+
+def measure(name, differ, count):
+    '''Changes the title of a Document @count times, diffing and committing each change'''
+    document = Document(title = "Draft", content = "x" * BLOB, tags = [str(i) for i in range(LIST)])
+    document.differ = differ(document, exclude = ["differ"])
+    document.differ.commit()
+    start = time.time()
+    for i in range(count):
+        document.title = "Draft %s" % i
+        changed = list(document.differ.added()) + list(document.differ.modified()) + list(document.differ.deleted())
+        document.differ.commit()
+    elapsed = time.time() - start
+    print "%-8s %8d saves in %.3fs, %10.0f saves/s, writes: %s" % (name, count, elapsed, count / elapsed,
+        ", ".join(sorted(changed)))
+
+def main(count):
+    '''Diffs @count saves with both Differs'''
+    measure("legacy", Legacy, count)
+    measure("cow", Differ, count)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SAVES)
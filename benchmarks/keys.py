@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Measures how fast Keys are used as dictionary keys, like the identity
+maps of bulk reads use them, and how many rows a second bulk reads turn
+into Models and into read-only Rows; 'legacy' is a Key that hashes its
+repr() like Keys used to. No Cassandra is needed.
+
+Usage:
+$ python benchmarks/keys.py [keys] [rows]
+"""
+import sys
+import time
+
+sys.path.extend(["./src", "./lib"])
+from cql.cassandra.ttypes import Column, ColumnOrSuperColumn
+from homer.core.models import key, Model, Key
+from homer.core.commons import String, Integer
+from homer.backend.db import MetaModel
+
+KEYS = 200000 # Number of Keys in the dictionary.
+ROWS = 20000 # Number of rows that are loaded.
+PROPERTIES = 10 # Number of properties of the Model.
+
+class LegacyKey(object):
+    '''A Key like Keys used to be'''
+    def __init__(self, namespace, kind = None, id = None):
+        self.namespace = namespace
+        self.kind = kind
+        self.id = id
+        self.saved = False
+        self.columns = []
+
+    def __hash__(self):
+        return hash(repr(self))
+
+    def __eq__(self, other):
+        return self.namespace == other.namespace and self.kind == other.kind and self.id == other.id
+
+    def __repr__(self):
+        format = "Key('{self.namespace}', '{self.kind}', '{self.id}')"
+        return format.format(self = self)
+
+def report(name, count, elapsed, unit):
+    '''Prints the number of @unit done per second'''
+    print "%-8s %8d %s in %.3fs, %10.0f %s/s" % (name, count, unit, elapsed, count / elapsed, unit)
+
+def keys(count):
+    '''Creates @count Keys of each kind, and puts them into and looks them up in a dictionary'''
+    for name, cls in [("legacy", LegacyKey), ("key", Key)]:
+        start = time.time()
+        found = dict((cls("Bench", "Book", str(i)), i) for i in xrange(count))
+        for i in xrange(count):
+            found[cls("Bench", "Book", str(i))]
+        report(name, count, time.time() - start, "keys")
+
+def rows(count):
+    '''Loads @count rows into Models and into Rows'''
+    attributes = dict(("p%s" % i, Integer() if i % 2 else String()) for i in range(PROPERTIES))
+    attributes["id"] = String(required = True)
+    key("id", namespace = "Bench")(type("Book", (Model,), attributes))
+    columns = [("p%s" % i, str(i) if i % 2 else "value %s" % i) for i in range(PROPERTIES)]
+    found = [(Key("Bench", "Book", str(i)), [ColumnOrSuperColumn(column = Column(name = name, value = value))
+        for name, value in columns]) for i in xrange(count)]
+    for name, load in [("model", MetaModel.load), ("row", MetaModel.row)]:
+        start = time.time()
+        for id, coscs in found:
+            load(id, coscs)
+        report(name, count, time.time() - start, "rows")
+
+def main(count, rowcount):
+    '''Runs the benchmarks'''
+    keys(count)
+    rows(rowcount)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else KEYS, int(sys.argv[2]) if len(sys.argv) > 2 else ROWS)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Measures how many Models a second can be created with @KEYWORDS keyword
+arguments, for a Model that is @DEPTH classes below Model; 'legacy' finds
+the Properties of the Model for every Model and every keyword like Model
+used to, 'cached' uses the Properties that are cached on the class. No
+Cassandra is needed.
+
+Usage:
+$ python benchmarks/models.py [models]
+"""
+import sys
+import time
+
+sys.path.extend(["./src", "./lib"])
+from homer.core.models import BaseModel, Model, Property
+from homer.core.builtins import fields
+from homer.core.commons import String
+
+MODELS = 50000 # Number of Models that are created.
+KEYWORDS = 10 # Number of keyword arguments of each Model.
+DEPTH = 3 # Number of classes between Model and the benchmarked Model.
+
+class Legacy(Model):
+    '''A Model that finds its Properties like Model used to'''
+
+    def __new__(cls, *arguments, **keywords):
+        '''Configures every Property of the Model'''
+        instance = BaseModel.__new__(cls, *arguments, **keywords)
+        [prop.configure(name, cls) for name, prop in fields(cls, Property).items()]
+        return instance
+
+    def __setitem__(self, key, value):
+        '''Searches the Properties of the Model on every set'''
+        if key in fields(self, Property):
+            setattr(self, key, value)
+        else:
+            k, v = self.default
+            k = k() if isinstance(k, type) else k
+            v = v() if isinstance(v, type) else v
+            self.__store__[k(key)] = v(value)
+
+def hierarchy(base):
+    '''Returns a Model that is @DEPTH classes below @base'''
+    cls = base
+    for depth in range(DEPTH):
+        attributes = dict(("p%s_%s" % (depth, i), String()) for i in range(KEYWORDS))
+        cls = type("Level%s" % depth, (cls,), attributes)
+    return cls
+
+def measure(name, cls, count):
+    '''Creates @count instances of @cls and prints the Models created per second'''
+    keywords = dict(("p%s_%s" % (DEPTH - 1, i), "value") for i in range(KEYWORDS))
+    start = time.time()
+    for i in range(count):
+        cls(**keywords)
+    elapsed = time.time() - start
+    print "%-8s %8d models in %.3fs, %10.0f models/s" % (name, count, elapsed, count / elapsed)
+
+def main(count):
+    '''Creates @count Models the legacy and the cached way'''
+    measure("legacy", hierarchy(Legacy), count)
+    measure("cached", hierarchy(Model), count)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else MODELS)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Measures how long threads wait to check a Connection out of a
+RoundRobinPool when many more threads than connections share it;
+Connections are stubs that take @CONNECT seconds to open, so no
+Cassandra is needed.
+
+Usage:
+$ python benchmarks/pool.py [threads] [cycles]
+"""
+import sys
+import time
+from threading import Thread, Lock
+
+sys.path.extend(["./src", "./lib"])
+from homer.backend.db import RoundRobinPool, CHECKEDOUT
+
+THREADS = 200 # Number of threads that share the pool.
+CYCLES = 50 # Number of checkouts each thread makes.
+SIZE = 20 # Maximum number of connections in the pool.
+CONNECT = 0.01 # Seconds it takes to open a connection.
+HOLD = 0.001 # Seconds each checkout holds its connection.
+
+class StubConnection(object):
+    '''A Connection that doesn't talk to anything'''
+    def __init__(self, pool, address):
+        time.sleep(CONNECT)
+        self.pool, self.address = pool, address
+        self.state, self.open = CHECKEDOUT, True
+        self.created = self.returned = time.time()
+
+    def dispose(self):
+        '''Closes this connection'''
+        if self.open:
+            self.open = False
+            self.pool.discard(self)
+
+class StubPool(RoundRobinPool):
+    '''A RoundRobinPool of StubConnections'''
+    def connect(self, address):
+        '''Opens a StubConnection to @address'''
+        return StubConnection(self, address)
+
+def percentile(samples, fraction):
+    '''The value in sorted @samples below which @fraction of them lie'''
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def main(threads, cycles):
+    '''Runs @threads threads that each check a connection out @cycles times'''
+    pool = StubPool({"size": SIZE, "keyspace": "Bench", "idle": SIZE, "timeout": 60,
+        "recycle": 60000, "servers": ["localhost:9160"], "username": None, "password": None})
+    samples, lock = [], Lock()
+    def work():
+        '''Checks connections out and back in, recording the time each checkout took'''
+        timings = []
+        for i in range(cycles):
+            start = time.time()
+            connection = pool.get()
+            timings.append(time.time() - start)
+            time.sleep(HOLD)
+            pool.put(connection)
+        with lock:
+            samples.extend(timings)
+    workers = [Thread(target=work) for i in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - start
+    samples.sort()
+    print "%s checkouts by %s threads from %s connections in %.2fs" % (len(samples), threads, SIZE, elapsed)
+    for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        print "%s: %.2fms" % (name, percentile(samples, fraction) * 1000)
+    print "max: %.2fms" % (samples[-1] * 1000)
+    pool.disposeAll()
+
+if __name__ == "__main__":
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    main(*(arguments + [THREADS, CYCLES][len(arguments):]))
@@ -26,6 +26,10 @@ the June infrastructure.
 
 """
 from .db import *
+from .cache import *
+from .balancer import *
+from .metrics import *
+from .retry import *
 
 
 
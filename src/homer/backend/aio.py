@@ -0,0 +1,607 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+An asynchronous counterpart of Lisa; AsyncLisa sends its requests over
+non-blocking framed transports that are all driven by a single event loop
+thread, so one thread keeps hundreds of requests in flight. Every AsyncLisa
+operation returns a Future immediately instead of blocking its caller.
+
+The event loop is built on asyncore and select, since asyncio isn't
+available to Python 2. Requests are encoded and decoded with the generated
+Cassandra.Client, so they speak exactly the same protocol as Connections.
+"""
+import os
+import sys
+import time
+import zlib
+import errno
+import fcntl
+import socket
+import struct
+import asyncore
+from collections import deque
+from threading import Thread, RLock
+
+from thrift.transport import TTransport
+from thrift.protocol import TBinaryProtocol
+from cql.cursor import Cursor
+from cql.marshal import prepare
+from cql.cassandra import Cassandra
+from cql.cassandra.ttypes import *
+
+from homer.options import Settings
+from homer.core.models import Key, Schema
+from homer.backend import db
+from homer.backend.db import Lisa, MetaModel, RowCache, Batch, FetchMode, TimedOutException, \
+    optionsFor, keyspaceFor, predicateFor, logging, CHUNKSIZE
+from homer.backend.futures import Future, gather
+from homer.backend.balancer import FAILURES, balancerFor
+
+__all__ = ["AsyncLisa", "AsyncPool", "AsyncConnection", "Loop", "asyncPoolFor",]
+
+# SHARED STATE
+__LOCK__ = RLock()
+__LOOP__ = []
+__ASYNCPOOLS__ = dict()
+
+# CONSTANTS
+TICK = 0.1 #THE LONGEST TIME THE LOOP WAITS FOR I/O BEFORE IT LOOKS FOR EXPIRED REQUESTS
+BUFFERSIZE = 65536 #THE NUMBER OF BYTES THAT IS READ FROM A SOCKET AT A TIME
+
+
+"""
+loop:
+Returns the event loop that drives every AsyncPool, the loop
+is started the first time it is needed.
+"""
+def loop():
+    '''Returns or starts the event loop'''
+    with __LOCK__:
+        if not __LOOP__:
+            found = Loop()
+            found.start()
+            __LOOP__.append(found)
+        return __LOOP__[0]
+
+"""
+asyncPoolFor:
+This returns the AsyncPool for @namespace if it exists, if it doesn't
+exist yet, it is created from the options of @namespace.
+"""
+def asyncPoolFor(namespace):
+    '''Returns or creates the AsyncPool for this namespace'''
+    with __LOCK__:
+        if namespace not in __ASYNCPOOLS__:
+            __ASYNCPOOLS__[namespace] = AsyncPool(optionsFor(namespace), loop())
+        return __ASYNCPOOLS__[namespace]
+
+"""
+request:
+Sends the Cassandra.Client call @name with @arguments to the keyspace
+of @namespace, and returns a Future of its result.
+"""
+def request(namespace, name, *arguments):
+    '''Returns a Future of the result of the call @name(*arguments) in @namespace'''
+    return asyncPoolFor(namespace).call(keyspaceFor(namespace), name, *arguments)
+
+"""
+ensure:
+Lisa creates the column families of Models in debug mode before it
+writes to them; AsyncLisa does the same, but creating a column family
+blocks, so this only happens once per kind.
+"""
+def ensure(model):
+    '''Creates the column family of @model in debug mode if necessary'''
+    kind = Schema.Get(model)[1]
+    if kind not in db.__COLUMNFAMILIES__ and Settings.debug():
+        Lisa.create(model)
+
+
+"""
+Loop:
+The thread that runs every AsyncConnection; Other threads hand work
+to the Loop with call(), which wakes it up through a pipe. All the
+state of AsyncPools and AsyncConnections is only touched on this thread,
+so none of it needs a lock.
+"""
+class Loop(Thread):
+    '''Runs the non-blocking connections of every AsyncPool'''
+
+    def __init__(self):
+        '''Creates the Loop and the pipe that wakes it up'''
+        super(Loop, self).__init__()
+        self.map = {}
+        self.tasks = deque()
+        self.pools = []
+        reader, self.writer = os.pipe()
+        flags = fcntl.fcntl(self.writer, fcntl.F_GETFL)
+        fcntl.fcntl(self.writer, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self.waker = Waker(reader, self.map)
+        self.name = "ASYNC-LOOP"
+        self.daemon = True
+
+    def call(self, function, *arguments):
+        '''Runs @function(*arguments) on the Loop, this is threadsafe'''
+        self.tasks.append((function, arguments))
+        try:
+            os.write(self.writer, "x")
+        except OSError as e:
+            if e.errno != errno.EAGAIN: # A full pipe will wake the Loop anyway.
+                raise
+
+    def run(self):
+        '''Waits for I/O, runs the tasks it was given and expires late requests, forever'''
+        while True:
+            try:
+                asyncore.loop(timeout=TICK, map=self.map, count=1)
+                while self.tasks:
+                    function, arguments = self.tasks.popleft()
+                    function(*arguments)
+                now = time.time()
+                for pool in self.pools:
+                    pool.expire(now)
+            except Exception as e:
+                logging.exception("The event loop caught an error: %s" % e)
+
+
+"""
+Waker:
+The reading end of the pipe that wakes the Loop up.
+"""
+class Waker(asyncore.file_dispatcher):
+    '''Drains the pipe that wakes the Loop up'''
+
+    def writable(self):
+        return False
+
+    def handle_read(self):
+        self.recv(BUFFERSIZE)
+
+
+"""
+AsyncConnection:
+A non-blocking framed transport to one Cassandra server; It runs one
+request at a time, and remembers its keyspace so set_keyspace is only
+sent when the keyspace changes.
+"""
+class AsyncConnection(asyncore.dispatcher):
+    '''A non-blocking connection to a Cassandra server'''
+
+    def __init__(self, pool, address, map):
+        '''Starts connecting to @address'''
+        asyncore.dispatcher.__init__(self, map=map)
+        host, port = address.split(":")
+        self.pool = pool
+        self.address = address
+        self.keyspace = None
+        self.authenticated = False
+        self.outgoing, self.offset = "", 0
+        self.incoming, self.received, self.expected = [], 0, None
+        self.calls = deque()
+        self.future = None
+        self.deadline = None
+        self.started = None
+        self.aborted = False
+        self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.connect((host, int(port)))
+
+    def perform(self, keyspace, name, arguments, future, deadline):
+        '''Sends the call @name(*arguments) to @keyspace, and finishes @future with its result'''
+        self.future, self.deadline, self.started = future, deadline, time.time()
+        if self.pool.username and self.pool.password and not self.authenticated:
+            credentials = {"username": self.pool.username, "password": self.pool.password}
+            self.calls.append(("login", (AuthenticationRequest(credentials = credentials),)))
+        if keyspace and keyspace != self.keyspace:
+            self.calls.append(("set_keyspace", (keyspace,)))
+        self.calls.append((name, arguments))
+        self.write(*self.calls[0])
+
+    def write(self, name, arguments):
+        '''Encodes the call @name(*arguments) as a frame and queues it for writing'''
+        buffer = TTransport.TMemoryBuffer()
+        client = Cassandra.Client(TBinaryProtocol.TBinaryProtocolAccelerated(buffer))
+        getattr(client, "send_" + name)(*arguments)
+        payload = buffer.getvalue()
+        self.outgoing = self.outgoing[self.offset:] + struct.pack("!i", len(payload)) + payload
+        self.offset = 0
+
+    def receive(self, frame):
+        '''Decodes the response to the current call and sends the next one'''
+        name, arguments = self.calls.popleft()
+        client = Cassandra.Client(TBinaryProtocol.TBinaryProtocolAccelerated(TTransport.TMemoryBuffer(frame)))
+        try:
+            value = getattr(client, "recv_" + name)()
+        except Exception as e: # Cassandra's errors leave the connection usable.
+            self.calls.clear()
+            self.finish(None, e, sys.exc_info()[2])
+            return
+        if name == "set_keyspace":
+            self.keyspace = arguments[0]
+        elif name == "login":
+            self.authenticated = True
+        if self.calls:
+            self.write(*self.calls[0])
+        else:
+            self.finish(value, None, None)
+
+    def finish(self, value, error, trace):
+        '''Returns this connection to its pool and finishes the current Future'''
+        future, self.future, self.deadline = self.future, None, None
+        if isinstance(error, FAILURES):
+            self.pool.balancer.failed(self.address, error)
+        else:
+            self.pool.balancer.succeeded(self.address, time.time() - self.started)
+        self.pool.release(self)
+        future.finish(value, error, trace)
+
+    def abort(self, error):
+        '''Closes this connection after @error, and fails the current Future with it'''
+        if self.aborted:
+            return
+        self.aborted = True
+        self.close()
+        self.calls.clear()
+        future, self.future, self.deadline = self.future, None, None
+        self.pool.balancer.failed(self.address, error)
+        self.pool.discard(self)
+        if future is not None:
+            future.setException(error)
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return getattr(self, "connecting", not self.connected) or self.offset < len(self.outgoing)
+
+    def handle_connect(self):
+        logging.info("Connected asynchronously to: %s" % self.address)
+
+    def handle_write(self):
+        '''Writes as much of the outgoing frames as the socket takes'''
+        sent = asyncore.dispatcher.send(self, buffer(self.outgoing, self.offset))
+        self.offset += sent
+
+    def handle_read(self):
+        '''Reads frames, and hands every complete frame to receive()'''
+        data = self.recv(BUFFERSIZE)
+        if not data:
+            return
+        self.incoming.append(data)
+        self.received += len(data)
+        while True:
+            if self.expected is None:
+                if self.received < 4:
+                    break
+                header = "".join(self.incoming)
+                self.incoming = [header]
+                self.expected = struct.unpack("!i", header[:4])[0] + 4
+            if self.received < self.expected:
+                break
+            data = "".join(self.incoming)
+            frame, rest = data[4:self.expected], data[self.expected:]
+            self.incoming = [rest] if rest else []
+            self.received, self.expected = len(rest), None
+            self.receive(frame)
+
+    def handle_close(self):
+        self.abort(socket.error("The connection to %s was closed" % self.address))
+
+    def handle_error(self):
+        error = sys.exc_info()[1]
+        logging.error("The connection to %s failed: %s" % (self.address, error))
+        self.abort(error)
+
+
+"""
+AsyncPool:
+The AsyncConnections to the servers of one namespace; It opens at most
+@size connections, and queues the requests that arrive while all of them
+are busy. Requests that don't finish within @timeout seconds of being sent
+fail with a TimedOutException.
+"""
+class AsyncPool(object):
+    '''A pool of non-blocking connections that are driven by a Loop'''
+
+    def __init__(self, options, loop):
+        '''Configures an AsyncPool with the options of a namespace'''
+        self.loop = loop
+        self.maxConnections = options['size']
+        self.timeout = options['timeout']
+        self.servers = options['servers']
+        self.username = options['username']
+        self.password = options['password']
+        self.balancer = balancerFor(options)
+        self.idle, self.busy, self.waiting = deque(), set(), deque()
+        self.count = 0
+        loop.call(loop.pools.append, self)
+
+    def call(self, keyspace, name, *arguments):
+        '''Returns a Future of the result of the call @name(*arguments) in @keyspace, this is threadsafe'''
+        future = Future()
+        self.loop.call(self.schedule, (keyspace, name, arguments, future, time.time() + self.timeout))
+        return future
+
+    def schedule(self, request):
+        '''Runs @request on an idle or a new connection, or queues it'''
+        if self.idle:
+            self.perform(self.idle.pop(), request)
+        elif self.count < self.maxConnections:
+            self.connect(request)
+        else:
+            self.waiting.append(request)
+
+    def connect(self, request):
+        '''Opens a connection to the next server for @request'''
+        address = self.balancer.choose()
+        try:
+            connection = AsyncConnection(self, address, self.loop.map)
+        except Exception as e:
+            logging.error("Couldn't connect to: %s, error: %s" % (address, e))
+            self.balancer.failed(address, e)
+            request[3].setException(e)
+            return
+        self.count += 1
+        self.perform(connection, request)
+
+    def perform(self, connection, request):
+        '''Sends @request with @connection'''
+        keyspace, name, arguments, future, deadline = request
+        self.busy.add(connection)
+        connection.perform(keyspace, name, arguments, future, deadline)
+
+    def release(self, connection):
+        '''Gives @connection the next queued request, or makes it idle'''
+        self.busy.discard(connection)
+        if self.waiting:
+            self.perform(connection, self.waiting.popleft())
+        else:
+            self.idle.append(connection)
+
+    def discard(self, connection):
+        '''Forgets a closed connection, and opens another for the queued requests'''
+        self.busy.discard(connection)
+        if connection in self.idle:
+            self.idle.remove(connection)
+        self.count -= 1
+        if self.waiting and self.count < self.maxConnections:
+            self.connect(self.waiting.popleft())
+
+    def expire(self, now):
+        '''Fails the requests that are running or queued past their deadline'''
+        for connection in list(self.busy):
+            if connection.deadline is not None and connection.deadline < now:
+                connection.abort(TimedOutException("Sorry, your request has Timed Out"))
+        while self.waiting and self.waiting[0][4] < now:
+            self.waiting.popleft()[3].setException(TimedOutException("Sorry, your request has Timed Out"))
+
+    def disposeAll(self):
+        '''Closes all the idle connections in this pool, this is threadsafe'''
+        def close():
+            while self.idle:
+                connection = self.idle.pop()
+                connection.close()
+                self.count -= 1
+        self.loop.call(close)
+
+
+"""
+Replay:
+Stands in for a Connection, so a cql Cursor can decode the response
+to a query that was received asynchronously.
+"""
+class Replay(object):
+    '''A Connection whose only response has already been received'''
+
+    def __init__(self, response, error):
+        self.response = response
+        self.error = error
+
+    @property
+    def client(self):
+        return self
+
+    def execute_cql_query(self, query, compression):
+        '''Returns the response that was received, or raises its error'''
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+'''
+AsyncLisa:
+Lisa's operations, without the waiting; Every operation returns a Future
+that is finished on the event loop thread, so callbacks that are added to
+them must not block. Sessions are per thread, so AsyncLisa doesn't use them.
+
+future = AsyncLisa.read(Key("June", "Staff", "albert"), FetchMode.All)
+future.addCallback(lambda done: notify(done.result()))
+
+futures = [AsyncLisa.save(model) for model in models]
+gather(*futures).result(timeout=10)
+'''
+class AsyncLisa(object):
+    '''Lisa, for event driven code'''
+
+    @classmethod
+    def read(clasz, key, fetchmode=FetchMode.Property):
+        '''Returns a Future of the Model that @key refers to'''
+        assert key and fetchmode, "specify key and fetchmode"
+        assert key.complete(), "your key has to be complete"
+        coscs = RowCache.get(key, fetchmode)
+        if coscs is not None:
+            return Future.completed(MetaModel.load(key, coscs))
+        def load(coscs):
+            '''Caches the row and deserializes it'''
+            RowCache.put(key, fetchmode, coscs)
+            return MetaModel.load(key, coscs)
+        parent = ColumnParent(column_family = key.kind)
+        predicate = predicateFor(key, fetchmode)
+        return request(key.namespace, "get_slice", key.id, parent, predicate, Lisa.consistency).then(load)
+
+    @classmethod
+    def readMany(clasz, *keys, **keywords):
+        '''Returns a Future of the Models @keys refer to in order, every chunk is read concurrently'''
+        fetchmode = keywords.pop("fetchmode", FetchMode.Property)
+        chunk = keywords.pop("chunk", CHUNKSIZE)
+        assert fetchmode and chunk > 0, "specify fetchmode and a positive chunk size"
+        groups, found, futures = {}, {}, []
+        for key in keys:
+            assert key.complete(), "your keys have to be complete"
+            coscs = RowCache.get(key, fetchmode)
+            if coscs is not None:
+                found[(key.namespace, key.kind, key.id)] = coscs
+                continue
+            groups.setdefault((key.namespace, key.kind, tuple(key.columns)), []).append(key)
+        for (namespace, kind, columns), members in groups.items():
+            parent = ColumnParent(column_family = kind)
+            predicate = predicateFor(members[0], fetchmode)
+            ids = list(set(key.id for key in members))
+            for start in xrange(0, len(ids), chunk):
+                batch = ids[start: start + chunk]
+                def store(rows, namespace=namespace, kind=kind):
+                    '''Keeps and caches the rows of one chunk'''
+                    for id, coscs in rows.items():
+                        found[(namespace, kind, id)] = coscs
+                        RowCache.put(Key(namespace, kind, id), fetchmode, coscs)
+                futures.append(request(namespace, "multiget_slice", batch, parent, predicate, Lisa.consistency).then(store))
+        def load(results):
+            '''Deserializes the Models in the order they were requested'''
+            return [MetaModel.load(key, found.get((key.namespace, key.kind, key.id), None)) for key in keys]
+        return gather(*futures).then(load)
+
+    @classmethod
+    def save(clasz, model):
+        '''Returns a Future of @model, that finishes when it has been written'''
+        from homer.core.models import BaseModel
+        assert issubclass(model.__class__, BaseModel), "%s must inherit from BaseModel" % model
+        namespace = Schema.Get(model)[0]
+        ensure(model)
+        meta = MetaModel(model)
+        mutations = { meta.id() : meta.mutations() }
+        snapshot = model.differ.snapshot() # What @model is once this is written.
+        def saved(value):
+            '''Updates the cache and marks @model as saved'''
+            RowCache.update(namespace, mutations)
+            model.key().saved = True
+            model.differ.commit(snapshot)
+            return model
+        return request(namespace, "batch_mutate", mutations, Lisa.consistency).then(saved)
+
+    @classmethod
+    def saveMany(clasz, namespace, *models):
+        '''Returns a Future that finishes when @models have been written in concurrent batches'''
+        from homer.core.models import BaseModel
+        rows, snapshots = [], {}
+        for model in models:
+            assert issubclass(model.__class__, BaseModel), "%s must inherit from BaseModel" % model
+            ensure(model)
+            meta = MetaModel(model)
+            rows.append((Schema.Get(model)[0], meta.id(), meta.mutations(), model))
+            snapshots[id(model)] = model.differ.snapshot()
+        futures = []
+        for batch in Batch.partition(rows):
+            def saved(value, batch=batch):
+                '''Updates the cache and marks the Models in @batch as saved'''
+                RowCache.update(batch.namespace, batch.mutations)
+                for model in batch.models:
+                    model.key().saved = True
+                    model.differ.commit(snapshots[id(model)])
+            futures.append(request(batch.namespace, "batch_mutate", batch.mutations, Lisa.consistency).then(saved))
+        return gather(*futures).then(lambda results: None)
+
+    @classmethod
+    def delete(clasz, *keys):
+        '''Returns a Future that finishes when the Models @keys refer to have been deleted'''
+        futures = []
+        for key in keys:
+            assert key.complete(), "Your Key has to be complete to a delete"
+            path = ColumnPath(column_family = key.kind)
+            def deleted(value, key=key):
+                RowCache.invalidate(key)
+            futures.append(request(key.namespace, "remove", key.id, path, time.time(), Lisa.consistency).then(deleted))
+        return gather(*futures).then(lambda results: None)
+
+    @classmethod
+    def readColumn(clasz, key, name):
+        '''Returns a Future of the value of the column @name in the row @key refers to'''
+        assert key.complete(), "Your key must be complete, before you can do reads"
+        path = ColumnPath(column_family = key.kind, column = name)
+        return request(key.namespace, "get", key.id, path, Lisa.consistency).then(lambda cosc: cosc.column.value)
+
+    @classmethod
+    def saveColumn(clasz, key, name, value, ttl=None):
+        '''Returns a Future that finishes when the column @name has been written'''
+        assert key.complete(), "Your key must be complete before you can do writes"
+        parent = ColumnParent(column_family = key.kind)
+        column = Column(name = name, value = value, timestamp = time.time())
+        if ttl:
+            column.ttl = ttl
+        def saved(value):
+            RowCache.invalidate(key)
+        return request(key.namespace, "insert", key.id, parent, column, Lisa.consistency).then(saved)
+
+    @classmethod
+    def deleteColumn(clasz, key, name):
+        '''Returns a Future that finishes when the column @name has been deleted'''
+        assert key.complete(), "Your key must be complete before you can do writes"
+        path = ColumnPath(column_family = key.kind, column = name)
+        def deleted(value):
+            RowCache.invalidate(key)
+        return request(key.namespace, "remove", key.id, path, time.time(), Lisa.consistency).then(deleted)
+
+    @classmethod
+    def readManyColumns(clasz, namespace, kind, id, *arguments):
+        '''Returns a Future of the [(name, value)] of the columns @arguments of one row'''
+        assert namespace and kind and id, "specify namespace, kind, id"
+        predicate = SlicePredicate(column_names = arguments)
+        parent = ColumnParent(column_family = kind)
+        def columns(coscs):
+            return [(cosc.column.name, cosc.column.value) for cosc in coscs]
+        return request(namespace, "get_slice", id, parent, predicate, Lisa.consistency).then(columns)
+
+    @classmethod
+    def query(clasz, query):
+        '''Returns a Future of @query, a CqlQuery, that has been executed and is ready to be iterated'''
+        keywords = query.prepare()
+        statement = zlib.compress(prepare(query.query, keywords))
+        future, done = request(query.namespace, "execute_cql_query", statement, Compression.GZIP), Future()
+        def replay(response):
+            '''Lets a Cursor decode the response, and translate its errors'''
+            try:
+                cursor = Cursor(Replay(response.value, response.error))
+                cursor.execute(query.query, keywords)
+                query.cursor = cursor
+            except Exception as e:
+                done.setException(e, sys.exc_info()[2])
+            else:
+                done.setResult(query)
+        future.addCallback(replay)
+        return done
+
+    @staticmethod
+    def clear():
+        '''Closes and forgets all the AsyncPools'''
+        with __LOCK__:
+            for pool in __ASYNCPOOLS__.values():
+                pool.disposeAll()
+            __ASYNCPOOLS__.clear()
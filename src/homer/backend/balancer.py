@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Balancers choose the server a connection pool opens its next connection
+to; Pools tell their Balancer how every request went, so a Balancer can
+steer new connections away from slow or failing servers.
+"""
+import time
+import bisect
+import random
+import hashlib
+import binascii
+import socket
+import logging
+import itertools
+from threading import Thread, Event, RLock
+
+from thrift.transport import TSocket, TTransport
+from cql.cassandra.ttypes import TimedOutException, UnavailableException
+
+__all__ = ["Balancer", "RoundRobin", "HealthAware", "Ring", "balancerFor",]
+
+logging = logging.getLogger("homer")
+
+FAILURES = (socket.error, TTransport.TTransportException, TimedOutException, UnavailableException) # Errors that count against a server.
+
+"""
+balancerFor:
+Creates the Balancer that is configured in the 'balancer' options of a
+namespace, namespaces without 'balancer' options use RoundRobin.
+"""
+def balancerFor(options):
+    '''Returns a new Balancer for the servers of a namespace'''
+    found = dict(options.get("balancer", None) or {})
+    name = found.pop("name", "roundrobin")
+    if name not in BALANCERS:
+        from homer.options import ConfigurationError
+        raise ConfigurationError("Unknown balancer: %s, expected one of: %s" % (name, sorted(BALANCERS)))
+    return BALANCERS[name](options['servers'], timeout = options.get('timeout', 30), **found)
+
+"""
+Balancer:
+The contract for all Balancers.
+"""
+class Balancer(object):
+    '''The contract for all Balancers'''
+
+    def choose(self):
+        '''Returns the address of the server the next connection should go to'''
+        raise NotImplementedError
+
+    def succeeded(self, address, elapsed):
+        '''Records that a request to @address took @elapsed seconds'''
+        pass
+
+    def failed(self, address, error = None):
+        '''Records that a request or a connection to @address failed with @error'''
+        pass
+
+    def stats(self):
+        '''Returns what this Balancer knows about its servers'''
+        return {}
+
+"""
+RoundRobin:
+Cycles through the servers, regardless of how they are doing.
+"""
+class RoundRobin(Balancer):
+    '''Chooses servers in turn'''
+
+    def __init__(self, servers, timeout = 30):
+        '''Cycles through @servers'''
+        self.servers = list(servers)
+        self.lock = RLock()
+        self.cycle = itertools.cycle(self.servers)
+
+    def choose(self):
+        '''Returns the next server'''
+        with self.lock:
+            return self.cycle.next()
+
+"""
+Server:
+What a HealthAware Balancer knows about one server.
+"""
+class Server(object):
+    '''The health of one server'''
+    __slots__ = ("address", "latency", "errors", "ejected", "retry", "backoff",)
+
+    def __init__(self, address, backoff):
+        self.address = address
+        self.latency = None # EWMA of the request latency, None until the first request.
+        self.errors = 0 # Consecutive failures.
+        self.ejected = False
+        self.retry = 0 # When an ejected server is probed again.
+        self.backoff = backoff
+
+"""
+HealthAware:
+Tracks the latency (as an exponentially weighted moving average) and the
+consecutive failures of every server, and chooses the faster of two
+random healthy servers. A server that fails @errors times in a row is
+ejected for @backoff seconds; A Prober thread probes ejected servers when
+their backoff runs out and readmits them when they accept a connection,
+every failed probe doubles the backoff, up to @limit seconds. When every
+server is ejected the one that is due to be probed first is chosen.
+
+balancer :
+    name : health
+    decay : 0.3     # The weight of the latest latency in the moving average
+    errors : 3      # Consecutive failures before a server is ejected
+    backoff : 1.0   # Seconds before an ejected server is probed for the first time
+    limit : 60.0    # The most seconds between two probes
+"""
+class HealthAware(Balancer):
+    '''Prefers the fastest healthy servers'''
+
+    def __init__(self, servers, timeout = 30, decay = 0.3, errors = 3, backoff = 1.0, limit = 60.0):
+        '''Tracks the health of @servers'''
+        assert 0 < decay <= 1, "decay must be in (0, 1]"
+        unique = sorted(set(servers), key = list(servers).index)
+        self.servers = [Server(address, backoff) for address in unique]
+        self.addresses = dict((server.address, server) for server in self.servers)
+        self.decay, self.errors, self.backoff, self.limit = decay, errors, backoff, limit
+        self.timeout = min(timeout, 5.0)
+        self.lock = RLock()
+        self.prober = None
+
+    def choose(self):
+        '''Returns the faster of two random healthy servers'''
+        with self.lock:
+            healthy = [server for server in self.servers if not server.ejected]
+            if not healthy:
+                return min(self.servers, key = lambda server: server.retry).address
+            if len(healthy) == 1:
+                return healthy[0].address
+            first, second = random.sample(healthy, 2)
+            return min(first, second, key = lambda server: server.latency or 0.0).address
+
+    def succeeded(self, address, elapsed):
+        '''Folds @elapsed into the latency of @address'''
+        with self.lock:
+            server = self.addresses.get(address)
+            if server is None:
+                return
+            if server.latency is None:
+                server.latency = elapsed
+            else:
+                server.latency += self.decay * (elapsed - server.latency)
+            server.errors = 0
+
+    def failed(self, address, error = None):
+        '''Counts a failure of @address, and ejects it after @errors failures in a row'''
+        with self.lock:
+            server = self.addresses.get(address)
+            if server is None:
+                return
+            server.errors += 1
+            if server.ejected or server.errors < self.errors:
+                return
+            self.eject(server)
+
+    def eject(self, server):
+        '''Stops choosing @server until a probe of it succeeds'''
+        logging.warning("Ejecting server: %s for %ss after %s failures" % (server.address, server.backoff, server.errors))
+        server.ejected = True
+        server.retry = time.time() + server.backoff
+        server.backoff = min(server.backoff * 2, self.limit)
+        if self.prober is None:
+            self.prober = Prober(self)
+        self.prober.pending.set()
+
+    def readmit(self, server):
+        '''Chooses @server again'''
+        logging.info("Readmitting server: %s" % server.address)
+        server.ejected, server.errors = False, 0
+        server.latency, server.backoff = None, self.backoff
+
+    def probe(self, address):
+        '''Does @address accept connections?'''
+        host, port = address.split(":")
+        transport = TSocket.TSocket(host, int(port))
+        transport.setTimeout(self.timeout * 1000.0)
+        try:
+            transport.open()
+            transport.close()
+            return True
+        except FAILURES:
+            return False
+
+    def due(self):
+        '''Returns the ejected servers whose backoff ran out, and when the next one runs out'''
+        with self.lock:
+            now, due, next = time.time(), [], None
+            for server in self.servers:
+                if not server.ejected:
+                    continue
+                if server.retry <= now:
+                    due.append(server)
+                    server.retry = now + self.limit # Don't probe it twice at once.
+                elif next is None or server.retry < next:
+                    next = server.retry
+            if not due and next is None:
+                self.prober.pending.clear()
+            return due, next
+
+    def check(self, server):
+        '''Probes @server, and readmits it or backs off again'''
+        healthy = self.probe(server.address)
+        with self.lock:
+            if healthy:
+                self.readmit(server)
+            else:
+                self.eject(server)
+
+    def stats(self):
+        '''Returns the latency, failures and state of every server'''
+        with self.lock:
+            return dict((server.address, {"latency" : server.latency, "errors" : server.errors,
+                "ejected" : server.ejected}) for server in self.servers)
+
+"""
+Prober:
+A Thread that probes the servers a HealthAware Balancer ejected, it
+sleeps while no server is ejected.
+"""
+class Prober(Thread):
+    """Probes ejected servers when their backoff runs out"""
+    def __init__(self, balancer):
+        super(Prober, self).__init__()
+        self.balancer = balancer
+        self.pending = Event()
+        self.name = "PROBER"
+        self.daemon = True
+        self.start()
+
+    def run(self):
+        """Probes the servers that are due, and sleeps until the next one is"""
+        while True:
+            self.pending.wait()
+            due, next = self.balancer.due()
+            for server in due:
+                self.balancer.check(server)
+            if not due and next is not None:
+                time.sleep(min(max(next - time.time(), 0), self.balancer.backoff))
+
+"""
+Ring:
+Maps row keys to the servers that own them, from the token ranges that
+describe_ring returns; It knows how the Random, ByteOrdered and Order
+Preserving partitioners turn keys into tokens, Rings of clusters that
+use any other partitioner are empty, and own no keys.
+
+ring = Ring(conn.client.describe_ring(keyspace), conn.client.describe_partitioner(), 9160)
+ring.replicas("iroiso") # ["10.0.0.2:9160", "10.0.0.3:9160"]
+"""
+class Ring(object):
+    '''The servers that own every row key in a keyspace'''
+
+    def __init__(self, ranges, partitioner, port):
+        '''Creates a Ring from TokenRanges, the partitioner class name and the rpc port of the servers'''
+        self.partitioner = partitioner.split(".")[-1]
+        self.ends, self.owners = [], []
+        if tokenFor(self.partitioner, "") is None:
+            logging.warning("Can't route keys of clusters that use the %s" % self.partitioner)
+            return
+        self.parse = parse = long if self.partitioner == "RandomPartitioner" else str
+        for range in sorted(ranges, key = lambda range: parse(range.end_token)):
+            self.ends.append(parse(range.end_token))
+            self.owners.append(["%s:%s" % (endpoint, port) for endpoint in range.endpoints])
+
+    def replicas(self, id):
+        '''Returns the addresses of the servers that own row @id, the primary replica first'''
+        if not self.ends:
+            return []
+        if isinstance(id, unicode):
+            id = id.encode("utf-8")
+        index = bisect.bisect_left(self.ends, self.parse(tokenFor(self.partitioner, str(id))))
+        return self.owners[index % len(self.ends)]
+
+    def __len__(self):
+        '''The number of token ranges in this Ring'''
+        return len(self.ends)
+
+"""
+tokenFor:
+This returns the token that @partitioner assigns to the row @key
+in the string format that is used by KeyRanges and describe_ring,
+it returns None if it doesn't know how to compute the token.
+"""
+def tokenFor(partitioner, key):
+    '''Returns the token of @key for the partitioner class named @partitioner'''
+    name = partitioner.split(".")[-1]
+    if name == "RandomPartitioner":
+        value = long(hashlib.md5(key).hexdigest(), 16)
+        if value >= 2 ** 127: value -= 2 ** 128  # The token is the absolute value of a signed md5.
+        return str(abs(value))
+    elif name == "ByteOrderedPartitioner":
+        return binascii.hexlify(key)
+    elif name == "OrderPreservingPartitioner":
+        return key
+    return None
+
+BALANCERS = {"roundrobin" : RoundRobin, "health" : HealthAware,} # The Balancers you can name in the configuration.
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Caches that sit in front of Cassandra; Lisa reads rows from the cache
+of a namespace before it goes to Cassandra, updates cached rows when
+Models are saved and invalidates them when Models are deleted.
+"""
+import time
+import hashlib
+from threading import RLock
+from collections import OrderedDict
+
+__all__ = ["Cache", "LRUCache", "MemcacheCache",]
+
+"""
+Cache:
+The contract for all caches, caches are keyed by Key and store
+whatever Lisa puts in them, Every cache counts its hits, misses
+and evictions.
+"""
+class Cache(object):
+    '''The contract for all caches'''
+
+    def __init__(self):
+        '''Initializes the counters of this Cache'''
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def get(self, key):
+        '''Returns the value stored for @key or None'''
+        raise NotImplementedError
+
+    def peek(self, key):
+        '''Returns the value stored for @key or None, without counting a hit or miss'''
+        raise NotImplementedError
+
+    def put(self, key, value):
+        '''Stores @value for @key'''
+        raise NotImplementedError
+
+    def delete(self, key):
+        '''Removes @key from this Cache'''
+        raise NotImplementedError
+
+    def clear(self):
+        '''Removes everything in this Cache'''
+        raise NotImplementedError
+
+    def stats(self):
+        '''Returns the counters of this Cache'''
+        return {"hits" : self.hits, "misses" : self.misses, "evictions" : self.evictions}
+
+"""
+LRUCache:
+An in-process cache that holds at most @size entries, and
+serves every entry for at most @ttl seconds; When it is full the
+least recently used entry is evicted.
+
+cache = LRUCache(size=10000, ttl=60)
+"""
+class LRUCache(Cache):
+    '''A threadsafe Least Recently Used cache with expiration'''
+
+    def __init__(self, size=10000, ttl=60):
+        '''Creates an LRUCache with @size entries that expire after @ttl seconds'''
+        super(LRUCache, self).__init__()
+        assert size > 0, "An LRUCache must have room for at least one entry"
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = RLock()
+
+    @staticmethod
+    def id(key):
+        '''Keys are immutable, so entries are stored under @key itself'''
+        return key
+
+    def get(self, key):
+        '''Returns the value stored for @key or None, and marks it as recently used'''
+        id = self.id(key)
+        with self.lock:
+            entry = self.entries.pop(id, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires = entry
+            if self.ttl and expires < time.time():
+                self.misses += 1
+                self.evictions += 1
+                return None
+            self.entries[id] = entry
+            self.hits += 1
+            return value
+
+    def peek(self, key):
+        '''Returns the value stored for @key or None, without counting a hit or miss'''
+        with self.lock:
+            entry = self.entries.get(self.id(key), None)
+            if entry is None or (self.ttl and entry[1] < time.time()):
+                return None
+            return entry[0]
+
+    def put(self, key, value):
+        '''Stores @value for @key, evicting the least recently used entries if necessary'''
+        id = self.id(key)
+        with self.lock:
+            self.entries.pop(id, None)
+            self.entries[id] = (value, time.time() + self.ttl)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        '''Removes @key from this Cache'''
+        with self.lock:
+            self.entries.pop(self.id(key), None)
+
+    def clear(self):
+        '''Removes everything in this Cache'''
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        '''Returns the counters of this Cache and the number of entries in it'''
+        found = super(LRUCache, self).stats()
+        found["size"] = len(self.entries)
+        return found
+
+    def __len__(self):
+        '''The number of entries in this Cache'''
+        return len(self.entries)
+
+"""
+MemcacheCache:
+Adapts any client that speaks the memcached protocol e.g python-memcached
+or pylibmc, to the Cache contract. The client is expected to pickle
+values itself, The server does its own evictions, so they are not counted.
+
+import memcache
+cache = MemcacheCache(memcache.Client(["127.0.0.1:11211"]), ttl=300)
+"""
+class MemcacheCache(Cache):
+    '''A Cache that is stored in memcached'''
+
+    def __init__(self, client, ttl=60, prefix="homer:"):
+        '''Wraps @client, a memcached client; entries expire after @ttl seconds'''
+        super(MemcacheCache, self).__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def id(self, key):
+        '''Memcached keys are short and have no spaces, so keys are hashed'''
+        return self.prefix + hashlib.md5(repr(key)).hexdigest()
+
+    def get(self, key):
+        '''Returns the value stored for @key or None'''
+        value = self.client.get(self.id(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def peek(self, key):
+        '''Returns the value stored for @key or None, without counting a hit or miss'''
+        return self.client.get(self.id(key))
+
+    def put(self, key, value):
+        '''Stores @value for @key'''
+        self.client.set(self.id(key), value, self.ttl)
+
+    def delete(self, key):
+        '''Removes @key from this Cache'''
+        self.client.delete(self.id(key))
+
+    def clear(self):
+        '''Removes everything in the memcached servers'''
+        self.client.flush_all()
@@ -27,15 +27,15 @@ import re
 import time
 import atexit
 import codecs
-import binascii
+import random
 import logging
-import itertools
 import cPickle as pickle
 from copy import deepcopy
-from functools import wraps
 from traceback import print_exc
 from contextlib import contextmanager as Context
-from threading import Thread, local, RLock
+from threading import Thread, Event, Lock, local, RLock
+from collections import deque
+from weakref import WeakSet
 from Queue import Queue, Empty, Full
 
 from thrift import Thrift
@@ -46,16 +46,20 @@ from cql.cursor import Cursor
 from cql.cassandra import Cassandra
 from cql.cassandra.ttypes import *
 
-from homer.core.builtins import fields
-from homer.core.models import Type, Property, Schema
+from homer.core.models import Type, Property, Schema, Key
 from homer.options import Settings, ConfigurationError
+from homer.backend.cache import LRUCache
+from homer.backend.futures import Executor, Future
+from homer.backend.balancer import FAILURES, Ring, balancerFor, tokenFor
+from homer.backend.metrics import Histogram, sinkFor
+from homer.backend.retry import BROKEN, FAILED, READ, WRITE, SCHEMA, QUERY, Attempt, retried, policyFor
 
 # TODO 
 # 1. Investigate the effect of other strategy options here and test them on homer
 # 2. Write a sample block in the annotated sample configuration file  
 # 3. Add the configuration file to the Homer project folder.
 
-__all__ = ["CqlQuery", "Lisa", "Level", "FetchMode", "RoundRobinPool", "Connection", "ConnectionDisposedError", "store"]
+__all__ = ["CqlQuery", "RangeQuery", "Lisa", "Level", "FetchMode", "RoundRobinPool", "Connection", "ConnectionDisposedError", "Batch", "RowCache", "WriteBuffer", "Session", "cacheFor", "bufferFor", "store"]
 
 # MODULE EXCEPTIONS
 class ConnectionDisposedError(Exception):
@@ -83,33 +87,34 @@ __LOCK__ = RLock()
 __POOLS__ = dict()
 __KEYSPACES__ = set()
 __COLUMNFAMILIES__ = set()
+__PARTITIONERS__ = dict()
+__DEFINITIONS__ = dict()
+__CACHES__ = dict()
+__BUFFERS__ = dict()
+__EXECUTORS__ = dict()
+__SCHEDULER__ = []
 
 # CONSTANTS
 logging = logging.getLogger("homer") # Homer uses a single logging configuration id library wide to keep things simple.
 POOLED, CHECKEDOUT, DISPOSED = 0, 1, 2
-RETRY = 3
 FETCHSIZE = 2000000000 #AT MOST THE DB MODULE WILL TRY TO READ ALL THE COLUMNS
+CHUNKSIZE = 500 #THE MAXIMUM NUMBER OF ROWS THAT IS REQUESTED IN A SINGLE MULTIGET
+BATCHROWS = 1000 #THE MAXIMUM NUMBER OF ROWS THAT IS WRITTEN IN A SINGLE BATCH_MUTATE
+BATCHBYTES = 4 * 1024 * 1024 #KEEPS EVERY BATCH_MUTATE WELL BELOW THE THRIFT FRAME SIZE
+PAGESIZE = 1000 #THE NUMBER OF ROWS THAT IS HELD IN MEMORY WHEN ITERATING OVER A COLUMN FAMILY
+SPLITSIZE = 65536 #THE NUMBER OF ROWS IN EVERY TOKEN RANGE THAT A SCAN READS ON ITS OWN THREAD
+USE = re.compile(r"^\s*USE\s+[\"']?(\w+)", re.IGNORECASE) #MATCHES CQL STATEMENTS THAT SWITCH THE KEYSPACE OF A CONNECTION
+SWEEP = 1.0 #THE NUMBER OF SECONDS BETWEEN TWO MAINTENANCE PASSES OVER THE CONNECTION POOLS
+IDLETIME = 300 #THE DEFAULT NUMBER OF SECONDS A CONNECTION CAN BE IDLE BEFORE IT IS CLOSED
+RINGAGE = 60 #THE NUMBER OF SECONDS A POOL ROUTES REQUESTS WITH THE SAME RING BEFORE IT DESCRIBES THE RING AGAIN
+SYNC, ASYNC = "sync", "async" #WRITE BUFFERS EITHER WAIT UNTIL A WRITE IS FLUSHED, OR RETURN STRAIGHT AWAY
+WINDOW = 0.01 #THE DEFAULT NUMBER OF SECONDS A WRITE BUFFER COLLECTS WRITES BEFORE IT FLUSHES THEM
+HEDGESAMPLES = 100 #THE NUMBER OF REQUESTS A POOL TIMES BEFORE IT HEDGES READS AFTER A PERCENTILE OF THEIR LATENCY
 encoder = codecs.getencoder('utf-8')
 encode = lambda content: encoder(content)[0]
 
 
 # UTILITIES AND HELPER FUNCTIONS
-def redo(function):
-    '''Retries a particular operation for a fixed number of times until it fails'''
-    @wraps(function)
-    def do(*arguments, **keywords):
-        attempts = 1
-        while True:
-            try:
-                logging.debug('Calling: %s; count: %s' % (function.__name__, attempts))
-                return function(*arguments, **keywords)
-            except Exception, e:
-                if not attempts < RETRY:
-                    raise e
-                attempts += 1
-    return do
-
-
 """
 optionsFor:
 This returns a configuration option for a namespace if it exists
@@ -150,6 +155,70 @@ def poolFor(namespace):
             pool = __POOLS__[namespace]
     return pool   
 
+"""
+cacheFor:
+This returns the Cache for @namespace if it exists, if it doesn't
+exist yet it is created from the 'cache' options of @namespace.
+Namespaces without 'cache' options aren't cached, so this returns
+None for them. Lisa.useCache() plugs in any other Cache.
+"""
+def cacheFor(namespace):
+    '''Returns or creates the Cache for this namespace'''
+    if namespace not in __CACHES__:
+        options = optionsFor(namespace).get("cache", None)
+        cache = None
+        if options:
+            cache = LRUCache(options.get("size", 10000), options.get("ttl", 60))
+        with __LOCK__:
+            __CACHES__.setdefault(namespace, cache)
+    return __CACHES__[namespace]
+
+"""
+bufferFor:
+This returns the WriteBuffer for @namespace if it exists, if it doesn't
+exist yet it is created from the 'buffer' options of @namespace.
+Namespaces without 'buffer' options write straight to Cassandra, so
+this returns None for them.
+"""
+def bufferFor(namespace):
+    '''Returns or creates the WriteBuffer for this namespace'''
+    if namespace not in __BUFFERS__:
+        options = optionsFor(namespace).get("buffer", None)
+        buffer = WriteBuffer(namespace, **options) if options else None
+        with __LOCK__:
+            __BUFFERS__.setdefault(namespace, buffer)
+    return __BUFFERS__[namespace]
+
+"""
+executorFor:
+This returns the Executor that runs Lisa.submit() for @namespace, it has
+as many workers as the connection pool of @namespace has connections, and
+at most 'backlog' operations wait for a worker.
+"""
+def executorFor(namespace):
+    '''Returns or creates the Executor for this namespace'''
+    with __LOCK__:
+        if namespace not in __EXECUTORS__:
+            options = optionsFor(namespace)
+            size = options['size']
+            name = "LISA-WORKER: %s" % namespace
+            __EXECUTORS__[namespace] = Executor(size, options.get("backlog", size), name)
+        return __EXECUTORS__[namespace]
+
+"""
+scheduler:
+Returns the Scheduler that maintains every connection pool, it
+is started the first time it is needed; It disposes the pools it
+still maintains at System Exit.
+"""
+def scheduler():
+    '''Returns or starts the Scheduler'''
+    with __LOCK__:
+        if not __SCHEDULER__:
+            __SCHEDULER__.append(Scheduler())
+            atexit.register(__SCHEDULER__[0].disposeAll)
+        return __SCHEDULER__[0]
+
 """
 keyspaceFor:
 This returns the keyspace for @namespace if one is configured for it.
@@ -165,6 +234,26 @@ def keyspaceFor(namespace):
         raise ConfigurationError("Couldn't found a keyspace specified for in namespace: %s" % namespace)
     return keyspace
 
+"""
+predicateFor:
+This returns the SlicePredicate that is used to read the columns
+of the Model that @key points to in the specified @fetchmode.
+"""
+def predicateFor(key, fetchmode):
+    '''Returns the SlicePredicate that reads @key with @fetchmode'''
+    predicate = None
+    if fetchmode == FetchMode.Property:
+        if key.columns:
+            predicate = SlicePredicate(column_names = key.columns)
+        else:
+            type = Schema.ClassForModel(key.namespace, key.kind)
+            names = Schema.CodecFor(type).properties.keys() 
+            columns = list(names)
+            predicate = SlicePredicate(column_names = columns)
+    elif fetchmode == FetchMode.All:
+        range = SliceRange(start='', finish='', count = FETCHSIZE )
+        predicate = SlicePredicate(slice_range=range)
+    return predicate
 
 # CONTROLLING CONSISTENCY   
 """
@@ -222,30 +311,159 @@ for connections to the db or the cache.
 class Pool(object):
     '''Implements Load balancing for a Cluster'''
     
-    def get(self):
-        '''Yields a valid connection to this Keyspace'''
+    def get(self, id = None, avoid = ()):
+        '''Yields a valid connection to this Keyspace, preferably to a replica of row @id and not to @avoid'''
         raise NotImplementedError
+
+    def replicas(self, id):
+        '''Returns the addresses of the servers that own row @id, or [] if they aren't known'''
+        return []
+
+    def owner(self, id):
+        '''Returns the address of the primary replica of row @id, or None if it isn't known'''
+        replicas = self.replicas(id)
+        return replicas[0] if replicas else None
         
     def put(self, connection):
         """Returns a Connection from the pool"""
         raise NotImplementedError
+
+    def report(self, connection, elapsed = None, error = None):
+        '''Records that a request on @connection took @elapsed seconds or failed with @error'''
+        pass
+
+    def hedgeAfter(self):
+        '''Returns the seconds a read waits before it is sent to another server too, or None if it isn't hedged'''
+        return None
+
+    def stats(self):
+        '''Returns the counters of this Pool'''
+        return {}
     
     def disposeAll(self):
         '''Clears all the connections in this Pool'''
         raise NotImplementedError
 
+"""
+using:
+Checks out a Connection for a block and returns it afterwards, even if
+the block fails; Connections that broke are disposed instead. Inside a
+@retried operation it records the pool and the servers that failed, so
+the next attempt can go to another server.
+"""
 @Context
-def using(Pool):
-    '''Fetches an Connection using @Pool and returns after use'''
-    connection = Pool.get()
-    yield connection
+def using(Pool, id = None, avoid = ()):
+    '''Fetches an Connection using @Pool and returns after use, @id routes it to a replica of that row'''
+    attempt = Attempt.current()
+    if attempt is not None:
+        attempt.pool = Pool
+        avoid = attempt.avoid.union(avoid) if avoid else attempt.avoid
+    connection = Pool.get(id, avoid)
+    if attempt is not None:
+        attempt.sent = True
+    start = time.time()
+    try:
+        yield connection
+    except BROKEN as e:
+        Pool.report(connection, error = e)
+        connection.dispose()
+        if attempt is not None:
+            attempt.avoid.add(connection.address)
+        raise
+    except FAILED as e:
+        Pool.report(connection, error = e)
+        Pool.put(connection)
+        if attempt is not None:
+            attempt.avoid.add(connection.address)
+        raise
+    except:
+        Pool.put(connection)
+        raise
+    Pool.report(connection, elapsed = time.time() - start)
     Pool.put(connection)   
 
+"""
+hedged:
+Returns request(connection) for a Connection of @Pool, like using(); When
+the pool hedges reads, and the request didn't finish within its hedge
+delay, it is sent to another server too and whichever finishes first
+wins. The loser can't be cancelled, it finishes in the background and
+its result is discarded, so only requests that don't change anything
+should be hedged.
+"""
+def hedged(Pool, request, id = None):
+    '''Runs request(connection), and hedges it on another server if it is slow'''
+    delay = Pool.hedgeAfter()
+    if delay is None:
+        with using(Pool, id) as conn:
+            return request(conn)
+    context = Attempt.current() or Attempt()
+    context.pool = Pool
+    hedger = Pool.hedger()
+    outcome, busy, running, lock = Future(), [], [1], Lock()
+    def attempt():
+        '''Sends the request to a server that isn't busy with it yet'''
+        Attempt.attempts.current = context
+        try:
+            with using(Pool, id, busy) as conn:
+                busy.append(conn.address)
+                return request(conn)
+        finally:
+            Attempt.attempts.current = None
+    def finished(done):
+        '''The first request that succeeds wins, the read fails if every request failed'''
+        if done.error is None:
+            outcome.setResult(done)
+            return
+        with lock:
+            running[0] -= 1
+            last = running[0] == 0
+        if last:
+            outcome.setException(done.error, done.trace)
+    def hedge():
+        '''Sends the request again, unless it finished or the hedge workers are all busy'''
+        with lock:
+            if outcome.done() or hedger.executor.queue.full():
+                return
+            running[0] += 1
+        hedger.executor.submit(attempt).addCallback(finished)
+        Pool.hedged()
+    primary = hedger.executor.submit(attempt)
+    primary.addCallback(finished)
+    hedger.schedule(time.time() + delay, hedge)
+    winner = outcome.result()
+    if winner is not primary:
+        Pool.hedged(won = True)
+    return winner.value
+
 """
 RoundRobinPool:
 This provides threadsafe client side load balancing for a Cassandra cluster, 
-It reuses addresses that are preconfigured in a round robin fashion.
+It opens connections to the servers its Balancer chooses, which by
+default are the preconfigured addresses in a round robin fashion.
+With the 'routing' option, requests for a row go to a connection to
+one of its replicas, according to the ring that describe_ring returns.
+
+Idle connections are kept in a deque that is guarded by a Lock;
+Threads that wait for a connection queue up and release the lock while
+they wait, and are handed connections in the order they arrived. New
+connections are opened outside the lock, so a slow connect or a waiting
+thread never holds up the threads that return connections. A Watchdog
+times out the threads that waited longer than @timeout.
+
+The Scheduler closes idle connections that weren't used for 'idletime'
+seconds, or that are more than @maxIdle, connections are recycled after
+'recycle' seconds, and at least 'warm' connections are kept open; With
+'prewarm' the pool opens them when it is created. Operations that use
+the pool are retried according to its RetryPolicy (@self.retry).
+
+With 'hedge' options, reads that are slower than a fixed delay or than
+a percentile of the latency of the requests of the pool are sent to a
+second server by the Hedger of the pool, see hedged().
 
+stats() returns what the pool is doing right now and counters since it
+was created, every checkout, connection and timeout is also sent to the
+metrics Sink of the pool (@self.metrics) if it has one.
 """
 class RoundRobinPool(Pool):
     '''Implements Load balancing for a Cluster'''
@@ -253,73 +471,445 @@ class RoundRobinPool(Pool):
         '''Configures a RoundRobinPool with a PoolOption object'''
         self.count = 0
         self.maxConnections = options['size']
-        self.queue = Queue(options['size'])
+        self.idle = deque()
         self.keyspace = options['keyspace']
         self.maxIdle = options['idle']
         self.timeout = options['timeout']
-        self.evictionDelay = options['recycle']
+        self.lifetime = options['recycle']
+        self.idletime = options.get('idletime', IDLETIME)
+        self.warm = min(options.get('warm', 0), self.maxConnections)
         self.servers = options['servers']
         self.username = options['username']
         self.password = options['password']
-        self.evictionThread = EvictionThread(self, self.maxIdle, self.evictionDelay)
-        self.cycle = None
-        self.lock = RLock()
-        atexit.register(self.disposeAll)
+        self.balancer = balancerFor(options)
+        self.retry = policyFor(options)
+        self.routing = options.get('routing', False)
+        self.pinned = options.get('pinned', False)
+        self.ring, self.described = None, 0
+        self.lock = Lock()
+        self.waiters = deque()
+        self.metrics = sinkFor(options)
+        self.waits, self.connects = Histogram(), Histogram()
+        self.created, self.disposed, self.timeouts, self.failures = 0, 0, 0, 0
+        self.hedging = options.get('hedge', None)
+        self.requests = Histogram()
+        self.hedges, self.wins = 0, 0
+        self.opened = dict() # THE NUMBER OF OPEN CONNECTIONS TO EVERY SERVER
+        self.watchdog = None
+        self.hedgers = []
+        if options.get('prewarm', False):
+            self.fill(self.warm)
+        scheduler().add(self)
         
-    def get(self):
+    def get(self, id = None, avoid = ()):
         '''Yields a valid connection to this Keyspace, in a Thread safe way'''
+        start = time.time()
+        try:
+            connection = self.checkout(id, avoid)
+        except TimedOutException:
+            with self.lock:
+                self.timeouts += 1
+            self.emit("increment", "pool.timeouts", 1)
+            raise
+        elapsed = time.time() - start
         with self.lock:
-            try:
-                return self.queue.get(False)
-            except Empty:
-                #IF WE ARE UNDER QUOTA JUST CREATE A NEW CONNECTION
-                if self.count < self.maxConnections:  
-                    addr = self.__address().next()
-                    logging.info("Creating a new connection to address: %s" % addr)
-                    connection = Connection(self, addr, \
-                        self.keyspace, self.username, self.password)
-                    self.count += 1
+            self.waits.record(elapsed)
+        self.emit("timing", "pool.checkout", elapsed)
+        return connection
+
+    def checkout(self, id, avoid = ()):
+        '''Takes an idle Connection, preferably to a replica of row @id that isn't in @avoid, or opens one or waits for one'''
+        replicas = self.replicas(id) if id is not None else []
+        if avoid:
+            replicas = [address for address in replicas if address not in avoid]
+        with self.lock:
+            connection = self.find(replicas, avoid)
+            if connection is not None:
+                connection.state = CHECKEDOUT
+                return connection
+            #IF WE ARE UNDER QUOTA RESERVE A SLOT, AND CREATE THE CONNECTION OUTSIDE THE LOCK
+            if self.count < self.maxConnections:
+                self.count += 1
+                connection = None
+            else:
+                connection = self.wait()
+            if connection is not None:
+                return connection
+        try:
+            return self.open(random.choice(replicas) if replicas else None, avoid)
+        except:
+            with self.lock:
+                self.release()
+            raise
+
+    def find(self, replicas, avoid = ()):
+        '''Takes the latest idle Connection to one of @replicas, or to any server but @avoid, called with the lock held'''
+        if not self.idle:
+            return None
+        wanted = replicas or [address for address in self.servers if address not in avoid]
+        if replicas or avoid:
+            for index in xrange(len(self.idle) - 1, -1, -1):
+                if self.idle[index].address in wanted:
+                    connection = self.idle[index]
+                    del self.idle[index]
                     return connection
-                # IF WE ARE OVER QUOTA FORCE THE REQUEST TO WAIT FOR @self.timeout
-                else:  
-                    try:
-                        return self.queue.get(True, self.timeout)
-                    except Empty: raise TimedOutException("Sorry, your request has Timed Out")
-          
-    def __address(self):
-        '''Returns an address from this servers pool in a round robin fashion'''
-        # THIS CALL IS NOT THREADSAFE, IT IS FOR INTERNAL USE ONLY.
-        if not self.cycle:
-            self.cycle = itertools.cycle(self.servers)
-        for addr in self.cycle:
-            yield addr
+            if self.count < self.maxConnections:
+                return None # OPEN A CONNECTION TO A REPLICA OR ANOTHER SERVER INSTEAD
+        return self.idle.pop()
+
+    def replicas(self, id):
+        '''Returns the addresses of the servers that own row @id, from a ring that is described every RINGAGE seconds'''
+        if not self.routing:
+            return []
+        if time.time() - self.described > RINGAGE:
+            self.described = time.time()
+            try:
+                with using(self) as conn:
+                    ranges = conn.client.describe_ring(self.keyspace)
+                    partitioner = conn.client.describe_partitioner()
+                self.ring = Ring(ranges, partitioner, self.servers[0].split(":")[1])
+            except Exception as e:
+                logging.error("Couldn't describe the ring of %s, error: %s" % (self.keyspace, e))
+                self.ring = None
+        return self.ring.replicas(id) if self.ring is not None else []
+
+    def open(self, address = None, avoid = ()):
+        '''Opens a Connection to @address or to a server the Balancer chooses, trying each server at most once'''
+        for attempt in range(len(self.servers)):
+            if address is None or attempt:
+                address = self.choose(avoid)
+            try:
+                logging.info("Creating a new connection to address: %s" % address)
+                start = time.time()
+                connection = self.connect(address)
+                elapsed = time.time() - start
+            except FAILURES as e:
+                logging.error("Couldn't connect to: %s, error: %s" % (address, e))
+                self.balancer.failed(address, e)
+                with self.lock:
+                    self.failures += 1
+                self.emit("increment", "pool.failures", 1)
+                error = e
+                continue
+            with self.lock:
+                self.created += 1
+                self.opened[address] = self.opened.get(address, 0) + 1
+                self.connects.record(elapsed)
+            self.emit("increment", "pool.created", 1)
+            self.emit("timing", "pool.connect", elapsed)
+            return connection
+        raise error
+
+    def choose(self, avoid = ()):
+        '''Returns the server the Balancer chooses, it chooses again a few times if that server is in @avoid'''
+        address = self.balancer.choose()
+        for attempt in range(len(self.servers)):
+            if address not in avoid:
+                break
+            address = self.balancer.choose()
+        return address
+
+    def wait(self):
+        '''Waits in line for a Connection or a free slot, called with the lock held'''
+        waiter = Waiter(time.time() + self.timeout)
+        self.waiters.append(waiter)
+        if self.watchdog is None:
+            self.watchdog = Watchdog(self)
+        if len(self.waiters) == 1:
+            self.watchdog.pending.set()
+        self.lock.release()
+        try:
+            waiter.lock.acquire() # BLOCKS UNTIL A CONNECTION, A SLOT OR THE WATCHDOG WAKES US UP
+        finally:
+            self.lock.acquire()
+        if waiter.expired:
+            raise TimedOutException("Sorry, your request has Timed Out")
+        return waiter.connection
+
+    def expire(self):
+        '''Wakes up the threads that waited past their deadline, and returns when the next one expires'''
+        with self.lock:
+            now = time.time()
+            while self.waiters and self.waiters[0].deadline <= now:
+                self.waiters.popleft().wake(expired = True)
+            if self.waiters:
+                return self.waiters[0].deadline
+            self.watchdog.pending.clear()
+
+    def release(self):
+        '''Frees a slot, and hands it to the first waiting thread, called with the lock held'''
+        if self.waiters:
+            self.waiters.popleft().wake()
+        else:
+            self.count -= 1
+
+    def connect(self, address):
+        '''Opens a new Connection to @address'''
+        keyspace = self.keyspace if self.pinned else None
+        return Connection(self, address, keyspace, self.username, self.password)
           
     def put(self, connection):
-        """Returns a Connection to the pool in a threadsafe way"""
+        """Returns a Connection to the pool in a threadsafe way, Connections older than @self.lifetime are closed"""
+        now = time.time()
+        with self.lock:
+            if connection.state != CHECKEDOUT or not connection.open:
+                return
+            if not self.lifetime or now - connection.created <= self.lifetime:
+                if self.waiters:
+                    self.waiters.popleft().wake(connection)
+                    return
+                connection.state = POOLED
+                connection.returned = now
+                self.idle.append(connection)
+                return
+        logging.info("Recycling a connection to: %s" % connection.address)
+        connection.dispose()
+
+    def report(self, connection, elapsed = None, error = None):
+        '''Tells the Balancer how a request on @connection went'''
+        if error is not None:
+            self.balancer.failed(connection.address, error)
+            return
+        self.balancer.succeeded(connection.address, elapsed)
+        if self.hedging:
+            with self.lock:
+                self.requests.record(elapsed)
+
+    def hedgeAfter(self):
+        '''Returns the seconds a read waits before it is sent to another server too, or None if it isn't hedged'''
+        if not self.hedging:
+            return None
+        delay = self.hedging.get("delay", "p95")
+        if isinstance(delay, basestring): # A PERCENTILE LIKE 'p95'
+            with self.lock:
+                if self.requests.count < HEDGESAMPLES:
+                    return None
+                delay = self.requests.percentile(float(delay.lstrip("pP")) / 100)
+        return max(delay, self.hedging.get("minimum", 0.0))
+
+    def hedger(self):
+        '''Returns the Hedger of this pool, it is started the first time it is needed'''
+        with self.lock:
+            if not self.hedgers:
+                self.hedgers.append(Hedger(self, self.hedging.get("workers", self.maxConnections)))
+            return self.hedgers[0]
+
+    def hedged(self, won = False):
+        '''Counts a read that was hedged, or whose hedge finished first'''
+        with self.lock:
+            if won:
+                self.wins += 1
+            else:
+                self.hedges += 1
+        self.emit("increment", "pool.hedge.wins" if won else "pool.hedges", 1)
+
+    def discard(self, connection):
+        '''Forgets a Connection that was disposed, so a waiting thread can open another'''
+        with self.lock:
+            self.release()
+            self.disposed += 1
+            self.opened[connection.address] = self.opened.get(connection.address, 1) - 1
+        self.emit("increment", "pool.disposed", 1)
+
+    def emit(self, kind, name, value):
+        '''Sends a measurement to the metrics Sink of this pool, if it has one'''
+        sink = self.metrics
+        if sink is None:
+            return
+        try:
+            getattr(sink, kind)(name, value)
+        except Exception as e:
+            logging.error("The metrics sink of %s failed: %s" % (self.keyspace, e))
+
+    def stats(self):
+        '''Returns the connections, waiters, checkout waits and counters of this pool'''
+        with self.lock:
+            found = {"size" : self.maxConnections, "open" : self.count, "idle" : len(self.idle),
+                "busy" : self.count - len(self.idle), "waiters" : len(self.waiters), "created" : self.created,
+                "disposed" : self.disposed, "timeouts" : self.timeouts, "failures" : self.failures,
+                "checkouts" : self.waits.count, "wait" : self.waits.snapshot(), "connect" : self.connects.snapshot(),
+                "servers" : dict(self.opened), "hedges" : self.hedges, "wins" : self.wins,
+                "request" : self.requests.snapshot()}
+        found["balancer"] = self.balancer.stats()
+        return found
+
+    def publish(self):
+        '''Sends the number of busy and idle Connections and waiters to the metrics Sink'''
+        if self.metrics is None:
+            return
+        with self.lock:
+            busy, idle, waiters = self.count - len(self.idle), len(self.idle), len(self.waiters)
+        self.emit("gauge", "pool.busy", busy)
+        self.emit("gauge", "pool.idle", idle)
+        self.emit("gauge", "pool.waiters", waiters)
+
+    def maintain(self):
+        '''Closes the idle Connections that are too old, idle for too long or too many, and keeps @self.warm open'''
+        now, expired, kept = time.time(), [], deque()
         with self.lock:
+            for connection in self.idle: # THE LEAST RECENTLY USED FIRST
+                old = self.lifetime and now - connection.created > self.lifetime
+                unused = now - connection.returned > self.idletime and self.count - len(expired) > self.warm
+                if old or unused:
+                    expired.append(connection)
+                else:
+                    kept.append(connection)
+            while len(kept) > self.maxIdle:
+                expired.append(kept.popleft())
+            self.idle = kept
+        for connection in expired:
+            connection.dispose()
+        if expired:
+            logging.info("Closed %s idle connections, idle connections: %s" % (len(expired), len(kept)))
+        self.fill(self.warm)
+        self.publish()
+        return len(expired)
+
+    def fill(self, connections):
+        '''Opens idle Connections until @connections are open, and returns how many it opened'''
+        opened = 0
+        while True:
+            with self.lock:
+                if self.count >= min(connections, self.maxConnections):
+                    return opened
+                self.count += 1
             try:
-                if connection.state == CHECKEDOUT:
-                    self.queue.put(connection)
-                    connection.state == POOLED       
-            except Full:
-                connection.dispose()
+                connection = self.open()
+            except Exception as e:
+                logging.error("Couldn't open a warm connection to %s: %s" % (self.keyspace, e))
+                with self.lock:
+                    self.release()
+                return opened
+            self.put(connection)
+            opened += 1
+
+    def qsize(self):
+        '''The number of idle Connections in the pool'''
+        return len(self.idle)
     
     def disposeAll(self):
-        '''Disposes all the Connections in the Pool, typically called at System Exit'''
+        '''Disposes all the Connections in the Pool and stops maintaining it, typically called at System Exit'''
+        scheduler().remove(self)
         with self.lock:
-            logging.info("Pool Shutdown: Disposing: the %s remaining Connections" % self.queue.qsize())
-            while True:
-                try:
-                    connection = self.queue.get(False)
-                    connection.dispose()
-                except Empty:
-                    break
+            connections = list(self.idle)
+            self.idle.clear()
+            hedgers, self.hedgers = self.hedgers, []
+        for hedger in hedgers:
+            hedger.stop()
+        logging.info("Pool Shutdown: Disposing: the %s remaining Connections" % len(connections))
+        for connection in connections:
+            connection.dispose()
     
+"""
+Waiter:
+A thread that is waiting in line for a Connection; It sleeps on its own
+Lock, and is woken up with a Connection, with a free slot (connection is
+None) or because it expired.
+"""
+class Waiter(object):
+    '''A thread that is waiting for a Connection'''
+    __slots__ = ("lock", "deadline", "connection", "expired")
+
+    def __init__(self, deadline):
+        '''Creates a Waiter that expires at @deadline'''
+        self.lock = Lock()
+        self.lock.acquire()
+        self.deadline = deadline
+        self.connection = None
+        self.expired = False
+
+    def wake(self, connection = None, expired = False):
+        '''Wakes up the waiting thread with @connection'''
+        self.connection, self.expired = connection, expired
+        self.lock.release()
+
+"""
+Watchdog:
+A Thread that times out the threads that waited too long for a Connection;
+Every waiter has the same timeout, so the first in line expires first.
+"""
+class Watchdog(Thread):
+    """Times out the threads waiting for a Connection from a pool"""
+    def __init__(self, pool):
+        super(Watchdog, self).__init__()
+        self.pool = pool
+        self.pending = Event()
+        self.name = "WATCHDOG: %s" % pool.keyspace
+        self.daemon = True
+        self.start()
+
+    def run(self):
+        """Sleeps until the first waiter expires, while there are waiters"""
+        while True:
+            self.pending.wait()
+            deadline = self.pool.expire()
+            if deadline is not None:
+                time.sleep(max(deadline - time.time(), 0))
+
+"""
+Hedger:
+A Thread that sends the second request of hedged reads, whose first
+request didn't finish within the hedge delay; Both requests run on the
+@executor of the Hedger, reads of a pool wait about as long before they
+are hedged, so they are kept in the order they started.
+"""
+class Hedger(Thread):
+    """Hedges the reads of a pool that are slow"""
+    def __init__(self, pool, workers):
+        super(Hedger, self).__init__()
+        self.executor = Executor(workers, workers, "HEDGE-WORKER: %s" % pool.keyspace)
+        self.reads = deque()
+        self.lock = Lock()
+        self.pending = Event()
+        self.stopped = False
+        self.name = "HEDGER: %s" % pool.keyspace
+        self.daemon = True
+        self.start()
+
+    def stop(self):
+        '''Stops this Hedger and its workers, the reads it didn't hedge yet aren't hedged'''
+        with self.lock:
+            self.stopped = True
+            self.pending.set()
+        self.executor.shutdown(False)
+
+    def schedule(self, deadline, hedge):
+        '''Calls @hedge at @deadline'''
+        with self.lock:
+            self.reads.append((deadline, hedge))
+            self.pending.set()
+
+    def run(self):
+        """Calls the hedges that are due, and sleeps until the next one is"""
+        while True:
+            self.pending.wait()
+            with self.lock:
+                if self.stopped:
+                    return
+                if not self.reads:
+                    self.pending.clear()
+                    continue
+                deadline, hedge = self.reads[0]
+                due = deadline <= time.time()
+                if due:
+                    self.reads.popleft()
+            if not due:
+                time.sleep(max(deadline - time.time(), 0))
+                continue
+            try:
+                hedge()
+            except Exception as e:
+                logging.exception("Couldn't hedge a read: %s" % e)
+
 ###
 # Connection:
-# A ThreadSafe wrapper around Cassandra.Client which supports connection pooling.
+# A wrapper around Cassandra.Client which supports connection pooling, a
+# Connection is only used by the thread that checked it out of its pool.
+# It remembers the keyspace it uses, so set_keyspace is only sent when
+# the keyspace changes; Connections of pinned pools use the keyspace of
+# their pool from the start.
 ###
-class Connection(local):
+class Connection(object):
     """A convenient wrapper around the thrift client interface"""
     def __init__(self, pool, address, keyspace = None, username = None, password = None):
         '''Creates a Cassandra Client internally and initializes it'''
@@ -332,14 +922,17 @@ class Connection(local):
         protocol = TBinaryProtocol.TBinaryProtocolAccelerated(self.transport)
         self.pipe = Cassandra.Client(protocol)
         self.address = address
+        self.created = self.returned = time.time()
         self.state = CHECKEDOUT
         self.pool = pool
         self.transport.open()
         self.open = True
-        self.keyspace = keyspace
+        self.keyspace = None
         if username and password:
             request = AuthenticationRequest(credentials = {"username": username, "password": password})
             self.client.login(request)
+        if keyspace:
+            self.use(keyspace)
     
     @property      
     def client(self):
@@ -348,9 +941,15 @@ class Connection(local):
             return self.pipe
         raise ConnectionDisposedError("This Connection has already been Disposed")
     
+    def use(self, keyspace):
+        '''Switches this Connection to @keyspace, unless it already uses it'''
+        if keyspace != self.keyspace:
+            self.client.set_keyspace(keyspace)
+            self.keyspace = keyspace
+
     def cursor(self):
         '''Returns a low level CQL cursor'''
-        return Cursor(self)
+        return KeyspaceCursor(self)
             
     def toPool(self):
         '''Return this Connection to the Pool where it came from'''
@@ -363,35 +962,70 @@ class Connection(local):
         '''Close this connection and mark it as DISPOSED'''
         if self.open:
             self.transport.close()
-            self.pool.count -= 1
             self.state = DISPOSED
             self.open = False
+            self.pool.discard(self)
 
 """
-EvictionThread:
-A Thread that periodically looks in a Connection Pool to Evict
-excess Idle connections.
+KeyspaceCursor:
+A CQL cursor that tells its Connection when a USE statement
+switched the keyspace it uses.
 """
-class EvictionThread(Thread):
-    """Periodically evicts idle connections from the connection pool"""
-    def __init__(self, pool, maxIdle, delay):
-        from homer.options import Settings as options
-        super(EvictionThread, self).__init__()
-        self.pool = pool
-        self.maxIdle = maxIdle
-        self.delay = delay
-        self.name = "EVICTION-THREAD: %s" % pool.keyspace
+class KeyspaceCursor(Cursor):
+    '''A CQL cursor that keeps track of USE statements'''
+    def execute(self, query, params={}, decoder=None):
+        '''Executes @query, and records the keyspace it switched to'''
+        result = Cursor.execute(self, query, params, decoder)
+        found = USE.match(query)
+        if found:
+            self._connection.keyspace = found.group(1)
+        return result
+
+"""
+Scheduler:
+One Thread that maintains every connection pool; Every SWEEP seconds
+it closes the connections that each pool doesn't need any more, and
+opens the connections it keeps warm.
+"""
+class Scheduler(Thread):
+    """Periodically maintains all the connection pools"""
+    def __init__(self):
+        super(Scheduler, self).__init__()
+        self.pools = WeakSet()
+        self.lock = Lock()
+        self.name = "POOL-SCHEDULER"
         self.daemon = True
         self.start()
-        
+
+    def add(self, pool):
+        """Maintains @pool until it is removed or garbage collected"""
+        with self.lock:
+            self.pools.add(pool)
+
+    def remove(self, pool):
+        """Stops maintaining @pool"""
+        with self.lock:
+            self.pools.discard(pool)
+
+    def disposeAll(self):
+        """Disposes every pool that is still maintained, called at System Exit"""
+        with self.lock:
+            pools = list(self.pools)
+        for pool in pools:
+            pool.disposeAll()
+
     def run(self):
-        """Evicts Idle Connections periodically from a Connection Pool"""
+        """Maintains every pool, every SWEEP seconds"""
         while True:
-            if not self.pool.queue.qsize() <= self.maxIdle:
-                logging.info("Evicting Idle Connections, Queue Size: %s" % self.pool.queue.qsize())
-                connection = self.pool.queue.get(False)
-                connection.dispose()
-                time.sleep(self.delay/1000)
+            time.sleep(SWEEP)
+            with self.lock:
+                pools = list(self.pools)
+            for pool in pools:
+                try:
+                    pool.maintain()
+                except Exception as e:
+                    logging.exception("Maintaining the pool of %s failed: %s" % (pool.keyspace, e))
+            del pools
 
 ###
 # Cassandra Mapping Section;
@@ -436,24 +1070,17 @@ class CqlQuery(object):
             return keywords
 
         converted = {}
-        props = fields(self.kind, Property)
+        codec = Schema.CodecFor(self.kind)
         for name, value in keywords.items():
-            converter = props.get(name, None)
-            if converter:
-                value = converter.convert(value)
-                if not isinstance(value, basestring):
-                    value = str(value)
-                converted[name] = encode(value)
-            else:
-                T, V = self.kind.default
-                value = V.convert(value)
-                if not isinstance(value, basestring):
-                    value = str(value)
-                converted[name] = encode(value)
+            encoder = codec.encoders.get(name, None) or codec.converters(self.kind)[1].convert
+            value = encoder(value)
+            if not isinstance(value, basestring):
+                value = str(value)
+            converted[name] = encode(value)
         return converted
 
-    def execute(self):
-        '''Executes @self.query in self.keyspace and returns a cursor'''
+    def prepare(self):
+        '''Finds the keyspace of @self.kind and returns the parameters of @self.query'''
         # FIGURE OUT WHICH KEYSPACE THE MODEL BELONGS TO
         if not self.keyspace:
             self.namespace = Schema.Get(self.kind)[0] #Every Model is guaranteed to have a namespace at init time.
@@ -463,18 +1090,23 @@ class CqlQuery(object):
         if not self.kind.__name__ in __COLUMNFAMILIES__ and Settings.debug():
             logging.info("Creating new Column Family: %s " % self.kind.__name__)
             Lisa.create(self.kind())
-               
+
+        keywords = self.keywords
+        if self.convert:
+            logging.info("Converting parameters for query: %s" % self.query)
+            keywords = self.parse(keywords)
+        return dict(keywords)
+
+    @retried(QUERY, idempotent = lambda self: self.query.lstrip().upper().startswith("SELECT"))
+    def execute(self):
+        '''Executes @self.query in self.keyspace and returns a cursor, only SELECT queries are retried after they were sent'''
+        keywords = self.prepare()
         pool = poolFor(self.namespace)
         with using(pool) as conn:
             logging.info("Executing %s" % self)
-            conn.client.set_keyspace(self.keyspace)
+            conn.use(self.keyspace)
             cursor = conn.cursor()
-            
-            keywords = self.keywords
-            if self.convert:
-                logging.info("Converting parameters for query: %s" % self.query)
-                keywords = self.parse(keywords)
-            cursor.execute(self.query, dict(keywords))
+            cursor.execute(self.query, keywords)
             self.cursor = cursor
           
     def __iter__(self):
@@ -501,25 +1133,14 @@ class CqlQuery(object):
             if not description:
                 raise StopIteration
             names = [tuple[0] for tuple in description]
+            codec = Schema.CodecFor(self.kind)
             row = cursor.fetchone()
             while row:
                 model = self.kind()
-                descs = fields(model, Property)
-                values = {}
                 for name, value in zip(names, row):
                     if not value: continue
                     if name == "KEY": continue #Ignore the KEY attribute
-                    prop = descs.get(name, None)
-                    if prop:
-                        found = prop.deconvert(value)
-                        model[name] = found
-                    else:
-                        k, v = model.default
-                        k = k() if isinstance(k, type) else k
-                        v = v() if isinstance(v, type) else v
-                        name = k.deconvert(value)
-                        value = v.deconvert(value)
-                        model[name] = value
+                    codec.decode(model, name, value)
                 yield model
                 row = cursor.fetchone()
     
@@ -534,6 +1155,47 @@ class CqlQuery(object):
         '''String representation of a CQLQuery.'''
         return "[CqlQuery]: %s" % self.query
     
+"""
+RangeQuery:
+A RangeQuery walks every row of a column family in pages of @page
+rows, only one page is held in memory at any time, and Models are
+yielded lazily as they are deserialized.
+
+for book in RangeQuery(Book, page=500):
+    print book.name
+"""
+class RangeQuery(object):
+    '''Pages through all the Models of a kind'''
+
+    def __init__(self, kind, page=PAGESIZE, fetchmode=FetchMode.All):
+        '''Initialize constructor parameters '''
+        from homer.core.models import BaseModel
+        assert isinstance(kind, type), "%s must be a class" % kind
+        assert issubclass(kind, BaseModel), "%s must be a subclass of BaseModel" % kind
+        assert page > 0, "@page must be a positive number of rows"
+        self.kind = kind
+        self.page = page
+        self.fetchmode = fetchmode
+
+    def __iter__(self):
+        '''Yields Models one page at a time'''
+        namespace, kind = Schema.Get(self.kind)[:2]
+        if not kind in __COLUMNFAMILIES__ and Settings.debug():
+            logging.info("Creating new Column Family: %s " % kind)
+            Lisa.create(self.kind)
+        return Lisa.readRange(namespace, kind, self.page, self.fetchmode)
+
+    def fetchone(self):
+        '''Returns just one result'''
+        try:
+            return iter(self).next()
+        except StopIteration:
+            return None
+
+    def __str__(self):
+        '''String representation of a RangeQuery.'''
+        return "[RangeQuery]: %s in pages of %s" % (self.kind.__name__, self.page)
+
 '''
 Lisa:
 A Smarter, Neater and Simpler way to Use Cassandra.
@@ -559,6 +1221,7 @@ class Lisa(local):
     consistency = ConsistencyLevel.ONE #Consistency level for this copy of Lisa.
 
     @staticmethod
+    @retried(SCHEMA)
     def create(model):
         """Creates a new ColumnFamily from this Model"""
         from homer.core.models import key, Model
@@ -583,73 +1246,84 @@ class Lisa(local):
                     meta.makeIndexes(conn)
                     with __LOCK__:
                         __COLUMNFAMILIES__.add(kind)
+        except FAILED:
+            raise
         except:
             print_exc();
 
     @classmethod
+    @retried(READ)
     def readColumn(clasz, key, name):
         '''Read a particular property to the column specified via @key'''
-        assert key.iscomplete(), "Your key must be complete, before you can do reads"
+        assert key.complete(), "Your key must be complete, before you can do reads"
         pool = poolFor(key.namespace)
         path = ColumnPath(column_family=key.kind, column=name)
         cosc = None
-        with using(pool) as conn:
+        with using(pool, key.id) as conn:
             keyspace = keyspaceFor(key.namespace)
-            conn.client.set_keyspace(keyspace)
+            conn.use(keyspace)
             cosc = conn.client.get(key.id, path, clasz.consistency)
         column = cosc.column
         return column.value
         
     
     @classmethod
+    @retried(WRITE)
     def saveColumn(clasz, key, name, value, ttl=None):
         '''Write a particular property to the column specified via @key'''
-        assert key.iscomplete(), "Your key must be complete before you can do writes"
+        assert key.complete(), "Your key must be complete before you can do writes"
         pool = poolFor(key.namespace)
         timestamp = time.time()
         parent = ColumnParent(column_family=key.kind)
         column = Column(name=name, value=value, timestamp=timestamp)
         if ttl:
             column.ttl = ttl
-        cosc = None
-        with using(pool) as conn:
+        buffer = bufferFor(key.namespace)
+        if buffer is not None:
+            mutation = Mutation(column_or_supercolumn = ColumnOrSuperColumn(column = column))
+            buffer.add(key.id, {key.kind : [mutation]})
+            return
+        with using(pool, key.id) as conn:
             keyspace = keyspaceFor(key.namespace)
-            conn.client.set_keyspace(keyspace)
+            conn.use(keyspace)
             conn.client.insert(key.id, parent, column, clasz.consistency)
+        RowCache.invalidate(key)
         
 
     @classmethod
+    @retried(WRITE)
     def deleteColumn(clasz, key, name):
         '''Delete the property specified by @key'''
-        assert key.iscomplete(), "Your key must be complete before you can do writes"
+        assert key.complete(), "Your key must be complete before you can do writes"
         pool = poolFor(key.namespace)
         timestamp = time.time()
         path = ColumnPath(column_family=key.kind, column=name)
-        with using(pool) as conn:
+        with using(pool, key.id) as conn:
             keyspace = keyspaceFor(key.namespace)
-            conn.client.set_keyspace(keyspace)
+            conn.use(keyspace)
             cosc = conn.client.remove(key.id, path, timestamp, clasz.consistency)
+        RowCache.invalidate(key)
      
 
     @classmethod
+    @retried(READ)
     def readManyColumns(clasz, namespace, kind, id, *arguments):
-        '''Read various properties from one Model arguments: [name, name, name]'''
+        '''Read various properties from one Model arguments: [name, name, name], returns [(name, value)]'''
         assert namespace and kind and id, "specify namespace, kind, id"
         assert namespace and kind, "You must specify; namespace, kind"
         pool = poolFor(namespace)
         predicate = SlicePredicate(column_names=arguments)
         parent = ColumnParent(column_family=kind)
         result = None
-        with using(pool) as conn:
+        with using(pool, id) as conn:
             keyspace = keyspaceFor(namespace)
-            conn.client.set_keyspace(keyspace)
+            conn.use(keyspace)
             results = conn.client.get_slice(id, parent, predicate, clasz.consistency)
-        for cosc in results:
-            column = cosc.column
-            yield column.name, column.value
+        return [(cosc.column.name, cosc.column.value) for cosc in results] # A list, so the read runs inside @retried.
       
 
     @classmethod
+    @retried(WRITE)
     def saveManyColumns(clasz, namespace, kind, id, *arguments):
         '''Write a lot of properties in one batch, arguments: [(name, value)]'''
         # See Page 151 and Page 78 in the Cassandra Guide.
@@ -665,15 +1339,21 @@ class Lisa(local):
             mutation = Mutation()
             mutation.column_or_supercolumn = cosc
             mutations[kind].append(mutation)
+        buffer = bufferFor(namespace)
+        if buffer is not None:
+            buffer.add(id, mutations)
+            return
         changes = {id : mutations}
         pool = poolFor(namespace)
-        with using(pool) as conn:
+        with using(pool, id) as conn:
             keyspace = keyspaceFor(namespace)
-            conn.client.set_keyspace(keyspace)
+            conn.use(keyspace)
             conn.client.batch_mutate(changes, clasz.consistency)
+        RowCache.invalidate(Key(namespace, kind, id))
         
 
     @classmethod
+    @retried(WRITE)
     def deleteManyColumns(clasz, namespace, kind, id, *arguments):
         '''Delete a lot of properties in one batch, arguments: ["name", "name"]'''
         assert namespace and kind and id, 'specify arguments namespace, kind, id'
@@ -688,41 +1368,234 @@ class Lisa(local):
         mutations[kind].append(deletions)
         changes = {id : mutations}
         pool = poolFor(namespace)
-        with using(pool) as conn:
+        with using(pool, id) as conn:
             keyspace = keyspaceFor(namespace)
-            conn.client.set_keyspace(keyspace)
+            conn.use(keyspace)
             conn.client.batch_mutate(changes, clasz.consistency)
+        RowCache.invalidate(Key(namespace, kind, id))
 
    
     @classmethod
+    @retried(READ)
     def read(clasz, key, fetchmode=FetchMode.Property):
         '''Read a Model from Cassandra'''
         assert key and fetchmode, "specify key and fetchmode"
         assert key.complete(), "your key has to be complete"
+        session = Session.active()
+        if session is not None:
+            found = session.get(key, fetchmode)
+            if found is not None:
+                return found
+        coscs = RowCache.get(key, fetchmode)
+        if coscs is not None:
+            found = MetaModel.load(key, coscs)
+            if session is not None and found is not None:
+                session.add(found, fetchmode)
+            return found
         parent = ColumnParent(column_family = key.kind)
-        predicate = None
-        if fetchmode == FetchMode.Property:
-            if key.columns:
-                predicate = SlicePredicate(column_names = key.columns)
-            else:
-                type = Schema.ClassForModel(key.namespace, key.kind)
-                names = fields(type, Property).keys() 
-                columns = list(names)
-                predicate = SlicePredicate(column_names = columns)
-        elif fetchmode == FetchMode.All:
-            range = SliceRange(start='', finish='', count = FETCHSIZE )
-            predicate = SlicePredicate(slice_range=range)       
+        predicate = predicateFor(key, fetchmode)
         found = None
         pool = poolFor(key.namespace)
-        with using(pool) as conn:
-            keyspace = keyspaceFor(key.namespace)
-            conn.client.set_keyspace(keyspace)
-            coscs = conn.client.get_slice(key.id, parent, predicate, clasz.consistency)
-            found = MetaModel.load(key, coscs)
+        keyspace = keyspaceFor(key.namespace)
+        consistency = clasz.consistency
+        def request(conn):
+            '''Reads the row of @key'''
+            conn.use(keyspace)
+            return conn.client.get_slice(key.id, parent, predicate, consistency)
+        coscs = hedged(pool, request, key.id)
+        found = MetaModel.load(key, coscs)
+        RowCache.put(key, fetchmode, coscs)
+        if session is not None and found is not None:
+            session.add(found, fetchmode)
         return found    
 
-    
+
+    @classmethod
+    @retried(READ)
+    def readMany(clasz, *keys, **keywords):
+        '''Read a lot of Models with as few round trips as possible, misses are returned as None'''
+        fetchmode = keywords.pop("fetchmode", FetchMode.Property)
+        chunk = keywords.pop("chunk", CHUNKSIZE)
+        rows = keywords.pop("rows", False) # Returns read-only Rows, which skip the Session.
+        assert fetchmode and chunk > 0, "specify fetchmode and a positive chunk size"
+        # GROUP THE KEYS THAT AREN'T CACHED BY THE COLUMN FAMILY AND THE COLUMNS THEY ARE READ FROM
+        groups, found, loaded = {}, {}, {}
+        consistency = clasz.consistency
+        session = Session.active() if not rows else None
+        for key in keys:
+            assert key.complete(), "your keys have to be complete"
+            if session is not None:
+                model = session.get(key, fetchmode)
+                if model is not None:
+                    loaded[(key.namespace, key.kind, key.id)] = model
+                    continue
+            coscs = RowCache.get(key, fetchmode)
+            if coscs is not None:
+                found[(key.namespace, key.kind, key.id)] = coscs
+                continue
+            group = (key.namespace, key.kind, tuple(key.columns))
+            groups.setdefault(group, []).append(key)
+        for (namespace, kind, columns), members in groups.items():
+            parent = ColumnParent(column_family = kind)
+            predicate = predicateFor(members[0], fetchmode)
+            pool = poolFor(namespace)
+            keyspace = keyspaceFor(namespace)
+            # READ THE ROWS OF EVERY REPLICA IN THEIR OWN CHUNKS, FROM CONNECTIONS TO THAT REPLICA
+            owners = {}
+            for id in set(key.id for key in members):
+                owners.setdefault(pool.owner(id), []).append(id)
+            chunks = [ids[start: start + chunk] for ids in owners.values() for start in xrange(0, len(ids), chunk)]
+            for batch in chunks:
+                logging.info("Reading %s rows from %s in one batch" % (len(batch), kind))
+                def request(conn, batch = batch):
+                    '''Reads the rows of @batch'''
+                    conn.use(keyspace)
+                    return conn.client.multiget_slice(batch, parent, predicate, consistency)
+                for id, coscs in hedged(pool, request, batch[0]).items():
+                    found[(namespace, kind, id)] = coscs
+            for key in members:
+                RowCache.put(key, fetchmode, found.get((namespace, kind, key.id), None))
+        # DESERIALIZE THE MODELS IN THE ORDER THEY WERE REQUESTED.
+        results = []
+        load = MetaModel.row if rows else MetaModel.load
+        for key in keys:
+            id = (key.namespace, key.kind, key.id)
+            if id not in loaded:
+                loaded[id] = load(key, found.get(id, None))
+                if session is not None and loaded[id] is not None:
+                    session.add(loaded[id], fetchmode)
+            results.append(loaded[id])
+        return results
+
+    @classmethod
+    def readRange(clasz, namespace, kind, page=PAGESIZE, fetchmode=FetchMode.All, start='', finish='', tokens=False, raw=False, rows=False):
+        '''Yields the Models (or read-only Rows) between the keys or @tokens @start and @finish, reading @page rows at a time'''
+        assert namespace and kind and page > 0, "specify namespace, kind and a positive page size"
+        parent = ColumnParent(column_family = kind)
+        predicate = predicateFor(Key(namespace, kind), fetchmode)
+        partitioner = clasz.partitioner(namespace) if tokens else None
+        pool = poolFor(namespace)
+        keyspace = keyspaceFor(namespace)
+        def after(last):
+            '''Returns the KeyRange of the page that follows the row @last'''
+            if last is None:
+                if tokens:
+                    return KeyRange(start_token = start, end_token = finish, count = page)
+                return KeyRange(start_key = start, end_key = finish, count = page)
+            token = tokenFor(partitioner, last) if tokens else None
+            if token is not None: # TOKENS ARE START EXCLUSIVE, SO WE CONTINUE FROM THE LAST TOKEN.
+                return KeyRange(start_token = token, end_token = finish, count = page)
+            # KEYS ARE START INCLUSIVE, SO EVERY PAGE AFTER THE FIRST RE-READS THE LAST KEY.
+            if tokens:
+                return KeyRange(start_key = last, end_token = finish, count = page + 1)
+            return KeyRange(start_key = last, end_key = finish, count = page + 1)
+        last = None
+        while True:
+            range = after(last)
+            with using(pool) as conn:
+                conn.use(keyspace)
+                slices = conn.client.get_range_slices(parent, predicate, range, clasz.consistency)
+            for slice in slices:
+                if slice.key == last or not slice.columns: 
+                    continue # Skip the re-read row and deleted rows, which are returned without columns.
+                if raw:
+                    yield slice.key, dict((cosc.column.name, cosc.column.value) for cosc in slice.columns)
+                elif rows:
+                    yield MetaModel.row(Key(namespace, kind, slice.key), slice.columns)
+                else:
+                    yield MetaModel.load(Key(namespace, kind, slice.key), slice.columns)
+            if len(slices) < range.count or slices[-1].key == last:
+                break
+            last = slices[-1].key
+
+    @classmethod
+    @retried(READ)
+    def partitioner(clasz, namespace):
+        '''Returns the class name of the partitioner of the cluster that serves @namespace'''
+        if namespace not in __PARTITIONERS__:
+            with using(poolFor(namespace)) as conn:
+                found = conn.client.describe_partitioner()
+            with __LOCK__:
+                __PARTITIONERS__[namespace] = found
+        return __PARTITIONERS__[namespace]
+
+    @classmethod
+    @retried(READ)
+    def definition(clasz, namespace, refresh=False):
+        '''Returns the KsDef of the keyspace of @namespace, it is read from Cassandra once unless you @refresh it'''
+        if refresh or namespace not in __DEFINITIONS__:
+            with using(poolFor(namespace)) as conn:
+                found = conn.client.describe_keyspace(keyspaceFor(namespace))
+            with __LOCK__:
+                __DEFINITIONS__[namespace] = found
+                __KEYSPACES__.add(namespace)
+                __COLUMNFAMILIES__.update(family.name for family in found.cf_defs or [])
+        return __DEFINITIONS__[namespace]
+
+    @classmethod
+    @retried(READ)
+    def splits(clasz, namespace, kind, size=SPLITSIZE):
+        '''Divides the token ring into [(start, end)] ranges of about @size rows of @kind'''
+        pool = poolFor(namespace)
+        keyspace = keyspaceFor(namespace)
+        splits = []
+        with using(pool) as conn:
+            conn.use(keyspace)
+            for range in conn.client.describe_ring(keyspace):
+                tokens = conn.client.describe_splits(kind, range.start_token, range.end_token, size)
+                splits.extend(zip(tokens[:-1], tokens[1:]))
+        return splits
+
+    @classmethod
+    def scan(clasz, namespace, kind, workers=4, size=SPLITSIZE, page=PAGESIZE, fetchmode=FetchMode.All, raw=False, rows=False):
+        '''Yields every row of @kind as it arrives, by reading splits of the ring on @workers threads'''
+        assert workers > 0, "You need at least one worker to scan %s" % kind
+        splits, results, stop = Queue(), Queue(page), Event()
+        for split in clasz.splits(namespace, kind, size):
+            splits.put(split)
+        done, failed = object(), object()
+        def push(item):
+            '''Hands @item to the consumer unless the scan has been abandoned'''
+            while not stop.is_set():
+                try:
+                    results.put(item, True, 0.1)
+                    return True
+                except Full:
+                    pass
+            return False
+        def work():
+            '''Reads splits from the queue until it is empty'''
+            try:
+                while not stop.is_set():
+                    try:
+                        start, finish = splits.get(False)
+                    except Empty:
+                        break
+                    for row in clasz.readRange(namespace, kind, page, fetchmode, start, finish, True, raw, rows):
+                        if not push(row): return
+                push(done)
+            except Exception as e:
+                logging.exception("Scanning %s failed: %s" % (kind, e))
+                push((failed, e))
+        threads = [Thread(target=work, name="SCANNER-THREAD: %s-%s" % (kind, i)) for i in range(workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            finished = 0
+            while finished < workers:
+                item = results.get()
+                if item is done:
+                    finished += 1
+                elif isinstance(item, tuple) and item[0] is failed:
+                    raise item[1]
+                else:
+                    yield item
+        finally:
+            stop.set()
+
     @classmethod
+    @retried(WRITE)
     def save(clasz, model):
         '''Write one Model to Cassandra'''
         from homer.core.models import key, BaseModel
@@ -730,10 +1603,11 @@ class Lisa(local):
         def commit(namespace, mutations):
             '''Stores all the mutations in one batch operation'''
             pool = poolFor(namespace)
-            with using(pool) as conn:
+            with using(pool, mutations.keys()[0]) as conn:
                 keyspace = keyspaceFor(namespace)
-                conn.client.set_keyspace(keyspace)
+                conn.use(keyspace)
                 conn.client.batch_mutate(mutations, clasz.consistency)    
+            RowCache.update(namespace, mutations)
         assert issubclass(model.__class__, BaseModel), "%s must inherit from BaseModel" % model
         info = Schema.Get(model)
         namespace = info[0]
@@ -741,12 +1615,22 @@ class Lisa(local):
         if kind not in __COLUMNFAMILIES__ and Settings.debug():
             Lisa.create(model)
         meta = MetaModel(model)
+        session = Session.active()
+        if session is not None: # The Session commits the differ when it flushes.
+            session.queue(namespace, meta.id(), meta.mutations(), model)
+            return
+        buffer = bufferFor(namespace)
+        if buffer is not None: # The buffer commits the differ when it flushes.
+            buffer.add(meta.id(), meta.mutations(), model)
+            return
         changes = { meta.id() : meta.mutations() }
         commit(namespace, changes)
         key = model.key()
         key.saved = True
+        model.differ.commit()
             
     @classmethod
+    @retried(WRITE)
     def delete(clasz, *keys):
         '''Deletes a List of keys which represents Models'''
         for key in keys:
@@ -754,52 +1638,549 @@ class Lisa(local):
             path = ColumnPath(column_family = key.kind)
             clock = time.time()
             pool = poolFor(key.namespace)
-            with using(pool) as conn:
+            with using(pool, key.id) as conn:
                 logging.info("DELETING %s FROM CASSANDRA" % key )
                 keyspace = keyspaceFor(key.namespace)
-                conn.client.set_keyspace(keyspace)
+                conn.use(keyspace)
                 conn.client.remove(key.id, path, clock, clasz.consistency)
+            RowCache.invalidate(key)
+            session = Session.active()
+            if session is not None:
+                session.discard(key)
 
     
     @classmethod
     def saveMany(clasz, namespace, *models):
-        '''Write a Lot of Models in one batch, They must all belong to one keyspace'''
+        '''Write a Lot of Models in as few batches as possible, @namespace is kept for compatibility'''
+        failures = clasz.bulkSave(models)
+        if failures:
+            raise failures[0].error
+
+    @classmethod
+    def bulkSave(clasz, models, chunkRows=BATCHROWS, chunkBytes=BATCHBYTES):
+        '''Writes Models from any namespace in concurrent chunks, returns the Batches that failed'''
         from homer.core.models import key, BaseModel
-        # PERSISTS ALL CHANGES IN *MODELS IN A SINGLE BATCH
-        def commit(namespace, mutations):
-            '''Stores all the mutations in one batch operation'''
-            pool = poolFor(namespace)
-            with using(pool) as conn:
-                keyspace = keyspaceFor(namespace)
-                conn.client.set_keyspace(keyspace)
-                conn.client.batch_mutate(mutations, clasz.consistency)    
-        # BATCH ALL THE INDIVIDUAL CHANGES IN ONE TRANSFER
-        mutations = {}
+        assert chunkRows > 0 and chunkBytes > 0, "chunkRows and chunkBytes must be positive"
+        rows = []
         for model in models:
             assert issubclass(model.__class__, BaseModel), "parameter model:\
                 %s must inherit from BaseModel" % model
-            info = Schema.Get(model)
-            keyspace = keyspaceFor(info[0])
-            mnamespace = info[0]
-            assert namespace == mnamespace, "All the Models must belong to %s for this operation to complete" % namespace
-            kind = info[1]
+            namespace, kind = Schema.Get(model)[:2]
             if kind not in __COLUMNFAMILIES__ and Settings.debug():
                 Lisa.create(model)
             meta = MetaModel(model)
-            key = model.key()
-            key.saved = True
-            mutations[meta.id()] = meta.mutations()
-        commit(namespace,mutations)    
+            rows.append((namespace, meta.id(), meta.mutations(), model))
+        batches = Batch.partition(rows, chunkRows, chunkBytes)
+        # DISPATCH THE BATCHES CONCURRENTLY ACROSS THE CONNECTION POOLS
+        clasz.dispatch(batches)
+        failures = []
+        for batch in batches:
+            if batch.error is None:
+                for model in batch.models:
+                    model.key().saved = True
+                    model.differ.commit()
+            else:
+                failures.append(batch)
+        return failures
+
+    @classmethod
+    def dispatch(clasz, batches):
+        '''Commits @batches concurrently, errors are recorded on the Batch that failed'''
+        consistency = clasz.consistency
+        def commit(queue):
+            '''Commits batches from @queue until it is empty'''
+            while True:
+                try:
+                    batch = queue.get(False)
+                except Empty:
+                    break
+                try:
+                    batch.commit(consistency)
+                except Exception as e:
+                    logging.error("Batch of %s rows in %s failed: %s" % (len(batch), batch.namespace, e))
+                    batch.error = e
+        queue = Queue()
+        for batch in batches:
+            queue.put(batch)
+        workers = min([len(batches)] + [poolFor(batch.namespace).maxConnections for batch in batches])
+        if workers <= 1:
+            commit(queue)
+            return
+        threads = [Thread(target=commit, args=(queue,), name="BATCH-WRITER: %s" % i) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
   
+  
+    @classmethod
+    def submit(clasz, op, *arguments, **keywords):
+        '''Runs op(*arguments, **keywords) on a worker of the namespace it works on, returns a Future'''
+        from homer.core.models import BaseModel
+        namespace = None
+        for found in (getattr(op, "im_self", None),) + arguments:
+            if isinstance(found, Key):
+                namespace = found.namespace
+            elif isinstance(found, BaseModel) or (isinstance(found, type) and issubclass(found, BaseModel)):
+                namespace = Schema.Get(found)[0]
+            if namespace is not None:
+                break
+        return executorFor(namespace or Settings.default()).submit(op, *arguments, **keywords)
+
+    @staticmethod
+    def useCache(namespace, cache):
+        '''Reads and writes Models in @namespace through @cache, None turns caching off'''
+        with __LOCK__:
+            __CACHES__[namespace] = cache
+
+    @staticmethod
+    def flush(namespace = None):
+        '''Writes the buffered writes of @namespace, or of every namespace, to Cassandra'''
+        with __LOCK__:
+            buffers = [__BUFFERS__.get(namespace)] if namespace else __BUFFERS__.values()
+        for buffer in buffers:
+            if buffer is not None:
+                buffer.flush()
+
+    @staticmethod
+    def useMetrics(namespace, sink):
+        '''Sends the measurements of the connection pool of @namespace to @sink, None turns them off'''
+        poolFor(namespace).metrics = sink
+
+    @staticmethod
+    def stats(namespace):
+        '''Returns the stats of the connection pool of @namespace'''
+        return poolFor(namespace).stats()
+
     @staticmethod
     def clear():
         '''Clears internal state of @this'''
         logging.info('Clearing internal state of the Datastore Mapper')
+        with __LOCK__:
+            buffers = __BUFFERS__.values()
+            __BUFFERS__.clear()
+        for buffer in buffers:
+            if buffer is not None:
+                buffer.close()
         with __LOCK__:
             __KEYSPACES__.clear()
             __COLUMNFAMILIES__.clear()
+            __PARTITIONERS__.clear()
+            __DEFINITIONS__.clear()
+            __CACHES__.clear()
+            pools = __POOLS__.values()
             __POOLS__.clear()
+            executors = __EXECUTORS__.values()
+            __EXECUTORS__.clear()
+        for pool in pools:
+            pool.disposeAll()
+        for executor in executors: # Outside the lock, shutting down waits while a queue is full.
+            executor.shutdown(False)
             
+"""
+RowCache:
+Keeps the rows of Models in the Cache of their namespace. Rows are
+cached as (fetchmode, {name: value}) so Models can be rebuilt with
+MetaModel.load; a row that was read with FetchMode.All contains
+every column, one that was read with FetchMode.Property only 
+contains the static properties of its Model.
+"""
+class RowCache(object):
+    '''Reads, writes and invalidates rows in the Cache of a namespace'''
+
+    @staticmethod
+    def get(key, fetchmode):
+        '''Returns the cached columns of @key as ColumnOrSuperColumns or None'''
+        cache = cacheFor(key.namespace)
+        if cache is None:
+            return None
+        found = cache.get(key)
+        if found is None:
+            return None
+        mode, row = found
+        if fetchmode == FetchMode.All and mode != FetchMode.All:
+            return None
+        names = row.keys()
+        if fetchmode == FetchMode.Property:
+            names = key.columns or Schema.CodecFor(Schema.ClassForModel(key.namespace, key.kind)).properties.keys()
+        return [ColumnOrSuperColumn(column=Column(name=name, value=row[name])) for name in names if name in row]
+
+    @staticmethod
+    def put(key, fetchmode, coscs):
+        '''Caches the columns of @key that were read with @fetchmode'''
+        cache = cacheFor(key.namespace)
+        if cache is None or not coscs:
+            return
+        if fetchmode == FetchMode.Property and key.columns:
+            return # Rows with an arbitrary subset of the columns can't serve other reads.
+        row = dict((cosc.column.name, cosc.column.value) for cosc in coscs)
+        cache.put(key, (fetchmode, row))
+
+    @staticmethod
+    def update(namespace, mutations):
+        '''Applies a {id: {kind: [Mutation]}} map that was just written to the cached rows'''
+        cache = cacheFor(namespace)
+        if cache is None:
+            return
+        for id, families in mutations.items():
+            for kind, changes in families.items():
+                key = Key(namespace, kind, id)
+                found = cache.peek(key)
+                if found is None:
+                    continue
+                mode, row = found
+                row = dict(row)
+                for mutation in changes:
+                    if mutation.column_or_supercolumn:
+                        column = mutation.column_or_supercolumn.column
+                        if column.ttl: # The column may expire before the cached row does.
+                            row = None
+                            break
+                        row[column.name] = column.value
+                    if mutation.deletion:
+                        for name in mutation.deletion.predicate.column_names or []:
+                            row.pop(name, None)
+                if row is None:
+                    cache.delete(key)
+                else:
+                    cache.put(key, (mode, row))
+
+    @staticmethod
+    def invalidate(key):
+        '''Removes the row of @key from the cache of its namespace'''
+        cache = cacheFor(key.namespace)
+        if cache is not None:
+            cache.delete(key)
+
+"""
+Batch:
+A Batch holds the mutations of a bounded number of rows that
+belong to one namespace, they are stored in a single batch_mutate.
+When the pool of the namespace routes requests, the rows in a Batch
+also share their primary replica, and the Batch is sent to it.
+If the batch fails, the error is kept in @error and the Models in 
+@models can be saved again.
+"""
+class Batch(object):
+    '''Mutations for a chunk of rows in one namespace'''
+    def __init__(self, namespace):
+        '''Creates an empty Batch for @namespace'''
+        self.namespace = namespace
+        self.mutations = {}
+        self.models = []
+        self.size = 0
+        self.error = None
+    
+    @staticmethod
+    def partition(rows, chunkRows=BATCHROWS, chunkBytes=BATCHBYTES):
+        '''Splits (namespace, id, mutations, model) @rows by namespace and replica into bounded Batches'''
+        batches, current = [], {}
+        for namespace, id, mutations, model in rows:
+            size = Batch.sizeOf(mutations)
+            group = (namespace, poolFor(namespace).owner(id))
+            batch = current.get(group, None)
+            if batch is None or len(batch) >= chunkRows or (len(batch) and batch.size + size > chunkBytes):
+                batch = Batch(namespace)
+                current[group] = batch
+                batches.append(batch)
+            batch.add(id, mutations, size, model)
+        return batches
+
+    @staticmethod
+    def sizeOf(mutations):
+        '''Estimates the serialized size of a {kind: [Mutation]} map in bytes'''
+        size = 0
+        for changes in mutations.values():
+            for mutation in changes:
+                size += 16
+                if mutation.column_or_supercolumn:
+                    column = mutation.column_or_supercolumn.column
+                    size += len(column.name) + len(column.value)
+                if mutation.deletion:
+                    size += sum(len(name) for name in mutation.deletion.predicate.column_names or [])
+        return size
+    
+    def add(self, id, mutations, size, model=None):
+        '''Adds the {kind: [Mutation]} map of row @id to this Batch'''
+        row = self.mutations.setdefault(id, {})
+        for kind, changes in mutations.items():
+            row.setdefault(kind, []).extend(changes)
+        self.size += size
+        if model is not None:
+            self.models.append(model)
+    
+    @retried(WRITE)
+    def commit(self, consistency):
+        '''Stores all the mutations in this Batch in one batch operation'''
+        pool = poolFor(self.namespace)
+        with using(pool, next(iter(self.mutations))) as conn:
+            keyspace = keyspaceFor(self.namespace)
+            conn.use(keyspace)
+            conn.client.batch_mutate(self.mutations, consistency)
+        RowCache.update(self.namespace, self.mutations)
+    
+    def __len__(self):
+        '''The number of rows in this Batch'''
+        return len(self.mutations)
+
+"""
+WriteBuffer:
+Collects the writes of saveColumn, saveManyColumns and save for a
+namespace, and writes them in as few batch_mutates as possible; Writes
+to the same column of a row are coalesced, only the one with the latest
+timestamp is sent. Deletions are kept as they are, Cassandra orders
+them and the columns by their timestamps anyway.
+
+The buffer is flushed @window seconds after its first write, as soon as
+it holds @rows rows or @bytes bytes, by Lisa.flush() and at exit. With
+the 'sync' durability writers wait until the flush that wrote their
+write finished, and get its error; With 'async' writers return straight
+away, failed flushes are logged and counted, and reads don't see the
+buffered writes until they are flushed.
+
+buffer :
+    window : 0.01
+    rows : 1000
+    durability : sync
+"""
+class WriteBuffer(object):
+    '''Coalesces writes to a namespace'''
+
+    def __init__(self, namespace, window=WINDOW, rows=BATCHROWS, bytes=BATCHBYTES, durability=SYNC):
+        '''Creates an empty WriteBuffer for @namespace'''
+        assert window > 0 and rows > 0 and bytes > 0, "window, rows and bytes must be positive"
+        assert durability in (SYNC, ASYNC), "durability must be one of: %s, %s" % (SYNC, ASYNC)
+        self.namespace = namespace
+        self.window, self.maxRows, self.maxBytes = window, rows, bytes
+        self.durability = durability
+        self.lock = Lock()
+        self.rows, self.models, self.size = {}, {}, 0
+        self.deadline = None
+        self.future = Future() # FINISHES WHEN THE ROWS THAT ARE BUFFERED NOW ARE FLUSHED
+        self.flusher = None
+        self.writes, self.flushes, self.failures = 0, 0, 0
+        atexit.register(self.close)
+
+    def add(self, id, mutations, model=None):
+        '''Buffers the {kind: [Mutation]} map of row @id, and waits until it is flushed if the buffer is sync'''
+        size = Batch.sizeOf(mutations)
+        snapshot = model.differ.snapshot() if model is not None else None # What the Model is once this is written.
+        with self.lock:
+            row = self.rows.setdefault(id, {})
+            for kind, changes in mutations.items():
+                merged = row.setdefault(kind, {})
+                for mutation in changes:
+                    self.merge(merged, mutation)
+            if model is not None:
+                self.models.setdefault(id, []).append((model, snapshot))
+            self.size += size
+            self.writes += 1
+            future = self.future
+            full = len(self.rows) >= self.maxRows or self.size >= self.maxBytes
+            if not full and self.deadline is None:
+                self.deadline = time.time() + self.window
+                if self.flusher is None:
+                    self.flusher = Flusher(self)
+                self.flusher.pending.set()
+        for kind in mutations:
+            RowCache.invalidate(Key(self.namespace, kind, id))
+        if full:
+            self.flush()
+        if self.durability == SYNC:
+            future.result()
+
+    def merge(self, merged, mutation):
+        '''Adds @mutation to the {column: Mutation} map of a row, unless a later write to its column is there'''
+        if mutation.deletion is not None:
+            if mutation.deletion.predicate and mutation.deletion.predicate.column_names:
+                merged[("deletion", id(mutation))] = mutation
+            return
+        column = mutation.column_or_supercolumn.column
+        found = merged.get(column.name, None)
+        if found is None or found.column_or_supercolumn.column.timestamp <= column.timestamp:
+            merged[column.name] = mutation
+
+    def due(self):
+        '''Returns when the buffered rows must be flushed, or None if there are none, called by the Flusher'''
+        with self.lock:
+            if self.deadline is None:
+                self.flusher.pending.clear()
+            return self.deadline
+
+    def flush(self):
+        '''Writes the buffered rows in as few batches as possible, raises the error of the first batch that failed'''
+        with self.lock:
+            if not self.rows:
+                return 0
+            rows, models, future = self.rows, self.models, self.future
+            self.rows, self.models, self.size, self.deadline, self.future = {}, {}, 0, None, Future()
+        changes = [(self.namespace, id, dict((kind, merged.values()) for kind, merged in row.items()), None)
+            for id, row in rows.items()]
+        batches = Batch.partition(changes, self.maxRows, self.maxBytes)
+        Lisa.dispatch(batches)
+        failures = [batch for batch in batches if batch.error is not None]
+        for batch in batches:
+            if batch.error is None:
+                for id in batch.mutations:
+                    for model, snapshot in models.get(id, ()):
+                        model.key().saved = True
+                        model.differ.commit(snapshot)
+        with self.lock:
+            self.flushes += 1
+            self.failures += len(failures)
+        if failures:
+            future.setException(failures[0].error)
+            raise failures[0].error
+        future.setResult(len(rows))
+        return len(rows)
+
+    def close(self):
+        '''Flushes the buffered rows, typically called at System Exit'''
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error("Couldn't flush the buffered writes of %s: %s" % (self.namespace, e))
+
+    def stats(self):
+        '''Returns the number of writes, flushes and failed batches of this buffer'''
+        with self.lock:
+            return {"writes" : self.writes, "flushes" : self.flushes, "failures" : self.failures,
+                "rows" : len(self.rows)}
+
+    def __len__(self):
+        '''The number of rows that are buffered'''
+        return len(self.rows)
+
+"""
+Flusher:
+A Thread that flushes a WriteBuffer when its window runs out, it sleeps
+while the buffer is empty.
+"""
+class Flusher(Thread):
+    """Flushes a WriteBuffer in time"""
+    def __init__(self, buffer):
+        super(Flusher, self).__init__()
+        self.buffer = buffer
+        self.pending = Event()
+        self.name = "FLUSHER: %s" % buffer.namespace
+        self.daemon = True
+        self.start()
+
+    def run(self):
+        """Sleeps until the window of the buffer runs out, and flushes it"""
+        while True:
+            self.pending.wait()
+            deadline = self.buffer.due()
+            if deadline is None:
+                continue
+            if deadline > time.time():
+                time.sleep(max(deadline - time.time(), 0))
+                continue
+            try:
+                self.buffer.flush()
+            except Exception as e:
+                logging.error("Couldn't flush the buffered writes of %s: %s" % (self.buffer.namespace, e))
+
+"""
+Session:
+A Session is a unit of work; Within a Session every row is loaded
+at most once, reading a Key that was loaded or saved before returns 
+the same instance. Models that are saved within a Session are written in 
+batches when the Session exits, if it exits with an error they are
+discarded. Sessions are threadlocal and can be nested.
+
+with Session():
+    book = Book.read("Pride")
+    assert Book.read("Pride") is book
+    book.author = "Jane Austen"
+    book.save() # Written when the Session exits.
+"""
+class Session(object):
+    '''An identity map and write batch for a unit of work'''
+    sessions = local()
+
+    def __init__(self):
+        '''Creates an empty Session'''
+        self.models = {}
+        self.pending = []
+        self.snapshots = {}
+
+    @classmethod
+    def active(clasz):
+        '''Returns the innermost Session of this thread or None'''
+        stack = getattr(clasz.sessions, "stack", None)
+        return stack[-1] if stack else None
+
+    def __enter__(self):
+        '''Makes this the active Session of this thread'''
+        if not hasattr(self.sessions, "stack"):
+            self.sessions.stack = []
+        self.sessions.stack.append(self)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        '''Writes the pending saves if the unit of work succeeded'''
+        self.sessions.stack.remove(self)
+        try:
+            if type is None:
+                self.flush()
+            elif self.pending:
+                logging.error("Discarding %s pending saves after: %s" % (len(self.pending), value))
+        finally:
+            self.pending = []
+            self.models.clear()
+            self.snapshots.clear()
+
+    def get(self, key, fetchmode=FetchMode.Property):
+        '''Returns the instance that was loaded for @key with at least @fetchmode or None'''
+        found = self.models.get((key.namespace, key.kind, key.id), None)
+        if found is None:
+            return None
+        mode, model = found
+        if fetchmode == FetchMode.All and mode != FetchMode.All:
+            return None
+        return model
+
+    def add(self, model, fetchmode=FetchMode.Property):
+        '''Adds @model, that was loaded with @fetchmode, to the identity map'''
+        key = model.key()
+        id = (key.namespace, key.kind, key.id)
+        found = self.models.get(id, None)
+        if found is None or found[0] != FetchMode.All:
+            self.models[id] = (fetchmode, model)
+
+    def queue(self, namespace, id, mutations, model):
+        '''Queues the {kind: [Mutation]} map of a Model that was saved for the next flush'''
+        self.pending.append((namespace, id, mutations, model))
+        key = model.key()
+        self.models[(key.namespace, key.kind, key.id)] = (FetchMode.All, model)
+        self.snapshots[(key.namespace, key.kind, key.id)] = model.differ.snapshot() # What the Model is once this is written.
+
+    def discard(self, key):
+        '''Forgets the instance and the pending saves of a Model that was deleted'''
+        id = encode(key.id) if isinstance(key.id, basestring) else encode(str(key.id))
+        self.models.pop((key.namespace, key.kind, key.id), None)
+        self.pending = [row for row in self.pending if not (row[0] == key.namespace \
+            and row[1] == id and key.kind in row[2])]
+
+    def flush(self):
+        '''Writes all the pending saves in as few batches as possible'''
+        if not self.pending:
+            return
+        logging.info("Flushing %s saves from a Session" % len(self.pending))
+        batches = Batch.partition(self.pending)
+        snapshots, self.pending, self.snapshots = self.snapshots, [], {}
+        Lisa.dispatch(batches)
+        failures = [batch for batch in batches if batch.error is not None]
+        for batch in batches:
+            if batch.error is None:
+                for model in batch.models:
+                    key = model.key()
+                    key.saved = True
+                    model.differ.commit(snapshots.get((key.namespace, key.kind, key.id), None))
+        if failures:
+            raise failures[0].error
+
 ##
 # MetaModel:
 # A Helper class that transforms BaseModel to Cassandra's data model.
@@ -815,7 +2196,8 @@ class MetaModel(object):
         self.kind = info[1]
         self.key = info[2]
         self.comment = self.kind.__doc__
-        self.fields = fields(model, Property)
+        self.codec = Schema.CodecFor(model)
+        self.fields = self.codec.properties
     
     def id(self):
         '''Returns the appropriate representation of the key of self.model'''
@@ -824,26 +2206,25 @@ class MetaModel(object):
             val = str(val)
         return encode(val)
     
-    @redo   
     def makeKeySpace(self, connection):
         '''Creates a new keyspace from the namespace property of this BaseModel'''
         try:
             connection.client.system_add_keyspace(self.asKeySpace())
+        except FAILED:
+            raise
         except Exception as e:
             pass
     
-    @redo       
     def makeColumnFamily(self, connection):
         '''Creates a new column family from the 'kind' property of this BaseModel'''
         try:
-            connection.client.set_keyspace(self.keyspace)
+            connection.use(self.keyspace)
             connection.client.system_add_column_family(self.asColumnFamily())
             self.wait(connection)
         except InvalidRequestException as e:
             if Settings.debug():
                 print_exc()
     
-    @redo
     def makeIndexes(self, connection):
         '''Creates Indices for all the indexed properties in the model'''
         query = 'CREATE INDEX ON {kind}({name});'
@@ -926,20 +2307,10 @@ class MetaModel(object):
     def getColumn(self, name, value):
         '''Returns a Native Column from a property with this name'''
         column = Column()
+        column.name, column.value = self.codec.encode(self.model, name, value)
         if name in self.fields:
-            column.name = name
-            property = self.fields[name]
-            column.value = property.convert(value)  
-            ttl = property.ttl
+            ttl = self.fields[name].ttl
             if ttl: column.ttl = ttl
-        else:
-            k, v = self.model.default
-            k = k() if isinstance(k, type) else k
-            v = v() if isinstance(v, type) else v
-            name = k.convert(name)
-            value = v.convert(value)
-            column.name = name
-            column.value = value # Just pickle it over the wire
         column.timestamp = int(time.time())
         return column
     
@@ -948,27 +2319,21 @@ class MetaModel(object):
         '''Creates a Model from an iterable of ColumnOrSuperColumns'''
         if not coscs: return None
         cls = Schema.ClassForModel(key.namespace, key.kind)
-        info = Schema.Get(cls)
+        codec = Schema.CodecFor(cls)
         model = cls()
-        descriptors = fields(cls, Property)
         for cosc in coscs:
-            name = cosc.column.name  
-            if name in descriptors:  # Deconvert static properties first.
-                prop = descriptors[name]
-                deconverted = prop.deconvert(cosc.column.value)
-                model[name] = deconverted 
-            else: # Deconvert dynamic properties, this deconverts column names, and column values
-                k, v = model.default
-                k = k() if isinstance(k, type) else k
-                v = v() if isinstance(v, type) else v
-                name = k.deconvert(cosc.column.name)
-                value = v.deconvert(cosc.column.value)
-                model[name] = value
-        keyname = info[2]
-        setattr(model, keyname, key.id) #Make sure the newly returned model has the same key
+            codec.decode(model, cosc.column.name, cosc.column.value)
+        setattr(model, codec.key, key.id) #Make sure the newly returned model has the same key
         key = model.key()
         key.saved = True
         return model
+
+    @classmethod
+    def row(self, key, coscs):
+        '''Creates a read-only Row from an iterable of ColumnOrSuperColumns'''
+        if not coscs: return None
+        cls = Schema.ClassForModel(key.namespace, key.kind)
+        return Schema.CodecFor(cls).row(cls, key, ((cosc.column.name, cosc.column.value) for cosc in coscs))
          
     def mutations(self):
         '''Returns a {} of mutations that have occurred since last commit'''
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Futures are the results of operations that haven't finished yet; They
+are what the asynchronous parts of the backend return.
+"""
+import sys
+import logging
+from Queue import Queue
+from threading import Condition, Thread
+
+__all__ = ["Future", "Executor", "TimeoutError", "gather",]
+
+logging = logging.getLogger("homer")
+
+class TimeoutError(Exception):
+    '''Thrown when the result of a Future isn't ready in time'''
+    pass
+
+"""
+Future:
+The result of an operation that is still running; Callbacks that are
+added to a Future are called with it on the thread that finishes it,
+or immediately if it has already finished. Callbacks must not block.
+
+future = AsyncLisa.read(key)
+future.addCallback(lambda done: log(done.result()))
+model = future.result(timeout=5)
+"""
+class Future(object):
+    '''The result of an operation that is still running'''
+
+    def __init__(self):
+        '''Creates a Future that hasn't finished'''
+        self.condition = Condition()
+        self.finished = False
+        self.value = None
+        self.error = None
+        self.trace = None
+        self.callbacks = []
+
+    def done(self):
+        '''Has this Future finished?'''
+        return self.finished
+
+    def result(self, timeout=None):
+        '''Waits at most @timeout seconds for the result, and returns it or raises its error'''
+        with self.condition:
+            if not self.finished:
+                self.condition.wait(timeout)
+            if not self.finished:
+                raise TimeoutError("The operation didn't finish in %s seconds" % timeout)
+        if self.error is not None:
+            raise self.error, None, self.trace
+        return self.value
+
+    def exception(self, timeout=None):
+        '''Waits at most @timeout seconds, and returns the error this Future failed with or None'''
+        with self.condition:
+            if not self.finished:
+                self.condition.wait(timeout)
+            if not self.finished:
+                raise TimeoutError("The operation didn't finish in %s seconds" % timeout)
+        return self.error
+
+    def addCallback(self, callback):
+        '''Calls @callback with this Future when it finishes'''
+        with self.condition:
+            if not self.finished:
+                self.callbacks.append(callback)
+                return
+        self.call(callback)
+
+    def setResult(self, value):
+        '''Finishes this Future with @value'''
+        self.finish(value, None, None)
+
+    def setException(self, error, trace=None):
+        '''Finishes this Future with @error'''
+        self.finish(None, error, trace)
+
+    def finish(self, value, error, trace):
+        '''Stores the outcome of the operation and runs the callbacks'''
+        with self.condition:
+            if self.finished:
+                return
+            self.value, self.error, self.trace = value, error, trace
+            self.finished = True
+            callbacks, self.callbacks = self.callbacks, []
+            self.condition.notify_all()
+        for callback in callbacks:
+            self.call(callback)
+
+    def call(self, callback):
+        '''Runs @callback, a failing callback doesn't affect the others'''
+        try:
+            callback(self)
+        except Exception as e:
+            logging.exception("A callback of %s failed: %s" % (self, e))
+
+    def then(self, function):
+        '''Returns a Future of @function applied to the result of this Future'''
+        future = Future()
+        def chain(done):
+            '''Passes the result or error of @done through @function'''
+            if done.error is not None:
+                future.setException(done.error, done.trace)
+                return
+            try:
+                future.setResult(function(done.value))
+            except Exception as e:
+                future.setException(e, sys.exc_info()[2])
+        self.addCallback(chain)
+        return future
+
+    @staticmethod
+    def completed(value):
+        '''Returns a Future that has already finished with @value'''
+        future = Future()
+        future.setResult(value)
+        return future
+
+"""
+gather:
+Returns a Future of the results of all the @futures, in the order they
+were passed in; It fails with the first error of any of them.
+"""
+def gather(*futures):
+    '''Returns a Future of the list of the results of @futures'''
+    combined = Future()
+    if not futures:
+        combined.setResult([])
+        return combined
+    remaining = [len(futures)]
+    def finished(done):
+        '''Completes the combined Future after the last one finishes'''
+        if done.error is not None:
+            combined.setException(done.error, done.trace)
+            return
+        with combined.condition:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            combined.setResult([future.value for future in futures])
+    for future in futures:
+        future.addCallback(finished)
+    return combined
+
+"""
+Executor:
+Runs functions on a fixed number of worker threads and returns Futures
+of their results; At most @backlog functions wait for a worker, submit()
+blocks when the backlog is full, so producers can't outrun the workers.
+
+executor = Executor(workers=10)
+future = executor.submit(Lisa.read, key)
+"""
+class Executor(object):
+    '''A bounded pool of worker threads'''
+
+    def __init__(self, workers, backlog=None, name="EXECUTOR"):
+        '''Starts @workers threads, that share a queue of at most @backlog functions'''
+        assert workers > 0, "An Executor needs at least one worker"
+        self.queue = Queue(backlog or workers)
+        self.threads = []
+        for i in range(workers):
+            thread = Thread(target=self.work, name="%s-%s" % (name, i))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, function, *arguments, **keywords):
+        '''Returns a Future of function(*arguments, **keywords), blocks while the backlog is full'''
+        future = Future()
+        self.queue.put((future, function, arguments, keywords))
+        return future
+
+    def work(self):
+        '''Runs submitted functions until the Executor shuts down'''
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            future, function, arguments, keywords = task
+            try:
+                future.setResult(function(*arguments, **keywords))
+            except Exception as e:
+                future.setException(e, sys.exc_info()[2])
+
+    def shutdown(self, wait=True):
+        '''Stops the workers after they finish the functions that were already submitted'''
+        for thread in self.threads:
+            self.queue.put(None)
+        if wait:
+            for thread in self.threads:
+                thread.join()
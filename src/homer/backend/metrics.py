@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Histograms and Sinks for the metrics of connection pools; A pool keeps
+its own counters and histograms for stats(), and also sends every
+measurement to the Sink of its namespace if it has one.
+"""
+import socket
+import bisect
+import logging
+
+__all__ = ["Histogram", "Sink", "Callback", "Statsd", "sinkFor",]
+
+logging = logging.getLogger("homer")
+
+BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30) # Upper bounds of the Histogram buckets, in seconds.
+
+"""
+sinkFor:
+Creates the Sink that is configured in the 'metrics' options of a
+namespace, namespaces without 'metrics' options have no Sink.
+
+metrics :
+    statsd : "localhost:8125"
+    prefix : homer.Account
+"""
+def sinkFor(options):
+    '''Returns a new Sink for a namespace or None'''
+    found = options.get("metrics", None)
+    if not found or not found.get("statsd", None):
+        return None
+    host, port = found["statsd"].split(":")
+    return Statsd(host, int(port), found.get("prefix", "homer"))
+
+"""
+Histogram:
+Counts durations in buckets with fixed upper bounds; Percentiles are
+reported as the upper bound of the bucket they fall in.
+"""
+class Histogram(object):
+    '''Counts durations in fixed buckets'''
+
+    def __init__(self, bounds=BOUNDS):
+        '''Creates an empty Histogram with buckets up to each of @bounds, and one for anything longer'''
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count, self.total, self.max = 0, 0.0, 0.0
+
+    def record(self, elapsed):
+        '''Counts a duration of @elapsed seconds'''
+        self.counts[bisect.bisect_left(self.bounds, elapsed)] += 1
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def percentile(self, fraction):
+        '''Returns the upper bound of the bucket that @fraction of the durations fall within'''
+        if not self.count:
+            return 0.0
+        rank, seen = fraction * self.count, 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self):
+        '''Returns the counts of this Histogram as a dictionary'''
+        buckets = dict(zip([str(bound) for bound in self.bounds] + ["inf"], self.counts))
+        mean = self.total / self.count if self.count else 0.0
+        return {"count" : self.count, "mean" : mean, "max" : self.max, "p50" : self.percentile(0.5),
+            "p99" : self.percentile(0.99), "buckets" : buckets}
+
+"""
+Sink:
+The contract for everything that receives the measurements of a pool,
+names are dotted like 'pool.checkout'.
+"""
+class Sink(object):
+    '''The contract for all metric Sinks'''
+
+    def timing(self, name, elapsed):
+        '''Receives a duration of @elapsed seconds'''
+        pass
+
+    def increment(self, name, value=1):
+        '''Receives an increment of the counter @name'''
+        pass
+
+    def gauge(self, name, value):
+        '''Receives the current @value of @name'''
+        pass
+
+"""
+Callback:
+Hands every measurement to a function, as function(kind, name, value)
+where kind is one of 'timing', 'increment' or 'gauge'.
+
+Lisa.useMetrics("Account", Callback(lambda kind, name, value: log(name, value)))
+"""
+class Callback(Sink):
+    '''Calls a function with every measurement'''
+
+    def __init__(self, function):
+        self.function = function
+
+    def timing(self, name, elapsed):
+        self.function("timing", name, elapsed)
+
+    def increment(self, name, value=1):
+        self.function("increment", name, value)
+
+    def gauge(self, name, value):
+        self.function("gauge", name, value)
+
+"""
+Statsd:
+Sends every measurement to a statsd server in a UDP datagram, prefixed
+with @prefix; Datagrams that can't be sent are dropped. The address of
+@host is looked up once, not for every datagram.
+"""
+class Statsd(Sink):
+    '''Sends measurements to statsd'''
+
+    def __init__(self, host, port, prefix="homer"):
+        try:
+            self.address = (socket.gethostbyname(host), port)
+        except socket.error as e:
+            logging.warning("Couldn't resolve statsd host %s: %s" % (host, e))
+            self.address = (host, port)
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(0)
+
+    def send(self, name, value, type):
+        '''Sends "prefix.name:value|type" to statsd'''
+        try:
+            self.socket.sendto("%s.%s:%s|%s" % (self.prefix, name, value, type), self.address)
+        except socket.error as e:
+            logging.debug("Couldn't send %s to statsd: %s" % (name, e))
+
+    def timing(self, name, elapsed):
+        self.send(name, int(round(elapsed * 1000)), "ms")
+
+    def increment(self, name, value=1):
+        self.send(name, value, "c")
+
+    def gauge(self, name, value):
+        self.send(name, value, "g")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Retry policies decide which failed operations are tried again, after
+how long, and how many retries a namespace can afford; Operations that
+are @retried run again on another server when their connection failed.
+"""
+import time
+import random
+import socket
+import logging
+from functools import wraps
+from threading import Lock, local
+
+from cql import OperationalError
+from thrift.transport import TTransport
+from cql.cassandra.ttypes import TimedOutException, UnavailableException
+
+__all__ = ["RetryPolicy", "Attempt", "retried", "policyFor", "READ", "WRITE", "SCHEMA", "QUERY",]
+
+logging = logging.getLogger("homer")
+
+READ, WRITE, SCHEMA, QUERY = "read", "write", "schema", "query" # The classes of operations.
+BROKEN = (socket.error, TTransport.TTransportException) # Errors that leave a connection unusable.
+UNAVAILABLE = (UnavailableException,) # Cassandra refused the request before it did anything.
+FAILED = BROKEN + (TimedOutException, UnavailableException, OperationalError) # Errors that are worth retrying.
+
+"""
+policyFor:
+Creates the RetryPolicy that is configured in the 'retry' options of
+a namespace, namespaces without 'retry' options use the defaults.
+"""
+def policyFor(options):
+    '''Returns a new RetryPolicy for a namespace'''
+    return RetryPolicy(**(options.get("retry", None) or {}))
+
+"""
+RetryPolicy:
+Retries an operation at most @read, @write, @schema or @query times,
+depending on its class, and waits a random time of up to @backoff * 2 ^
+attempt seconds (but at most @limit seconds) before each retry. Requests
+that might have changed data are only retried if they are idempotent, or
+if they never reached Cassandra.
+
+Retries are paid for from a budget, so a struggling cluster isn't buried
+under them; Every operation adds @budget retries to it, and @minimum
+retries a second are always allowed.
+
+retry :
+    read : 3
+    write : 2
+    backoff : 0.05
+    limit : 2.0
+    budget : 0.1
+    minimum : 10
+"""
+class RetryPolicy(object):
+    '''Decides when failed operations are retried'''
+
+    def __init__(self, read=3, write=3, schema=3, query=3, backoff=0.05, limit=2.0, budget=0.1, minimum=10):
+        '''Creates a RetryPolicy, @read, @write, @schema and @query are the retries for each class of operations'''
+        self.retries = {READ : read, WRITE : write, SCHEMA : schema, QUERY : query}
+        self.backoff, self.limit = backoff, limit
+        self.budget, self.minimum = budget, minimum
+        self.balance, self.reserve, self.second = 0.0, minimum, int(time.time())
+        self.retried, self.exhausted = 0, 0
+        self.lock = Lock()
+
+    def retryable(self, error, idempotent, sent):
+        '''Is an operation that failed with @error worth retrying?'''
+        if not isinstance(error, FAILED):
+            return False
+        return idempotent or not sent or isinstance(error, UNAVAILABLE)
+
+    def allows(self, operation, attempt, error, idempotent, sent):
+        '''Can @operation be retried after @attempt failed attempts, the last one with @error?'''
+        if attempt >= self.retries.get(operation, 0) or not self.retryable(error, idempotent, sent):
+            return False
+        return self.withdraw()
+
+    def delay(self, attempt):
+        '''Returns the seconds to wait before retry number @attempt'''
+        return random.uniform(0, min(self.limit, self.backoff * 2 ** attempt))
+
+    def deposit(self):
+        '''Adds the retries one operation pays for to the budget'''
+        with self.lock:
+            self.balance = min(self.balance + self.budget, self.minimum + 1.0)
+
+    def withdraw(self):
+        '''Takes one retry from the budget, returns False if the budget is exhausted'''
+        with self.lock:
+            second = int(time.time())
+            if second != self.second:
+                self.second, self.reserve = second, self.minimum
+            if self.reserve > 0:
+                self.reserve -= 1
+            elif self.balance >= 1:
+                self.balance -= 1
+            else:
+                self.exhausted += 1
+                return False
+            self.retried += 1
+            return True
+
+    def stats(self):
+        '''Returns the number of retries, and of retries the budget refused'''
+        with self.lock:
+            return {"retried" : self.retried, "exhausted" : self.exhausted}
+
+"""
+Attempt:
+What a thread knows about the operation it is running; using() records
+the pool it took a connection from, whether the request was sent, and
+the servers that failed, so the next attempt goes somewhere else.
+"""
+class Attempt(object):
+    '''The state of the @retried operation of a thread'''
+    attempts = local()
+
+    def __init__(self):
+        self.pool = None
+        self.sent = False
+        self.avoid = set()
+
+    @classmethod
+    def current(clasz):
+        '''Returns the Attempt of the current thread, or None'''
+        return getattr(clasz.attempts, "current", None)
+
+"""
+retried:
+Runs an operation of class @operation again when it fails, according
+to the RetryPolicy of the pool it used; @idempotent can be a function of
+the operation's arguments. Only the outermost @retried operation of a
+thread retries, so nested operations don't multiply the retries.
+"""
+def retried(operation, idempotent=True):
+    '''Decorates a function that runs @operation'''
+    def decorator(function):
+        @wraps(function)
+        def do(*arguments, **keywords):
+            if Attempt.current() is not None:
+                return function(*arguments, **keywords)
+            context = Attempt.attempts.current = Attempt()
+            safe = idempotent(*arguments, **keywords) if callable(idempotent) else idempotent
+            attempt = 0
+            try:
+                while True:
+                    context.sent = False
+                    try:
+                        return function(*arguments, **keywords)
+                    except Exception as e:
+                        policy = getattr(context.pool, "retry", None)
+                        if policy is None or not policy.allows(operation, attempt, e, safe, context.sent):
+                            raise
+                        attempt += 1
+                        delay = policy.delay(attempt)
+                        logging.warning("Retrying %s in %.3fs after: %r" % (function.__name__, delay, e))
+                        time.sleep(delay)
+            finally:
+                Attempt.attempts.current = None
+                policy = getattr(context.pool, "retry", None)
+                if policy is not None:
+                    policy.deposit()
+        return do
+    return decorator
@@ -15,6 +15,9 @@
 # limitations under the License.
 #
 import copy
+import uuid
+import decimal
+import datetime
 from threading import Lock
 
 """
@@ -27,8 +30,29 @@ reduces the payload of thrift requests to cassandra.
 class DiffError(Exception):
     """Represents any exception that gets thrown during diffing"""
     pass
-    
 
+IMMUTABLE = (basestring, int, long, float, bool, complex, tuple, type(None), datetime.date, datetime.time,
+    datetime.timedelta, decimal.Decimal, uuid.UUID) # Values that are replaced, never changed in place.
+
+"""
+immutable:
+Registers classes whose values are replaced instead of changed in place,
+Differs keep references to them instead of copying them.
+"""
+def immutable(*types):
+    '''Tells Differs that values of @types are never changed in place'''
+    global IMMUTABLE
+    IMMUTABLE = IMMUTABLE + tuple(types)
+
+
+"""
+Differ:
+Knows which attributes of a Model changed since its last commit; Models
+tell it which names were set or deleted, and the committed state keeps
+references to the committed values instead of copies. Typed collections
+count their changes in place and keep their old contents themselves, only
+other mutable values (plain lists, dicts and objects) are copied on commit.
+"""
 class Differ(object):
     """A class that knows how to calculate changes in an object"""
     def __init__(self, instance, exclude):
@@ -36,13 +60,17 @@ class Differ(object):
         from homer.core.models import Model
         assert isinstance(instance, Model), "Differs only work on Models"
         self.excluded = exclude
-        self.replica = copy.deepcopy(instance.__store__)
         self.model = instance.__store__
         self.instance = instance
+        self.commit()
     
     def forbidden(self, name):
         '''Excludes names in provided in self.excluded'''
         return name in self.excluded
+
+    def touch(self, name):
+        '''Records that the attribute @name was set or deleted'''
+        self.dirty.add(name)
               
     def added(self):
         '''Yields the names of the attributes that were recently added to this model'''
@@ -64,15 +92,42 @@ class Differ(object):
     def modified(self):
         '''Return all the attributes that were modified in any way in this model'''
         dict = self.replica
-        for name in dict:
-            if name in self.model:
-                if dict[name] != self.model[name]:
+        for name in self.dirty.union(self.revisions, self.copies):
+            if name in dict and name in self.model:
+                if self.changed(name, dict[name], self.model[name]):
                     if not self.forbidden(name):
                         yield name
+
+    def changed(self, name, old, value):
+        '''Is @value different from @old, the committed value of @name?'''
+        if name in self.copies:
+            return self.copies[name] != value
+        if value is old:
+            return name in self.revisions and value.revision() != self.revisions[name]
+        return old != value
         
-    def commit(self):
-        '''Make the current state the default state for this Differ'''
-        self.replica = copy.deepcopy(self.instance.__store__)
+    def snapshot(self):
+        '''Returns the current state, that commit() can make the default state after it was written'''
+        replica, revisions, copies = dict(self.model), {}, {}
+        for name, value in replica.iteritems():
+            if isinstance(value, IMMUTABLE):
+                continue
+            if getattr(type(value), "revision", None) is not None: # Never hasattr(), it reads Lazies.
+                value.checkpoint()
+                revisions[name] = value.revision()
+            else:
+                copies[name] = copy.deepcopy(value)
+        return replica, revisions, copies
+
+    def commit(self, snapshot=None):
+        '''Make the current state, or an earlier @snapshot of it, the default state for this Differ'''
+        if snapshot is None:
+            self.replica, self.revisions, self.copies = self.snapshot()
+            self.dirty = set()
+            return
+        # Attributes that were set after the snapshot are still dirty.
+        self.replica, self.revisions, self.copies = snapshot
+        self.dirty = set(name for name, value in self.model.iteritems() if self.replica.get(name, self) is not value)
    
     def revert(self):
         '''Reverts @self.model to the previous commit state'''
@@ -82,13 +137,13 @@ class Differ(object):
         dispose = [v for v in dirty if v not in clean]
         # Revert all known attributes
         for name in clean:
-            self.instance[name] = clean[name]
+            value = clean[name]
+            if name in self.copies:
+                value = copy.deepcopy(self.copies[name])
+            elif name in self.revisions:
+                value.restore()
+            self.instance[name] = value
         # Delete all new attributes
         for name in dispose: 
-            delattr(self.model, name)
+            del self.instance[name]
         self.commit()
-   
-    
-    
-    
-    
@@ -32,11 +32,11 @@ from functools import update_wrapper as update
 from contextlib import contextmanager as context
 
 from .builtins import object, fields
-from .differ import Differ, DiffError
+from .differ import Differ, DiffError, immutable
 
 READWRITE, READONLY = 1, 2
 __all__ = [ 
-            "Model", "key", "Key", "Reference", "KeyHolder", "Property", "Type",
+            "Model", "key", "Key", "Row", "Reference", "Lazy", "KeyHolder", "Property", "Type",
             "UnIndexable", "UnIndexedType", "READONLY", "READWRITE",
 ]
 
@@ -90,7 +90,7 @@ maps names to classes which is useful during deserialization.
 """
 class Schema(object):
     """Maps classes to attributes which will store their keys"""
-    schema, keys, initialized = {}, {}, set()
+    schema, keys, codecs, initialized = {}, {}, {}, set()
     
     @classmethod
     def Initialize(cls, instance):
@@ -116,6 +116,7 @@ class Schema(object):
         if kind not in cls.schema[namespace]:
             cls.schema[namespace][kind] = model
             cls.keys[id(model)] = (namespace, kind, key, )
+            cls.codecs[id(model)] = Codec(model, key)
         else:
             raise NamespaceCollisionError("Model: %s already \
                 exists in the Namespace: %s" % (model, namespace))
@@ -125,6 +126,7 @@ class Schema(object):
         '''Clears the internal state of the Schema object'''
         cls.schema.clear()
         cls.keys.clear()
+        cls.codecs.clear()
               
     @classmethod
     def Get(cls, model):
@@ -135,6 +137,15 @@ class Schema(object):
         except KeyError:
             raise BadModelError("Class: %s is not a valid Model; ",(model))
     
+    @classmethod
+    def CodecFor(cls, model):
+        """Returns the Codec that was compiled for this Model"""
+        try:
+            model = model if isinstance(model, type) else model.__class__
+            return cls.codecs[id(model)]
+        except KeyError:
+            raise BadModelError("Class: %s is not a valid Model; ",(model))
+
     @classmethod
     def ClassForModel(cls, namespace, name):
         """Returns the class object for the Model with @name"""
@@ -143,22 +154,103 @@ class Schema(object):
         except KeyError:
             raise BadModelError("There is no Model with name: %s" % name)
 
+"""
+Codec:
+How the columns of a Model are converted, compiled once when the Model
+is registered with @key; It holds the convert and deconvert functions
+of every Property by column name, and the converters of the dynamic
+columns of the Model, so rows are read and written without searching
+the class hierarchy or creating converters for every column. Models
+whose 'default' is a python property get their dynamic converters from
+their first instance.
+"""
+class Codec(object):
+    """The compiled column conversions of a Model"""
+    __slots__ = ("key", "properties", "encoders", "decoders", "name", "value",)
+
+    def __init__(self, model, key):
+        """Compiles the conversions of @model, whose key is in the attribute @key"""
+        if not hasattr(model, "default"):
+            model.default = Default()
+        self.key = key
+        self.properties = properties(model)
+        self.encoders = dict((name, prop.convert) for name, prop in self.properties.items())
+        self.decoders = dict((name, prop.deconvert) for name, prop in self.properties.items())
+        self.name = self.value = None # The converters of the names and values of dynamic columns
+        if isinstance(model.default, tuple):
+            self.converters(model)
+
+    def converters(self, model):
+        """Returns the converters of the names and values of the dynamic columns of @model"""
+        if self.name is None:
+            names, values = model.default if isinstance(model.default, tuple) else model().default
+            self.value = values() if isinstance(values, type) else values
+            self.name = names() if isinstance(names, type) else names
+        return self.name, self.value
+
+    def encode(self, model, name, value):
+        """Returns the column name and value of the property or dynamic column @name of @model"""
+        encoder = self.encoders.get(name, None)
+        if encoder is not None:
+            return name, encoder(value)
+        names, values = self.converters(model)
+        return names.convert(name), values.convert(value)
+
+    def decode(self, model, name, value):
+        """Sets the property or dynamic column of @model that is stored in the column @name"""
+        decoder = self.decoders.get(name, None)
+        if decoder is not None:
+            setattr(model, name, decoder(value))
+            return
+        names, values = self.converters(model)
+        name, value = names.deconvert(name), values.deconvert(value)
+        if name in self.decoders:
+            setattr(model, name, value)
+        else:
+            name = names(name)
+            model.__store__[name] = values(value)
+            model.differ.touch(name)
+
+    def row(self, model, key, columns):
+        """Returns a Row of the Model class @model with @key from its [(name, value)] @columns"""
+        found, decoders = {self.key: key.id}, self.decoders
+        for name, value in columns:
+            decoder = decoders.get(name, None)
+            if decoder is not None: # Coerced like setting the Property would.
+                found[name] = self.properties[name].validate(decoder(value))
+            else:
+                names, values = self.converters(model)
+                found[names(names.deconvert(name))] = values(values.deconvert(value))
+        return Row(key, found)
+
 """
 Key:
 A GUID for Model objects. A Key contains all the information 
 required to retreive a Model from any Backend
 "key: {namespace}, {kind}, {key}"
+
+Keys are immutable values, their hash is computed once so they are cheap
+dictionary keys; Only @saved, which says if the Model was written to or
+read from the datastore, can change.
 """
 class Key(object):
     """A GUID for Models"""
-    def __init__(self, namespace, kind = None, id = None):
+    __slots__ = ("__namespace", "__kind", "__id", "__columns", "__hash", "saved",)
+
+    def __init__(self, namespace, kind = None, id = None, columns = ()):
         """Creates a key from keywords or from a str representation"""
-        self.namespace = namespace
-        self.kind = kind
-        self.id = id
+        self.__namespace = namespace
+        self.__kind = kind
+        self.__id = id
+        self.__columns = tuple(columns)
+        self.__hash = hash((namespace, kind, id))
         self.saved = False
-        self.columns = []
-     
+
+    namespace = property(lambda self: self.__namespace, doc = "The namespace of the Model")
+    kind = property(lambda self: self.__kind, doc = "The name of the class of the Model")
+    id = property(lambda self: self.__id, doc = "The row key of the Model")
+    columns = property(lambda self: self.__columns, doc = "The columns that are read, all properties if empty")
+
     def complete(self):
         """Checks if this key has a namespace, kind and key"""
         if bool(self.namespace) and bool(self.kind) and bool(self.id):
@@ -168,7 +260,15 @@ class Key(object):
     
     def __hash__(self):
         '''A Key object is hashable'''
-        return hash(repr(self))
+        return self.__hash
+
+    def __reduce__(self):
+        '''Keys are pickled and copied by their arguments, and keep @saved'''
+        return (Key, (self.__namespace, self.__kind, self.__id, self.__columns), {"saved": self.saved})
+
+    def __setstate__(self, state):
+        '''Restores @saved on a Key that was pickled or copied'''
+        self.saved = state.get("saved", False)
 
     def __unicode__(self):
         """Unicode representation of a key"""
@@ -177,13 +277,77 @@ class Key(object):
     
     def __eq__(self, other):
         '''Compare two keys for equality'''
-        return self.namespace == other.namespace and self.kind\
-            == other.kind and self.id == other.id
+        if not isinstance(other, Key):
+            return False
+        return self is other or (self.__hash == other.__hash and self.__id == other.__id and
+            self.__kind == other.__kind and self.__namespace == other.__namespace)
+
+    def __ne__(self, other):
+        '''Compare two keys for inequality'''
+        return not self.__eq__(other)
     
     def __repr__(self):
         format = "Key('{self.namespace}', '{self.kind}', '{self.id}')"
         return format.format(self = self)
 
+immutable(Key)
+
+"""
+Row:
+A read-only view of a stored row, bulk reads can return Rows instead of
+Models; Rows are decoded by the Codec of their Model, but they don't
+create Models or Differs, so they can't be changed or saved.
+
+for row in Book.readMany(*keys, rows = True):
+    print row.key, row.title, row["author"]
+"""
+class Row(object):
+    """The decoded columns of a stored Model"""
+    __slots__ = ("key", "columns",)
+
+    def __init__(self, key, columns):
+        """Creates a Row of the Model with @key, @columns is a {name: value}"""
+        object.__setattr__(self, "key", key)
+        object.__setattr__(self, "columns", columns)
+
+    def __getattr__(self, name):
+        """Returns the value of the column @name"""
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise AttributeError("%s has no column: %s" % (self.key, name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Rows are read-only, read a Model to change it")
+
+    def __getitem__(self, name):
+        """Returns the value of the column @name"""
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def get(self, name, default = None):
+        """Returns the value of the column @name, or @default"""
+        return self.columns.get(name, default)
+
+    def keys(self):
+        """Returns the names of the columns of this Row"""
+        return self.columns.keys()
+
+    def items(self):
+        """Returns the (name, value) of every column of this Row"""
+        return self.columns.items()
+
+    def __repr__(self):
+        return "Row(%r, %r)" % (self.key, self.columns)
+
 """
 Converters and Descriptors:
 A converter is a single class that contains methods for coercion, validation
@@ -254,6 +418,8 @@ class Property(Converter):
             instance.__dict__[self.name] = value
             if hasattr(instance, "__store__"):
                 instance.__store__[self.name] = value
+                if "differ" in instance.__dict__:
+                    instance.differ.touch(self.name)
             self.deleted = False
         else:
             raise AttributeError("Cannot find %s in  %s " % (self,instance))
@@ -290,6 +456,8 @@ class Property(Converter):
                 del instance.__dict__[self.name]
                 if hasattr(instance, "__store__"):
                     del instance.__store__[self.name]
+                    if "differ" in instance.__dict__:
+                        instance.differ.touch(self.name)
                 self.deleted = True
             except (AttributeError,KeyError) as error: raise error
         else:
@@ -299,26 +467,15 @@ class Property(Converter):
     @staticmethod
     def search(instance, owner, descriptor):
         """Returns the name of this descriptor by searching its class hierachy"""
-        '''Search class dictionary first'''
-        if instance is not None:
-            for name, value in instance.__class__.__dict__.items():
-                if value is descriptor:
-                    return name
-            '''Then search all the ancestors dictionary'''        
-            for cls in type(instance).__bases__:
-                for name, value in cls.__dict__.items():
-                    if value is descriptor:
-                        return name
-        elif owner is not None:
-            for name, value in owner.__dict__.items():
+        # Models name their Properties when they are created, this is for other classes.
+        cls = instance.__class__ if instance is not None else owner
+        if cls is None:
+            return None
+        for root in cls.__mro__:
+            for name, value in root.__dict__.items():
                 if value is descriptor:
                     return name
-            '''Then search all the ancestors dictionary'''        
-            for cls in owner.__bases__:
-                for name, value in cls.__dict__.items():
-                    if value is descriptor:
-                        return name
-        return None         
+        return None
         
     def empty(self, value):
         """What does empty mean to this descriptor?"""
@@ -462,7 +619,8 @@ class UnIndexedType(UnIndexable, Type):
     '''A Type that cannot be indexed'''
     pass
 
-from homer.backend import Lisa, CqlQuery, FetchMode
+from homer.backend import Lisa, CqlQuery, RangeQuery, FetchMode
+from homer.backend.db import PAGESIZE, SPLITSIZE
 
 """
 Reference:
@@ -488,11 +646,10 @@ class Reference(Property):
             return repr(None)
         
     def deconvert(self, value):
-        '''Pulls the referenced model from the datastore, and sets it'''
+        '''Returns a Lazy that reads the referenced model when it is first used'''
         key = eval(value) #Change the @value back to a key.
         if key:
-            found = Lisa.read(key, FetchMode.All)
-            return found
+            return Lazy(self.cls, key)
         else: return None
          
     def validate(self, value):
@@ -506,6 +663,118 @@ class Reference(Property):
         assert key.complete(), "Your %s's key must be complete" % value
         return value
 
+"""
+Lazy:
+A stand in for the Model a Reference points to; A Lazy knows the Key of
+that Model and reads it the first time one of its attributes is used.
+Lazies pass for the Models they stand in for, they are instances of the
+Model's class and are equal to Models with the same Key. Reading a Lazy
+whose Model doesn't exist raises an AttributeError.
+
+book = Book.read("Pride")
+book.author.key()   # No reads
+book.author.name    # Reads the Person
+"""
+class Lazy(object):
+    '''A proxy that reads the Model it refers to on first use'''
+    __slots__ = ("__cls", "__key", "__model", "__resolved")
+
+    def __init__(self, cls, key):
+        '''Creates a Lazy for the @cls instance that @key refers to'''
+        object.__setattr__(self, "_Lazy__cls", cls)
+        object.__setattr__(self, "_Lazy__key", key)
+        object.__setattr__(self, "_Lazy__model", None)
+        object.__setattr__(self, "_Lazy__resolved", False)
+
+    @property
+    def __class__(self):
+        '''Lazies are instances of the class of their Model'''
+        return self.__cls
+
+    def key(self):
+        '''Returns the Key of the referenced Model, without reading it'''
+        return self.__key
+
+    def resolved(self):
+        '''Has the referenced Model been read?'''
+        return self.__resolved
+
+    def bind(self, model):
+        '''Makes @model, that was read elsewhere, the referenced Model'''
+        object.__setattr__(self, "_Lazy__model", model)
+        object.__setattr__(self, "_Lazy__resolved", True)
+
+    def resolve(self):
+        '''Returns the referenced Model, reading it if necessary'''
+        if not self.__resolved:
+            self.bind(Lisa.read(self.__key, FetchMode.All))
+        return self.__model
+
+    @staticmethod
+    def resolveMany(lazies):
+        '''Reads the Models of many Lazies with as few round trips as possible'''
+        pending = {}
+        for lazy in lazies:
+            if type(lazy) is Lazy and not lazy.resolved():
+                key = lazy.key()
+                pending.setdefault((key.namespace, key.kind, key.id), []).append(lazy)
+        if not pending:
+            return
+        groups = pending.values()
+        keys = [group[0].key() for group in groups]
+        for group, model in zip(groups, Lisa.readMany(*keys, fetchmode = FetchMode.All)):
+            for lazy in group:
+                lazy.bind(model)
+
+    def __getattr__(self, name):
+        '''Reads attributes from the referenced Model'''
+        model = self.resolve()
+        if model is None:
+            raise AttributeError("%s refers to a Model that doesn't exist" % self)
+        return getattr(model, name)
+
+    def __setattr__(self, name, value):
+        '''Sets attributes on the referenced Model'''
+        setattr(self.resolve(), name, value)
+
+    def __getitem__(self, name):
+        return self.resolve()[name]
+
+    def __setitem__(self, name, value):
+        self.resolve()[name] = value
+
+    def __contains__(self, name):
+        return name in self.resolve()
+
+    def __eq__(self, other):
+        '''A Lazy is equal to Models and Lazies with the same Key'''
+        if not isinstance(other, Model):
+            return False
+        return self.__key == other.key()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.__key)
+
+    def __nonzero__(self):
+        '''Lazies are true without reading their Model'''
+        return True
+
+    def __copy__(self):
+        '''Lazies are only ever compared by Key, so they are shared by copies'''
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __str__(self):
+        return str(self.resolve())
+
+    def __repr__(self):
+        return "Lazy(%s, %r)" % (self.__cls.__name__, self.__key)
+
 """
 KeyHolder:
 A KeyHolder is a data descriptor that is designed for storing complete
@@ -569,6 +838,86 @@ class Basic(Type):
         '''Since we are expecting a str, we just return the value'''
         return value
 
+"""
+properties:
+Returns the {name: Property} of a Model class or instance, they are
+found on first use and then cached on the class, so
+creating Models and dict style access don't walk the class hierarchy.
+"""
+def properties(model):
+    '''Returns the cached Properties of @model'''
+    cls = model if isinstance(model, type) else model.__class__
+    found = cls.__dict__.get("__properties__", None)
+    if found is None:
+        found = fields(cls, Property)
+        type.__setattr__(cls, "__properties__", found)
+    return found
+
+"""
+converters:
+Returns the (name, value) Converters of the dynamic columns of a Model
+class or instance, from its Codec if it was registered with @key; the
+Converters of other Models are created on first use and cached on the
+class like their Properties.
+"""
+def converters(model):
+    '''Returns the cached dynamic column Converters of @model'''
+    cls = model if isinstance(model, type) else model.__class__
+    codec = Schema.codecs.get(id(cls), None)
+    if codec is not None:
+        return codec.converters(model)
+    found = cls.__dict__.get("__converters__", None)
+    if found is None:
+        names, values = model.default
+        found = (names() if isinstance(names, type) else names, values() if isinstance(values, type) else values)
+        type.__setattr__(cls, "__converters__", found)
+    return found
+
+"""
+ModelType:
+The metaclass of Models, it tells every Property its name when the class
+that holds it is created, so Properties never search for their names.
+It also throws away the cached Properties of a Model and its subclasses,
+and recompiles their Codecs, when a Property is set on or deleted from
+the class after it was created.
+"""
+class ModelType(type):
+    '''Names the Properties of Models and keeps their cache current'''
+
+    def __init__(cls, name, bases, attributes):
+        '''Names the Properties of a new Model class'''
+        super(ModelType, cls).__init__(name, bases, attributes)
+        for attribute, value in attributes.items():
+            if isinstance(value, Property):
+                value.configure(attribute, cls)
+
+    def __setattr__(cls, name, value):
+        '''Sets the attribute @name of a Model class'''
+        changed = isinstance(value, Property) or isinstance(cls.__dict__.get(name, None), Property)
+        if isinstance(value, Property):
+            value.configure(name, cls)
+        super(ModelType, cls).__setattr__(name, value)
+        if changed:
+            cls.invalidate()
+
+    def __delattr__(cls, name):
+        '''Deletes the attribute @name of a Model class'''
+        changed = isinstance(cls.__dict__.get(name, None), Property)
+        super(ModelType, cls).__delattr__(name)
+        if changed:
+            cls.invalidate()
+
+    def invalidate(cls):
+        '''Forgets the cached Properties of this class and its subclasses'''
+        classes = [cls]
+        while classes:
+            current = classes.pop()
+            type.__setattr__(current, "__properties__", None)
+            type.__setattr__(current, "__converters__", None)
+            if id(current) in Schema.codecs:
+                Schema.codecs[id(current)] = Codec(current, Schema.codecs[id(current)].key)
+            classes.extend(type.__subclasses__(current))
+
 """
 BaseModel:
 The Base class of all model related objects, It
@@ -576,6 +925,7 @@ supports the dictionary protocol.
 """
 class BaseModel(object):
     '''The objects that all Models inherit'''
+    __metaclass__ = ModelType
 
     def __new__(cls, *arguments, **keywords):
         '''Customizes all Model instances to include special attributes'''
@@ -597,6 +947,8 @@ class BaseModel(object):
 
     def __delitem__(self, name):
         raise NotImplemented("Use a subclass of BaseModel")
+
+immutable(BaseModel, Lazy) # References are replaced, Differs never copy or read the Models they refer to.
                
 """    
 Model: 
@@ -618,7 +970,7 @@ class Model(BaseModel):
         instance = BaseModel.__new__(cls, *arguments, **keywords)
         if not hasattr(cls, "default"):
             cls.default = Default()
-        [prop.configure(name, cls) for name, prop in fields(cls, Property).items()] 
+        properties(cls)
         return instance
         
     def __init__(self, **kwds ):
@@ -643,7 +995,11 @@ class Model(BaseModel):
             value = validate(key)
             self.__key = Key(namespace, kind, value)
         else:
-            self.__key.id = validate(self.__id)
+            value = validate(self.__id)
+            if value != self.__key.id: # Keys are immutable, so a new id needs a new Key.
+                saved = self.__key.saved
+                self.__key = Key(self.__key.namespace, self.__key.kind, value)
+                self.__key.saved = saved
         return self.__key
                   
     def rollback(self):
@@ -653,14 +1009,17 @@ class Model(BaseModel):
     def save(self):
         """Stores this object in the datastore and in the cache"""
         # Makes sure that all required properties are available before persistence.
-        for name, prop in fields(self, Property).items():
+        for name, prop in properties(self).items():
             if hasattr(prop, 'required') and prop.required:
                 value = getattr(self, name)
                 if prop.empty(value):
                     raise BadValueError("Property: %s is required" % name)
         
         Lisa.save(self)
-        self.differ.commit()
+
+    def saveAsync(self):
+        """Saves this object on a worker thread, returns a Future of the save"""
+        return Lisa.submit(self.save)
                
     @classmethod
     def read(cls, key, mode = FetchMode.All):
@@ -673,7 +1032,36 @@ class Model(BaseModel):
         else: 
             key = Key(namespace, kind, key)
             return Lisa.read(key, mode)
-    
+
+    @classmethod
+    def readAsync(cls, key, mode = FetchMode.All):
+        """Reads an object on a worker thread, returns a Future of it"""
+        return Lisa.submit(cls.read, key, mode)
+
+    @classmethod
+    def readMany(cls, *keys, **keywords):
+        """Retreives a lot of objects from the datastore in as few requests as possible"""
+        mode = keywords.pop("mode", FetchMode.All)
+        follow = keywords.pop("follow", [])
+        rows = keywords.pop("rows", False)
+        assert not (rows and follow), "Rows are read-only, References can't be followed from them"
+        namespace, kind, member = Schema.Get(cls)
+        found = []
+        for key in keys:
+            assert isinstance(key, (basestring, Key))
+            if isinstance(key, Key):
+                assert kind == key.kind, "Mismatched Model, reading a %s with %s" % (kind, key.kind)
+                found.append(key)
+            else:
+                found.append(Key(namespace, kind, key))
+        models = Lisa.readMany(*found, fetchmode = mode, rows = rows)
+        if follow:
+            references = properties(cls)
+            for name in follow:
+                assert isinstance(references.get(name, None), Reference), "%s is not a Reference of %s" % (name, kind)
+            Lazy.resolveMany(getattr(model, name) for model in models if model is not None for name in follow)
+        return models
+
     @classmethod
     def kind(cls):
         """The Type Name of @self in the Datastore"""
@@ -711,11 +1099,17 @@ class Model(BaseModel):
         return query
     
     @classmethod
-    def all(cls):
-        '''Returns all instances of this Model stored in the datastore'''
-        query = CqlQuery(cls, "SELECT * FROM %s" % cls.kind())
+    def all(cls, page = PAGESIZE):
+        '''Returns all instances of this Model stored in the datastore, @page rows at a time'''
+        query = RangeQuery(cls, page)
         return query
 
+    @classmethod
+    def scan(cls, workers = 4, split = SPLITSIZE, page = PAGESIZE, raw = False, rows = False):
+        '''Yields all the instances of this Model, reading ranges of the ring on @workers threads'''
+        namespace, kind, member = Schema.Get(cls)
+        return Lisa.scan(namespace, kind, workers, split, page, FetchMode.All, raw, rows)
+
     @classmethod
     def count(cls, **keywords):
         '''Counts all the instances of this Model from the datastore'''
@@ -751,15 +1145,13 @@ class Model(BaseModel):
     
     def __setitem__(self, key, value):
         '''Allows dictionary style item sets to behave properly'''
-        props = fields(self, Property)
-        if key in props:
+        if key in properties(self):
             setattr(self, key, value) 
         else:
-            # TODO: Maybe I should cache the Converter instead of creating it every time.
-            k, v = self.default
-            k = k() if isinstance(k, type) else k  #Construct the converter object if necessary
-            v = v() if isinstance(v, type) else v
-            self.__store__[k(key)] = v(value)
+            names, values = converters(self)
+            key = names(key)
+            self.__store__[key] = values(value)
+            self.differ.touch(key)
     
     def __getitem__(self, key):
         '''Allows dictionary style item access to behave properly'''
@@ -767,11 +1159,11 @@ class Model(BaseModel):
     
     def __delitem__(self, key):
         '''Allows dictionary style item deletions to work properly'''
-        props = fields(self, Property)
-        if key in props:
+        if key in properties(self):
             delattr(self, key) 
         else:
             del self.__store__[key]
+            self.differ.touch(key)
             
     def items(self):
         '''Returns a copy of key value pair of every property in the Model'''
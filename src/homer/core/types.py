@@ -19,6 +19,8 @@ import json
 import re
 import codecs
 import hashlib
+from copy import copy
+from .differ import immutable
 
 __all__ = ["phone", "blob", "TypedMap", "TypedSet", "TypedList",]
 
@@ -98,6 +100,8 @@ class blob(object):
         return "Blob: [mimetype:%s, checksum:%s, description:%s]" % \
             (self.mimetype, self.checksum, self.description)
 
+immutable(phone, blob) # Blobs are replaced, never changed in place.
+
 
 """
 Description:
@@ -113,6 +117,102 @@ from collections import MutableMapping, MutableSet, MutableSequence, Counter
 
 blank = Converter #An alias
 
+"""
+Resolver:
+Typed Collections of Models store Keys; A Resolver reads the Models that
+those Keys refer to in bulk the first time one of them is needed, with one
+multiget per chunk of Keys instead of one read per Key, and remembers them
+for the lifetime of the collection. The Models that were read are neither
+pickled nor copied with the collection. Collections that mix in a Resolver
+implement references(), which returns the Keys they hold that refer to
+Models.
+
+for book in user.books: # The first Book reads all the others
+    print book.name
+
+user.books.prefetch() # Or read them explicitly, before they are needed.
+"""
+class Resolver(object):
+    '''Resolves the Keys in a Typed Collection to Models in bulk'''
+
+    def memo(self):
+        '''Returns the Models that have been read, by Key'''
+        if "__memo__" not in self.__dict__:
+            self.__dict__["__memo__"] = {}
+        return self.__dict__["__memo__"]
+
+    def prefetch(self):
+        '''Reads every Model this collection refers to, that hasn't been read yet'''
+        memo, missing = self.memo(), {}
+        for key in self.references():
+            id = (key.namespace, key.kind, key.id)
+            if id not in memo and id not in missing:
+                missing[id] = key
+        if missing:
+            for id, found in zip(missing.keys(), store.readMany(*missing.values())):
+                memo[id] = found
+        return self
+
+    def resolve(self, key):
+        '''Returns the Model @key refers to, the first miss prefetches the other Models'''
+        memo, id = self.memo(), (key.namespace, key.kind, key.id)
+        if id not in memo:
+            self.prefetch()
+        if id not in memo:
+            memo[id] = store.read(key)
+        return memo[id]
+
+    def __getstate__(self):
+        '''Leaves out the Models that have been read'''
+        state = self.__dict__.copy()
+        state.pop("__memo__", None)
+        return state
+
+    def __setstate__(self, state):
+        '''Restores a collection that was pickled or copied'''
+        self.__dict__.update(state)
+
+"""
+Tracked:
+Typed Collections count the changes that are made to them in place, so
+the Differ of their Model doesn't have to copy and compare them; The first
+change after a checkpoint keeps a copy of the old contents, which restore()
+brings back when a Model is rolled back. Changes are counted after they
+succeed, so failed or empty changes don't make the collection dirty.
+"""
+class Tracked(object):
+    '''Counts the changes to a Typed Collection'''
+
+    def revision(self):
+        '''Returns the number of changes that were made to this collection'''
+        return self.__dict__.get("__revision__", 0)
+
+    def keep(self):
+        '''Called before a change, the first change after a checkpoint copies the old contents'''
+        if "__saved__" not in self.__dict__:
+            self.__dict__["__saved__"] = (self.revision(), copy(self.__data__))
+
+    def changed(self):
+        '''Records a change that succeeded'''
+        self.__dict__["__revision__"] = self.revision() + 1
+
+    def checkpoint(self):
+        '''Makes the current contents the ones restore() brings back'''
+        self.__dict__.pop("__saved__", None)
+
+    def restore(self):
+        '''Undoes the changes that were made since the last checkpoint'''
+        saved = self.__dict__.pop("__saved__", None)
+        if saved is not None and saved[0] != self.revision():
+            self.__data__ = saved[1]
+            self.__dict__["__revision__"] = self.revision() + 1
+
+    def __getstate__(self):
+        '''Leaves out the old contents'''
+        state = super(Tracked, self).__getstate__()
+        state.pop("__saved__", None)
+        return state
+
 """
 TypedMap:
 A mutable hash table that does type validation before
@@ -133,7 +233,7 @@ alternate configuration for construction.
 var = TypedList(String, Integer, data={"Hello", 1})
 assert var["Hello"] == 1
 """
-class TypedMap(MutableMapping):
+class TypedMap(Tracked, Resolver, MutableMapping):
     '''A map that does validation of keys and values'''
 
     def __init__(self, T=blank, V=blank, data={}):
@@ -158,30 +258,43 @@ class TypedMap(MutableMapping):
     def __setitem__(self, key, value):
         '''Validate and possibly transform key, value before storage'''
         key, value = self.T(key), self.V(value)
+        self.keep()
         self.__data__[key] = value
+        self.changed()
         
     def __getitem__(self, key):
         '''Validate and possibly transform key before retreival'''
         key = self.T(key)
         value = self.__data__[key]
         if isinstance(self.V, KeyHolder) and self.V.cls is not None:
-            return store.read(value)
+            return self.resolve(value)
         return value
 
     def __delitem__(self, key):
         '''Validate and possibly transform key before deletion'''
         key = self.T(key)
+        self.keep()
         del self.__data__[key]
+        self.changed()
 
     def __iter__(self):
         '''Returns a iterable over the data set'''
         # If we have KeyHolders with Models in them, read the Models and return them.
         for k in self.__data__:
             if isinstance(self.T, KeyHolder) and self.T.cls is not None:
-                yield store.read(k)
+                yield self.resolve(k)
             else:
                 yield k
     
+    def references(self):
+        '''Returns the Keys and the values in this map that refer to Models'''
+        found = []
+        if isinstance(self.T, KeyHolder) and self.T.cls is not None:
+            found.extend(self.__data__.iterkeys())
+        if isinstance(self.V, KeyHolder) and self.V.cls is not None:
+            found.extend(self.__data__.itervalues())
+        return found
+
     def __str__(self):
         '''String representation of an object'''
         return str(self.__data__)
@@ -216,7 +329,7 @@ alternate configuration for constructors.
 var = TypedList(String, data="Hello")
 assert var[0] == 'H'
 """
-class TypedList(MutableSequence):
+class TypedList(Tracked, Resolver, MutableSequence):
     '''A List that validates content before addition or removal'''
     def __init__(self, T=blank, data=[]):
         '''Initializes a TypedList'''
@@ -233,21 +346,31 @@ class TypedList(MutableSequence):
     def insert(self, index, value):
         '''Validate and possibly transform value before insertion'''
         value = self.T(value)
+        self.keep()
         self.__data__.insert(index, value)
+        self.changed()
 
     def __setitem__(self, index, value):
         '''Validate and possibly transform value before adding it to @self'''
         value = self.T(value)
+        self.keep()
         self.__data__[index] = value
+        self.changed()
 
     def __getitem__(self, index):
         '''Read the item stored at @index, possibly transforming it before returning it'''
         value = self.__data__[index]
         if isinstance(self.T, KeyHolder) and self.T.cls is not None:
-            return store.read(value)
+            return self.resolve(value)
         else:
             return value
 
+    def references(self):
+        '''Returns the Keys in this list that refer to Models'''
+        if isinstance(self.T, KeyHolder) and self.T.cls is not None:
+            return self.__data__
+        return []
+
     def __str__(self):
         return str(self.__data__)
 
@@ -256,7 +379,9 @@ class TypedList(MutableSequence):
         return value in self.__data__
 
     def __delitem__(self, index):
+        self.keep()
         del self.__data__[index]
+        self.changed()
 
     def __len__(self):
         return len(self.__data__)
@@ -265,7 +390,7 @@ class TypedList(MutableSequence):
         '''Returns a iterable over the data set'''
         for k in self.__data__:
             if isinstance(self.T, KeyHolder) and self.T.cls is not None:
-                yield store.read(k)
+                yield self.resolve(k)
             else:
                 yield k
 
@@ -277,7 +402,7 @@ TypedSet:
 A mutable set that does type validation before adding items
 to the set. By default it behaves like an ordinary set.
 """
-class TypedSet(MutableSet):
+class TypedSet(Tracked, Resolver, MutableSet):
     '''A Set that validates content before addition'''
     def __init__(self, T=blank, data=set()):
         assert isinstance(T, type), "T must be a class"
@@ -294,17 +419,29 @@ class TypedSet(MutableSet):
     def add(self, value):
         '''Validate and possibly transform value before appending it to @self'''
         value = self.T(value)
-        self.__data__.add(value)
+        if value not in self.__data__:
+            self.keep()
+            self.__data__.add(value)
+            self.changed()
 
     def discard(self, value):
         '''Validate and possibly transform value before appending it to @self'''
         value = self.T(value)
-        self.__data__.discard(value)
+        if value in self.__data__:
+            self.keep()
+            self.__data__.discard(value)
+            self.changed()
 
     def __contains__(self, item):
         value = self.T(item)
         return value in self.__data__
 
+    def references(self):
+        '''Returns the Keys in this set that refer to Models'''
+        if isinstance(self.T, KeyHolder) and self.T.cls is not None:
+            return self.__data__
+        return []
+
     def _from_iterable(self, iterable):
         '''Overridden to make this behave more like a Set'''
         return TypedSet(self.T, iterable)
@@ -313,7 +450,7 @@ class TypedSet(MutableSet):
         '''Returns a iterable over the data set'''
         for k in self.__data__:
             if isinstance(self.T, KeyHolder) and self.T.cls is not None:
-                yield store.read(k)
+                yield self.resolve(k)
             else:
                 yield k
 
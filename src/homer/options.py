@@ -60,6 +60,7 @@ __DEFAULT__ = {
               "timeout" : 30.0, 
               "recycle" : 8000,
               "idle" : 10, 
+              "idletime" : 300,
               "servers" : ["localhost:9160",],
               "username" : "", 
               "password" : "", 
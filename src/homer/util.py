@@ -20,9 +20,11 @@
 # limitations under the License.
 #
 import sys
+from threading import Thread
 from traceback import print_exc
-from homer.options import Settings
-from homer.backend.db import Lisa
+from homer.options import Settings, ConfigurationError
+from homer.backend.db import Lisa, poolFor, keyspaceFor
+from cql.cassandra.ttypes import NotFoundException
 import logging
 
 __all__ = ["Size", "Bootstrap"]
@@ -30,7 +32,10 @@ __all__ = ["Size", "Bootstrap"]
 """
 Bootstrap:
 An object with methods that allow you to manually create or recreate
-homer models and or rebuild their indexes.
+homer models and or rebuild their indexes; warmup() pays the costs of
+the first request to each namespace at startup.
+
+Bootstrap.warmup(namespaces=["Account"], connections=10)
 """
 class Bootstrap(object):
     '''A helper class for bootstrapping Homer Models.'''
@@ -64,6 +69,67 @@ class Bootstrap(object):
                 if Settings.debug():
                     print_exc()
     
+    @classmethod
+    def warmup(self, namespaces=None, connections=1):
+        '''Opens @connections connections to each of @namespaces in parallel, and checks and caches their schemas'''
+        namespaces = list(namespaces or Settings.namespaces().keys())
+        definitions = {}
+        def warm(namespace):
+            '''Warms up one namespace'''
+            definitions[namespace] = self.warmNamespace(namespace, connections)
+        errors = self.parallel(warm, namespaces)
+        if errors:
+            raise errors[0]
+        return definitions
+
+    @classmethod
+    def warmNamespace(self, namespace, connections):
+        '''Reads and checks the schema of @namespace, and opens @connections connections to its keyspace'''
+        from homer.core.models import Schema
+        kinds = set(Schema.schema.get(namespace, {}).keys())
+        try:
+            definition = Lisa.definition(namespace, refresh=True)
+            missing = kinds - set(family.name for family in definition.cf_defs or [])
+        except NotFoundException:
+            definition, missing = None, kinds
+        if definition is None or missing:
+            if not Settings.debug():
+                raise ConfigurationError("The keyspace of %s is missing, or these column families are: %s" % (namespace, sorted(missing)))
+            self.MakeModels(*[Schema.ClassForModel(namespace, kind) for kind in missing])
+            definition = Lisa.definition(namespace, refresh=True)
+        pool, keyspace = poolFor(namespace), keyspaceFor(namespace)
+        opened = []
+        def checkout(index):
+            '''Checks a connection out, so the other threads have to open their own'''
+            connection = pool.get()
+            opened.append(connection)
+            connection.use(keyspace)
+        errors = self.parallel(checkout, range(min(connections, pool.maxConnections)))
+        for connection in opened:
+            pool.put(connection)
+        if errors:
+            raise errors[0]
+        logging.info("Warmed up %s connections to namespace: %s" % (len(opened), namespace))
+        return definition
+
+    @staticmethod
+    def parallel(function, arguments):
+        '''Calls @function with each of @arguments on its own thread, waits for all of them and returns their errors'''
+        errors = []
+        def call(argument):
+            '''Calls @function, and records its error'''
+            try:
+                function(argument)
+            except Exception as e:
+                logging.error("Warming up %s failed: %s" % (argument, e))
+                errors.append(e)
+        threads = [Thread(target=call, args=(argument,), name="WARMUP: %s" % argument) for argument in arguments]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
     @classmethod
     def rebuildIndexes(self, *models):
         '''Tries to rebuild all the indexes on the models that have been passed in.'''
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+An in-process stand in for Cassandra that speaks the same framed binary
+thrift protocol; It keeps rows in memory and implements just enough of
+the Cassandra interface for the tests that can't rely on a real cluster.
+"""
+import time
+import socket
+import hashlib
+from threading import Thread, RLock, local
+from collections import defaultdict
+
+from thrift.server import TServer
+from thrift.transport import TSocket, TTransport
+from thrift.protocol import TBinaryProtocol
+from cql.cassandra import Cassandra
+from cql.cassandra.ttypes import *
+
+
+def token(key):
+    '''The RandomPartitioner token of @key'''
+    value = long(hashlib.md5(key).hexdigest(), 16)
+    if value >= 2 ** 127: value -= 2 ** 128
+    return abs(value)
+
+
+class FakeCassandra(Cassandra.Iface):
+    '''Keeps column families in memory, and counts the calls it receives'''
+
+    def __init__(self):
+        self.data = defaultdict(lambda: defaultdict(dict))
+        self.keyspaces = {}
+        self.calls = defaultdict(int)
+        self.local = local()
+        self.lock = RLock()
+        self.delay = 0
+        self.ring = None
+        self.errors = defaultdict(list) # Errors the next calls of a method raise, in order.
+
+    def count(self, name):
+        with self.lock:
+            self.calls[name] += 1
+            error = self.errors[name].pop(0) if self.errors[name] else None
+        if self.delay:
+            time.sleep(self.delay)
+        if error is not None:
+            raise error
+
+    def family(self, name):
+        return self.data[(getattr(self.local, "keyspace", None), name)]
+
+    def slice(self, row, predicate):
+        if predicate.column_names is not None:
+            names = [name for name in predicate.column_names if name in row]
+        else:
+            names = sorted(row)[:predicate.slice_range.count]
+        return [ColumnOrSuperColumn(column = row[name]) for name in names]
+
+    def login(self, request):
+        self.count("login")
+
+    def set_keyspace(self, keyspace):
+        self.count("set_keyspace")
+        self.local.keyspace = keyspace
+
+    def get(self, key, path, level):
+        self.count("get")
+        with self.lock:
+            row = self.family(path.column_family).get(key, {})
+            if path.column not in row:
+                raise NotFoundException()
+            return ColumnOrSuperColumn(column = row[path.column])
+
+    def get_slice(self, key, parent, predicate, level):
+        self.count("get_slice")
+        with self.lock:
+            return self.slice(self.family(parent.column_family).get(key, {}), predicate)
+
+    def multiget_slice(self, keys, parent, predicate, level):
+        self.count("multiget_slice")
+        with self.lock:
+            family = self.family(parent.column_family)
+            return dict((key, self.slice(family.get(key, {}), predicate)) for key in keys)
+
+    def get_range_slices(self, parent, predicate, range, level):
+        self.count("get_range_slices")
+        with self.lock:
+            family = self.family(parent.column_family)
+            found = []
+            for key in sorted(family, key = token):
+                if range.start_key and token(key) < token(range.start_key):
+                    continue
+                if range.start_token is not None and token(key) <= long(range.start_token):
+                    continue
+                if range.end_token is not None and long(range.end_token) != 0 and token(key) > long(range.end_token):
+                    continue
+                found.append(KeySlice(key = key, columns = self.slice(family[key], predicate)))
+                if len(found) >= range.count:
+                    break
+            return found
+
+    def insert(self, key, parent, column, level):
+        self.count("insert")
+        with self.lock:
+            self.family(parent.column_family)[key][column.name] = column
+
+    def remove(self, key, path, timestamp, level):
+        self.count("remove")
+        with self.lock:
+            family = self.family(path.column_family)
+            if path.column is None:
+                family.pop(key, None)
+            else:
+                family.get(key, {}).pop(path.column, None)
+
+    def batch_mutate(self, mutations, level):
+        self.count("batch_mutate")
+        with self.lock:
+            for key, families in mutations.items():
+                for name, changes in families.items():
+                    row = self.family(name)[key]
+                    for mutation in changes:
+                        if mutation.column_or_supercolumn:
+                            column = mutation.column_or_supercolumn.column
+                            row[column.name] = column
+                        if mutation.deletion:
+                            for name in mutation.deletion.predicate.column_names or []:
+                                row.pop(name, None)
+
+    def describe_schema_versions(self):
+        return {"1": ["127.0.0.1"]}
+
+    def describe_partitioner(self):
+        return "org.apache.cassandra.dht.RandomPartitioner"
+
+    def describe_ring(self, keyspace):
+        if self.ring is not None:
+            return self.ring
+        middle = str(2 ** 126)
+        return [TokenRange(start_token = "0", end_token = middle, endpoints = ["127.0.0.1"]),
+                TokenRange(start_token = middle, end_token = "0", endpoints = ["127.0.0.1"])]
+
+    def describe_splits(self, family, start, end, keys):
+        finish = long(end) or 2 ** 127
+        return [start, str((long(start) + finish) // 2), end]
+
+    def describe_keyspace(self, keyspace):
+        if keyspace not in self.keyspaces:
+            raise NotFoundException()
+        return self.keyspaces[keyspace]
+
+    def system_add_keyspace(self, definition):
+        self.keyspaces[definition.name] = definition
+        return "1"
+
+    def system_add_column_family(self, definition):
+        found = self.keyspaces.get(definition.keyspace)
+        if found is not None:
+            found.cf_defs = (found.cf_defs or []) + [definition]
+        return "1"
+
+    def execute_cql_query(self, query, compression):
+        self.count("execute_cql_query")
+        return CqlResult(type = CqlResultType.VOID)
+
+
+def serve(host = "127.0.0.1", port = None):
+    '''Starts a FakeCassandra on @host and @port or a free port, and returns it with its "host:port" address'''
+    if port is None:
+        probe = socket.socket()
+        probe.bind((host, 0))
+        port = probe.getsockname()[1]
+        probe.close()
+    handler = FakeCassandra()
+    server = TServer.TThreadedServer(Cassandra.Processor(handler), TSocket.TServerSocket(host = host, port = port),
+        TTransport.TFramedTransportFactory(), TBinaryProtocol.TBinaryProtocolFactory(), daemon = True)
+    thread = Thread(target = server.serve, name = "FAKE-CASSANDRA")
+    thread.daemon = True
+    thread.start()
+    for attempt in range(50): # Wait until the server accepts connections.
+        try:
+            socket.create_connection((host, port), 0.1).close()
+            break
+        except socket.error:
+            time.sleep(0.02)
+    return handler, "%s:%s" % (host, port)
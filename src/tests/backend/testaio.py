@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Tests for Futures and AsyncLisa, AsyncLisa is tested against the
+in-process FakeCassandra.
+"""
+import socket
+from unittest import TestCase
+from homer.options import Settings
+from homer.core.models import key, Model, Key, Schema
+from homer.core.commons import String
+from homer.backend import FetchMode, CqlQuery, Lisa
+from homer.backend.aio import AsyncLisa, AsyncPool, asyncPoolFor, loop
+from homer.backend.futures import Future, TimeoutError, gather
+from .fakeserver import serve
+
+
+class TestFuture(TestCase):
+    '''Behavioural contract for Futures'''
+
+    def testResult(self):
+        '''Shows that results, errors and callbacks are delivered'''
+        future, called = Future(), []
+        future.addCallback(called.append)
+        with self.assertRaises(TimeoutError):
+            future.result(0.01)
+        future.setResult(1)
+        self.assertEquals(future.result(), 1)
+        self.assertEquals(called, [future])
+        failed = Future()
+        failed.setException(ValueError("Broken"))
+        with self.assertRaises(ValueError):
+            failed.result()
+
+    def testThenAndGather(self):
+        '''Shows that Futures can be chained and combined'''
+        first, second = Future(), Future()
+        combined = gather(first.then(lambda value: value * 2), second)
+        second.setResult("b")
+        self.assertFalse(combined.done())
+        first.setResult(2)
+        self.assertEquals(combined.result(), [4, "b"])
+        broken = Future.completed(0).then(lambda value: 1 / value)
+        self.assertTrue(isinstance(broken.exception(), ZeroDivisionError))
+
+
+class TestAsyncLisa(TestCase):
+    '''Behavioural contract for AsyncLisa'''
+
+    @classmethod
+    def setUpClass(cls):
+        '''Points a namespace at a FakeCassandra'''
+        Lisa.clear()
+        cls.server, address = serve()
+        cls.configuration = Settings.__configuration__
+        options = Settings.namespaces()[Settings.default()]
+        options.update(servers = [address], size = 4, timeout = 5.0)
+        Settings.configure(dict = {"Homer": {"debug": False, "default": "Async", "namespaces": {"Async": options}}})
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Forgets the pools of the FakeCassandra, and restores the configuration'''
+        AsyncLisa.clear()
+        Lisa.clear()
+        Settings.__configuration__ = cls.configuration
+
+    def setUp(self):
+        @key("name")
+        class Book(Model):
+            name = String(required = True)
+            author = String()
+        self.Book = Book
+
+    def tearDown(self):
+        Schema.Clear()
+
+    def testManyInFlight(self):
+        '''Shows that hundreds of requests share the connections of one pool'''
+        futures = [AsyncLisa.save(self.Book(name = str(i), author = "Anne Rice")) for i in range(200)]
+        saved = gather(*futures).result(10)
+        self.assertTrue(all(book.key().saved and not list(book.differ.added()) for book in saved))
+        futures = [AsyncLisa.read(Key("Async", "Book", str(i)), FetchMode.All) for i in range(200)]
+        books = gather(*futures).result(10)
+        self.assertEquals([book.name for book in books], [str(i) for i in range(200)])
+        self.assertTrue(asyncPoolFor("Async").count <= 4)
+        self.assertTrue(self.server.calls["set_keyspace"] <= 4)
+
+    def testReadMany(self):
+        '''Shows that readMany returns Models in order, in concurrent chunks'''
+        saved = [self.Book(name = str(i)) for i in range(20)]
+        future = AsyncLisa.saveMany("Async", *saved)
+        saved[0].author = "Anne Rice" # Changed after the save, so it stays dirty.
+        future.result(5)
+        self.assertEquals([list(book.differ.added()) for book in saved], [["author"]] + [[]] * 19)
+        keys = [Key("Async", "Book", str(i)) for i in reversed(range(20))] + [Key("Async", "Book", "Missing")]
+        books = AsyncLisa.readMany(*keys, fetchmode = FetchMode.All, chunk = 6).result(5)
+        self.assertEquals([book.name for book in books[:-1]], [str(i) for i in reversed(range(20))])
+        self.assertTrue(books[-1] is None)
+
+    def testColumnsAndDeletes(self):
+        '''Shows that columns can be read, written and deleted'''
+        k = Key("Async", "Book", "Pride")
+        AsyncLisa.save(self.Book(name = "Pride", author = "Anne Rice")).result(5)
+        AsyncLisa.saveColumn(k, "author", "Jane Austen").result(5)
+        self.assertEquals(AsyncLisa.readColumn(k, "author").result(5), "Jane Austen")
+        self.assertEquals(dict(AsyncLisa.readManyColumns("Async", "Book", "Pride", "name").result(5)), {"name": "Pride"})
+        AsyncLisa.deleteColumn(k, "author").result(5)
+        self.assertTrue(AsyncLisa.readColumn(k, "author").exception(5) is not None)
+        AsyncLisa.delete(k).result(5)
+        self.assertTrue(AsyncLisa.read(k).result(5) is None)
+
+    def testQuery(self):
+        '''Shows that CqlQueries can be executed asynchronously'''
+        query = AsyncLisa.query(CqlQuery(self.Book, "SELECT * FROM Book")).result(5)
+        self.assertEquals(list(query), [])
+
+    def testUnavailable(self):
+        '''Shows that connection errors fail the Future instead of blocking'''
+        probe = socket.socket()
+        probe.bind(("127.0.0.1", 0))
+        address = "127.0.0.1:%s" % probe.getsockname()[1]
+        probe.close()
+        options = Settings.namespaces()["Async"]
+        options.update(servers = [address])
+        future = AsyncPool(options, loop()).call("Homer", "describe_partitioner")
+        self.assertTrue(isinstance(future.exception(5), socket.error))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Tests for Balancers and Rings, servers are in-process FakeCassandras
+and ports nothing listens on.
+"""
+import time
+import socket
+from unittest import TestCase
+from homer.options import Settings, ConfigurationError
+from cql.cassandra.ttypes import TokenRange
+from homer.core.models import key, Model, Key, Schema
+from homer.core.commons import String
+from homer.backend import RoundRobinPool, RoundRobin, HealthAware, Ring, Lisa, FetchMode, Session, store, balancerFor
+from .fakeserver import serve, token
+
+
+def closed():
+    '''Returns the address of a port that nothing listens on'''
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    address = "127.0.0.1:%s" % probe.getsockname()[1]
+    probe.close()
+    return address
+
+
+class TestBalancer(TestCase):
+    '''Behavioural contract for Balancers'''
+
+    def testRoundRobin(self):
+        '''Shows that RoundRobin cycles through the servers'''
+        balancer = RoundRobin(["a:1", "b:1"])
+        self.assertEquals([balancer.choose() for i in range(4)], ["a:1", "b:1", "a:1", "b:1"])
+
+    def testConfiguration(self):
+        '''Shows that the 'balancer' options of a namespace choose the Balancer'''
+        self.assertTrue(isinstance(balancerFor({"servers": ["a:1"]}), RoundRobin))
+        balancer = balancerFor({"servers": ["a:1"], "balancer": {"name": "health", "errors": 5}})
+        self.assertTrue(isinstance(balancer, HealthAware))
+        self.assertEquals(balancer.errors, 5)
+        with self.assertRaises(ConfigurationError):
+            balancerFor({"servers": ["a:1"], "balancer": {"name": "random"}})
+
+    def testLatency(self):
+        '''Shows that the faster of two servers is preferred'''
+        balancer = HealthAware(["fast:1", "slow:1"])
+        for i in range(5):
+            balancer.succeeded("fast:1", 0.001)
+            balancer.succeeded("slow:1", 0.5)
+        self.assertEquals(set(balancer.choose() for i in range(20)), set(["fast:1"]))
+        self.assertTrue(balancer.stats()["slow:1"]["latency"] > 0.4)
+
+    def testEjection(self):
+        '''Shows that failing servers are ejected, and readmitted when a probe succeeds'''
+        server, address = serve()
+        dead = closed()
+        balancer = HealthAware([dead, address], errors = 2, backoff = 0.05)
+        balancer.failed(dead)
+        self.assertFalse(balancer.stats()[dead]["ejected"])
+        balancer.succeeded(dead, 0.1)
+        balancer.failed(dead)
+        self.assertFalse(balancer.stats()[dead]["ejected"])
+        balancer.failed(dead)
+        self.assertTrue(balancer.stats()[dead]["ejected"])
+        self.assertEquals(set(balancer.choose() for i in range(20)), set([address]))
+        time.sleep(0.3)
+        self.assertTrue(balancer.stats()[dead]["ejected"])
+        self.assertTrue(balancer.servers[0].backoff > 0.1)
+        balancer.failed(address), balancer.failed(address)
+        balancer.servers[1].retry = time.time() # Probe the live server straight away.
+        time.sleep(0.3)
+        self.assertFalse(balancer.stats()[address]["ejected"])
+
+    def testFailover(self):
+        '''Shows that a pool opens its connections on servers that are up'''
+        server, address = serve()
+        options = Settings.namespaces()[Settings.default()]
+        options.update(servers = [closed(), address], balancer = {"name": "health", "errors": 1})
+        pool = RoundRobinPool(options)
+        try:
+            for i in range(4):
+                connection = pool.get()
+                self.assertEquals(connection.address, address)
+                pool.put(connection)
+        finally:
+            pool.disposeAll()
+
+
+class TestRing(TestCase):
+    '''Behavioural contract for Rings and routing'''
+
+    @classmethod
+    def setUpClass(cls):
+        '''Splits the ring between two FakeCassandras'''
+        cls.middle = 2 ** 126
+        cls.first, address = serve("127.0.0.1")
+        cls.second, other = serve("127.0.0.2", int(address.split(":")[1]))
+        cls.ranges = [TokenRange(start_token = "0", end_token = str(cls.middle), endpoints = ["127.0.0.1"]),
+                      TokenRange(start_token = str(cls.middle), end_token = "0", endpoints = ["127.0.0.2"])]
+        cls.first.ring = cls.second.ring = cls.ranges
+        cls.addresses = [address, other]
+        cls.configuration = Settings.__configuration__
+        options = Settings.namespaces()[Settings.default()]
+        options.update(servers = [address], routing = True)
+        Settings.configure(dict = {"Homer": {"debug": False, "default": "Routed", "namespaces": {"Routed": options}}})
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Restores the configuration'''
+        store.clear()
+        Settings.__configuration__ = cls.configuration
+
+    def setUp(self):
+        @key("name")
+        class Book(Model):
+            name = String(required = True)
+        self.Book = Book
+
+    def tearDown(self):
+        Schema.Clear()
+
+    def owner(self, id):
+        '''The address of the FakeCassandra that owns @id'''
+        return self.addresses[0] if 0 < token(id) <= self.middle else self.addresses[1]
+
+    def testReplicas(self):
+        '''Shows that keys map to the servers whose token range holds their token'''
+        ring = Ring(self.ranges, "org.apache.cassandra.dht.RandomPartitioner", 9160)
+        for id in ["a", "b", "c", "d", u"\u00e9"]:
+            expected = "127.0.0.1:9160" if 0 < token(id.encode("utf-8")) <= self.middle else "127.0.0.2:9160"
+            self.assertEquals(ring.replicas(id), [expected])
+        self.assertEquals(Ring(self.ranges, "org.apache.cassandra.dht.Murmur3Partitioner", 9160).replicas("a"), [])
+
+    def testRouting(self):
+        '''Shows that rows are written to and read from the servers that own them'''
+        ids = [str(i) for i in range(40)]
+        for id in ids[:10]:
+            Lisa.save(self.Book(name = id))
+        Lisa.saveMany("Routed", *[self.Book(name = id) for id in ids[10:30]])
+        with Session():
+            for id in ids[30:]:
+                self.Book(name = id).save()
+        for server, address in [(self.first, self.addresses[0]), (self.second, self.addresses[1])]:
+            stored = set(server.data[("Homer", "Book")])
+            self.assertEquals(stored, set(id for id in ids if self.owner(id) == address))
+        books = Lisa.readMany(*[Key("Routed", "Book", id) for id in ids], fetchmode = FetchMode.All)
+        self.assertEquals([book.name for book in books], ids)
+        self.assertEquals(Lisa.read(Key("Routed", "Book", "7"), FetchMode.All).name, "7")
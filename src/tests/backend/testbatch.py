@@ -58,3 +58,20 @@ class TestBatching(BaseTestCase):
         print "Count: ", count
         self.assertTrue(count == 501)
         
+    def testBulkSave(self):
+        '''Tests if bulk saves are chunked across namespaces and report failures'''
+        @key("id")
+        class Profile(Model):
+            id = String(required = True, indexed = True)
+            fullname = String(indexed = True)
+        
+        l = [Profile(id = str(i), fullname = "Iroiso Ikpokonte") for i in range(500)]
+        failures = self.db.bulkSave(l, chunkRows = 64, chunkBytes = 2048)
+        self.assertEquals(failures, [])
+        self.assertTrue(all(profile.key().saved for profile in l))
+        
+        cursor = self.connection
+        cursor.execute("USE %s" % Settings.keyspace())
+        cursor.execute("SELECT COUNT(*) FROM Profile;")
+        self.assertTrue(cursor.fetchone()[0] == 500)
+        
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Tests for WriteBuffers, the server is an in-process FakeCassandra.
+"""
+import time
+from threading import Thread
+from unittest import TestCase
+from cql.cassandra.ttypes import InvalidRequestException
+from homer.options import Settings
+from homer.core.models import key, Model, Key, Schema
+from homer.core.commons import String
+from homer.backend import Lisa, store, bufferFor
+from .fakeserver import serve
+
+
+class TestWriteBuffer(TestCase):
+    '''Shows that buffered writes are coalesced into few batch_mutates'''
+
+    @classmethod
+    def setUpClass(cls):
+        '''Configures a sync and an async buffered namespace on a FakeCassandra'''
+        cls.server, address = serve()
+        cls.configuration = Settings.__configuration__
+        options = dict(Settings.namespaces()[Settings.default()], servers = [address], size = 4)
+        Settings.configure(dict = {"Homer": {"debug": False, "default": "Sync", "namespaces": {
+            "Sync": dict(options, buffer = {"window": 0.02}),
+            "Async": dict(options, buffer = {"window": 0.5, "rows": 20, "durability": "async"})}}})
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Restores the configuration'''
+        store.clear()
+        Settings.__configuration__ = cls.configuration
+
+    def setUp(self):
+        @key("name", namespace = "Sync")
+        class Book(Model):
+            name = String(required = True)
+            title = String()
+        self.Book = Book
+        self.server.calls.clear()
+        self.server.errors.clear()
+        self.server.data.clear()
+
+    def tearDown(self):
+        Lisa.flush()
+        Schema.Clear()
+
+    def row(self, id):
+        '''Returns the {name: value} of row @id'''
+        return dict((name, column.value) for name, column in self.server.data[("Homer", "Book")][id].items())
+
+    def testCoalesce(self):
+        '''Shows that writes to the same row are merged, and the latest write to a column wins'''
+        for i in range(10):
+            Lisa.saveColumn(Key("Async", "Book", "Emma"), "title", "Emma %s" % i)
+            Lisa.saveManyColumns("Async", "Book", "Emma", ("author", "Austen %s" % i), ("year", str(1815 + i)))
+        self.assertEquals(len(bufferFor("Async")), 1)
+        self.assertEquals(self.server.calls["batch_mutate"], 0)
+        Lisa.flush("Async")
+        self.assertEquals(self.server.calls["batch_mutate"], 1)
+        self.assertEquals(self.server.calls["insert"], 0)
+        self.assertEquals(self.row("Emma"), {"title": "Emma 9", "author": "Austen 9", "year": "1824"})
+
+    def testBounds(self):
+        '''Shows that buffers are flushed when they are full, or when their window runs out'''
+        for i in range(20):
+            Lisa.saveColumn(Key("Async", "Book", str(i)), "title", str(i))
+        self.assertEquals(self.server.calls["batch_mutate"], 1)
+        self.assertEquals(len(bufferFor("Async")), 0)
+        Lisa.saveColumn(Key("Async", "Book", "late"), "title", "late")
+        self.assertEquals(self.server.calls["batch_mutate"], 1)
+        time.sleep(0.8)
+        self.assertEquals(self.server.calls["batch_mutate"], 2)
+        self.assertEquals(self.row("late"), {"title": "late"})
+
+    def testSync(self):
+        '''Shows that sync writes return after they were flushed, together with concurrent writes'''
+        book = self.Book(name = "Persuasion", title = "Persuasion")
+        book.save()
+        self.assertTrue(book.key().saved)
+        self.assertEquals(self.row("Persuasion")["title"], "Persuasion")
+        threads = [Thread(target = self.Book(name = str(i), title = str(i)).save) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(self.server.calls["batch_mutate"] < 21)
+        self.assertEquals(self.row("7")["title"], "7")
+
+    def testDiffers(self):
+        '''Shows that buffered Models are clean once their flush succeeds, except for later changes'''
+        @key("name", namespace = "Async")
+        class Book(Model):
+            name = String(required = True)
+            title = String()
+        novel = Book(name = "Emma", title = "Emma")
+        novel.save()
+        self.assertEquals(set(novel.differ.added()), set(["name", "title"]))
+        novel.title = "Emma, a novel"
+        Lisa.flush("Async")
+        self.assertTrue(novel.key().saved)
+        self.assertEquals(self.row("Emma")["title"], "Emma")
+        self.assertEquals(set(novel.differ.added()), set())
+        self.assertEquals(set(novel.differ.modified()), set(["title"]))
+
+    def testFailure(self):
+        '''Shows that sync writers get the error of the flush that wrote their write'''
+        self.server.errors["batch_mutate"].append(InvalidRequestException(why = "Rejected"))
+        with self.assertRaises(InvalidRequestException):
+            Lisa.saveColumn(Key("Sync", "Book", "Emma"), "title", "Emma")
+        self.assertEquals(bufferFor("Sync").stats()["failures"], 1)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Tests for the cache module.
+"""
+import time
+from unittest import TestCase
+from homer.options import Settings
+from homer.core.models import key, Model, Key
+from homer.core.commons import String
+from homer.backend import LRUCache, MemcacheCache, FetchMode, cacheFor
+from .testdb import BaseTestCase
+
+
+class TestLRUCache(TestCase):
+    '''Behavioural contract for the LRUCache'''
+
+    def testGetAndPut(self):
+        '''Shows that values can be read back with an equal Key'''
+        cache = LRUCache(size = 10, ttl = 60)
+        cache.put(Key("Test", "Book", "Pride"), "value")
+        self.assertEquals(cache.get(Key("Test", "Book", "Pride")), "value")
+        self.assertEquals(cache.get(Key("Test", "Book", "Persuasion")), None)
+        self.assertEquals(cache.stats()["hits"], 1)
+        self.assertEquals(cache.stats()["misses"], 1)
+
+    def testEviction(self):
+        '''Shows that the least recently used entries are evicted first'''
+        cache = LRUCache(size = 2, ttl = 60)
+        first, second, third = [Key("Test", "Book", str(i)) for i in range(3)]
+        cache.put(first, 1)
+        cache.put(second, 2)
+        cache.get(first)
+        cache.put(third, 3)
+        self.assertEquals(len(cache), 2)
+        self.assertEquals(cache.peek(second), None)
+        self.assertEquals(cache.peek(first), 1)
+        self.assertEquals(cache.stats()["evictions"], 1)
+
+    def testExpiration(self):
+        '''Shows that entries are not served after their ttl'''
+        cache = LRUCache(size = 2, ttl = 0.05)
+        cache.put(Key("Test", "Book", "Pride"), "value")
+        time.sleep(0.1)
+        self.assertEquals(cache.get(Key("Test", "Book", "Pride")), None)
+        self.assertEquals(cache.stats()["misses"], 1)
+
+    def testKeysAreImmutable(self):
+        '''Shows that Keys can't be changed after a put, so their entry never moves'''
+        cache = LRUCache()
+        k = Key("Test", "Book", "Pride")
+        cache.put(k, "value")
+        with self.assertRaises(AttributeError):
+            k.id = "Prejudice"
+        self.assertEquals(cache.get(Key("Test", "Book", "Pride")), "value")
+
+
+class Memcache(object):
+    '''A local stand in for a memcached client'''
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key, None)
+
+    def set(self, key, value, time = 0):
+        assert len(key) < 250 and " " not in key, "Invalid memcached key: %s" % key
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+        return True
+
+    def flush_all(self):
+        self.data.clear()
+
+
+class TestMemcacheCache(TestCase):
+    '''Behavioural contract for the MemcacheCache'''
+
+    def testSanity(self):
+        '''Shows that the MemcacheCache works with any memcached client'''
+        cache = MemcacheCache(Memcache())
+        k = Key("Test", "Book", "Pride and Prejudice")
+        cache.put(k, (FetchMode.All, {"name" : "Pride and Prejudice"}))
+        self.assertEquals(cache.get(k)[1]["name"], "Pride and Prejudice")
+        cache.delete(k)
+        self.assertEquals(cache.get(k), None)
+        self.assertEquals(cache.stats(), {"hits" : 1, "misses" : 1, "evictions" : 0})
+
+
+class TestCachedLisa(BaseTestCase):
+    '''Shows that Lisa reads, updates and invalidates cached rows'''
+
+    def testReadThrough(self):
+        '''Reads are served from the cache, saves update it and deletes invalidate it'''
+        @key("name")
+        class Book(Model):
+            name = String(required = True, indexed = True)
+            author = String(indexed = True)
+
+        self.db.useCache(Settings.default(), LRUCache())
+        book = Book(name = "Pride", author = "Anne Rice")
+        self.db.save(book)
+        k = Key(Settings.default(), "Book", "Pride")
+        self.assertEquals(self.db.read(k, FetchMode.All).author, "Anne Rice")
+        self.assertEquals(self.db.read(k, FetchMode.All).author, "Anne Rice")
+        self.assertEquals(cacheFor(Settings.default()).stats()["hits"], 1)
+
+        book.author = "Jane Austen"
+        self.db.save(book)
+        self.assertEquals(self.db.read(k, FetchMode.All).author, "Jane Austen")
+        self.db.delete(k)
+        self.assertEquals(self.db.read(k, FetchMode.All), None)
@@ -24,9 +24,11 @@ Description:
 Tests for the the db module.
 """
 import time
+from threading import Thread
 from homer.options import Settings
 from homer.core.models import BadValueError
-from homer.backend import RoundRobinPool, Connection, ConnectionDisposedError, Lisa, Level, CqlQuery, FetchMode
+from homer.backend import RoundRobinPool, Connection, ConnectionDisposedError, Lisa, Level, CqlQuery, FetchMode, Session
+from homer.backend.db import TimedOutException
 from unittest import TestCase, skip
 
 
@@ -54,7 +56,7 @@ class TestRoundRobinPool(TestCase):
         """Returns a Connection to the pool"""
         connection = self.pool.get()
         self.pool.put(connection)
-        assert self.pool.queue.qsize() == 1
+        assert self.pool.qsize() == 1
     
     def testDisposeAll(self):
         '''Disposes all the Connections in the Pool, typically called at System Exit'''
@@ -64,9 +66,25 @@ class TestRoundRobinPool(TestCase):
             cons.append(conn)
         for i in cons:
             self.pool.put(i)
-        print self.pool.queue.qsize()
+        print self.pool.qsize()
         self.pool.disposeAll()
-        assert self.pool.queue.qsize() == 0
+        assert self.pool.qsize() == 0
+    
+    def testWaiting(self):
+        '''Shows that threads wait in line for a Connection, and time out'''
+        self.pool.maxConnections, self.pool.timeout = 1, 0.2
+        connection = self.pool.get()
+        with self.assertRaises(TimedOutException):
+            self.pool.get()
+        found = []
+        waiter = Thread(target = lambda: found.append(self.pool.get()))
+        waiter.start()
+        time.sleep(0.05)
+        self.pool.put(connection)
+        waiter.join()
+        self.assertTrue(found[0] is connection)
+        self.assertEquals(self.pool.count, 1)
+        self.pool.put(connection)
     
     @skip("Takes to Long to Run..")
     def testEviction(self):
@@ -78,8 +96,8 @@ class TestRoundRobinPool(TestCase):
         for i in cons:
             self.pool.put(i)
         time.sleep(45)
-        print self.pool.queue.qsize()
-        assert self.pool.queue.qsize() == self.pool.maxIdle
+        print self.pool.qsize()
+        assert self.pool.qsize() == self.pool.maxIdle
 
 
 class TestConnection(TestCase):
@@ -106,12 +124,24 @@ class TestConnection(TestCase):
         self.assertTrue(cursor is not None)
         connection.dispose()
         
+    def testUse(self):
+        '''Shows that set_keyspace is only sent when the keyspace changes'''
+        connection = self.pool.get()
+        sent, send = [], connection.pipe.set_keyspace
+        connection.pipe.set_keyspace = lambda keyspace: sent.append(keyspace) or send(keyspace)
+        for keyspace in ["system", "system", "system"]:
+            connection.use(keyspace)
+        connection.cursor().execute("USE system;")
+        connection.use("system")
+        self.assertEquals(sent, ["system"])
+        self.pool.put(connection)
+        
     def testToPool(self):
         '''Return this Connection to the Pool where it came from'''
         connection = self.pool.get()
-        poolSize = self.pool.queue.qsize()
+        poolSize = self.pool.qsize()
         connection.toPool()
-        self.assertTrue(self.pool.queue.qsize() > poolSize)
+        self.assertTrue(self.pool.qsize() > poolSize)
        
     def testDispose(self):
         '''Close this connection and mark it as DISPOSED'''
@@ -268,6 +298,27 @@ class TestLisa(BaseTestCase):
         assert len(b) == len(book)
         assert b == book
         
+    def testReadMany(self):
+        '''Tests if Lisa.readMany() returns Models in the order they were requested'''
+        @key("name")
+        class Book(Model):
+            name = String(required = True, indexed = True)
+            author = String(indexed = True)
+        
+        for n in xrange(50):
+            self.db.save(Book(name=str(n), author="Anne Rice"))
+        
+        keys = [Key(Settings.default(), "Book", str(n)) for n in reversed(xrange(50))]
+        keys.insert(10, Key(Settings.default(), "Book", "Missing"))
+        found = self.db.readMany(*keys, fetchmode=FetchMode.All, chunk=7)
+        self.assertEquals(len(found), 51)
+        self.assertTrue(found[10] is None)
+        found.pop(10); keys.pop(10)
+        for k, book in zip(keys, found):
+            assert isinstance(book, Book)
+            self.assertTrue(book.key() == k)
+            self.assertTrue(book.author == "Anne Rice")
+        
     def testDelete(self):
         '''Tests if Lisa.delete() works well'''
         @key("name")
@@ -352,5 +403,81 @@ class TestReference(BaseTestCase):
 
         found = Book.query(author=person, isbn="1234").fetchone()
         self.assertTrue(found == book)
-        
-     
+
+    def testLazy(self):
+        '''Tests that References are read when they are used, or in bulk with follow'''
+        from homer.core.models import Lazy
+        from homer.core.commons import String
+        @key("name")
+        class Person(Model):
+            name = String(required = True)
+
+        @key("name")
+        class Book(Model):
+            name = String(required = True, indexed = True)
+            author = Reference(Person)
+
+        people = [Person(name = str(i)) for i in range(3)]
+        for person in people:
+            person.save()
+        for i in range(9):
+            Book(name = "Book%s" % i, author = people[i % 3]).save()
+
+        book = Book.read("Book1")
+        self.assertTrue(type(book.author) is Lazy)
+        self.assertTrue(isinstance(book.author, Person))
+        self.assertFalse(book.author.resolved())
+        self.assertTrue(book.author == people[1])
+        self.assertEquals(book.author.name, "1")
+
+        books = Book.readMany(*["Book%s" % i for i in range(9)], follow = ["author"])
+        for i, book in enumerate(books):
+            self.assertTrue(book.author.resolved())
+            self.assertEquals(book.author.name, str(i % 3))
+
+
+class TestSession(BaseTestCase):
+    '''Behavioural contract for Sessions'''
+    def testIdentityMap(self):
+        '''Tests if a Session returns the same instance for the same Key'''
+        from homer.core.commons import String
+        @key("name")
+        class Book(Model):
+            name = String(required = True, indexed = True)
+            author = String(indexed = True)
+
+        self.db.save(Book(name = "Pride", author = "Anne Rice"))
+        k = Key(Settings.default(), "Book", "Pride")
+        with Session():
+            book = self.db.read(k, FetchMode.All)
+            self.assertTrue(self.db.read(k, FetchMode.All) is book)
+            self.assertTrue(self.db.readMany(k)[0] is book)
+        self.assertFalse(self.db.read(k, FetchMode.All) is book)
+
+    def testBatchedSaves(self):
+        '''Tests if saves within a Session are written when it exits, and discarded on errors'''
+        from homer.core.commons import String
+        @key("name")
+        class Book(Model):
+            name = String(required = True, indexed = True)
+            author = String(indexed = True)
+
+        with Session():
+            for n in xrange(10):
+                Book(name = str(n), author = "Anne Rice").save()
+            self.assertTrue(self.db.read(Key(Settings.default(), "Book", "0"), FetchMode.All).author == "Anne Rice")
+        self.assertTrue(self.db.read(Key(Settings.default(), "Book", "9"), FetchMode.All).author == "Anne Rice")
+
+        lost = Book(name = "Lost", author = "Anne Rice")
+        with self.assertRaises(ValueError):
+            with Session():
+                lost.save()
+                raise ValueError("Abort")
+        self.assertTrue(self.db.read(Key(Settings.default(), "Book", "Lost"), FetchMode.All) is None)
+        lost.save() # The discarded save left the Model dirty, so it is written in full now.
+        self.assertTrue(self.db.read(Key(Settings.default(), "Book", "Lost"), FetchMode.All).author == "Anne Rice")
+
+        with Session():
+            lost.save()
+            lost.author = "Stephen King" # Changed after the save, so it stays dirty after the flush.
+        self.assertEquals(set(lost.differ.modified()), set(["author"]))
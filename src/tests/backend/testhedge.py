@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Tests for hedged reads, one of the servers is an in-process FakeCassandra
+that is slow.
+"""
+import time
+from unittest import TestCase
+from cql.cassandra.ttypes import TimedOutException
+from homer.options import Settings
+from homer.core.models import key, Model, Key, Schema
+from homer.core.commons import String
+from homer.backend import db, Lisa, FetchMode, RoundRobinPool, store
+from .fakeserver import serve
+
+
+class Connection(object):
+    '''Stands in for the Connections the requests of a pool were sent on'''
+    address = "127.0.0.1:9160"
+
+
+class TestHedging(TestCase):
+    '''Shows that slow reads are hedged on another server'''
+
+    @classmethod
+    def setUpClass(cls):
+        '''Configures a namespace with a slow and a fast FakeCassandra'''
+        cls.slow, slow = serve()
+        cls.fast, fast = serve()
+        cls.configuration = Settings.__configuration__
+        options = Settings.namespaces()[Settings.default()]
+        options.update(servers = [slow, fast], size = 4, hedge = {"delay": 0.02})
+        Settings.configure(dict = {"Homer": {"debug": False, "default": "Hedged", "namespaces": {"Hedged": options}}})
+        for server in (cls.slow, cls.fast):
+            server.data[("Homer", "Book")].update((name, {}) for name in ["Emma", "Persuasion"])
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Restores the configuration'''
+        store.clear()
+        Settings.__configuration__ = cls.configuration
+
+    def setUp(self):
+        @key("name")
+        class Book(Model):
+            name = String(required = True)
+        self.Book = Book
+        self.pool = db.poolFor("Hedged")
+        self.slow.delay = 0.5
+
+    def tearDown(self):
+        self.slow.delay = 0
+        Schema.Clear()
+
+    def testRead(self):
+        '''Shows that reads return as soon as the fast server answers'''
+        wins = self.pool.stats()["wins"]
+        for i in range(4):
+            start = time.time()
+            Lisa.read(Key("Hedged", "Book", "Emma"), FetchMode.All)
+            Lisa.readMany(Key("Hedged", "Book", "Emma"), Key("Hedged", "Book", "Persuasion"))
+            self.assertTrue(time.time() - start < 0.4)
+        stats = self.pool.stats()
+        self.assertTrue(stats["wins"] > wins)
+        self.assertTrue(stats["hedges"] >= stats["wins"])
+
+    def testFailure(self):
+        '''Shows that a hedged read only fails if every request failed'''
+        self.slow.delay = 0
+        for server in (self.slow, self.fast):
+            server.errors["get_slice"].append(TimedOutException())
+        Lisa.read(Key("Hedged", "Book", "Emma"), FetchMode.All)
+
+    def testDelay(self):
+        '''Shows that percentiles are only used after enough requests were timed'''
+        options = dict(Settings.namespaces()["Hedged"], hedge = {"delay": "p95", "minimum": 0.01})
+        pool, connection = RoundRobinPool(options), Connection()
+        try:
+            self.assertEquals(pool.hedgeAfter(), None)
+            for i in range(db.HEDGESAMPLES):
+                pool.report(connection, elapsed = 0.001 if i % 10 else 0.1)
+            self.assertEquals(pool.hedgeAfter(), 0.1)
+            for i in range(10 * db.HEDGESAMPLES):
+                pool.report(connection, elapsed = 0.001)
+            self.assertEquals(pool.hedgeAfter(), 0.01)
+        finally:
+            pool.disposeAll()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Tests for Histograms, metric Sinks and the stats of connection pools,
+pools are tested against an in-process FakeCassandra.
+"""
+import socket
+from unittest import TestCase
+from homer.options import Settings
+from homer.backend import RoundRobinPool, Histogram, Callback, Statsd, sinkFor
+from homer.backend.db import TimedOutException
+from .fakeserver import serve
+
+
+class TestHistogram(TestCase):
+    '''Behavioural contract for Histograms'''
+
+    def testPercentiles(self):
+        '''Shows that durations are counted in buckets'''
+        histogram = Histogram()
+        self.assertEquals(histogram.percentile(0.99), 0.0)
+        for i in range(98):
+            histogram.record(0.0005)
+        histogram.record(0.3)
+        histogram.record(45)
+        snapshot = histogram.snapshot()
+        self.assertEquals(snapshot["count"], 100)
+        self.assertEquals(snapshot["p50"], 0.001)
+        self.assertEquals(snapshot["p99"], 0.5)
+        self.assertEquals(histogram.percentile(1.0), 45)
+        self.assertEquals(snapshot["buckets"]["inf"], 1)
+
+
+class TestSinks(TestCase):
+    '''Behavioural contract for metric Sinks'''
+
+    def testStatsd(self):
+        '''Shows that Statsd sends measurements as UDP datagrams'''
+        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.settimeout(2)
+        sink = sinkFor({"metrics": {"statsd": "127.0.0.1:%s" % listener.getsockname()[1], "prefix": "homer.Test"}})
+        self.assertTrue(isinstance(sink, Statsd))
+        sink.timing("pool.checkout", 0.0123)
+        sink.increment("pool.created")
+        sink.gauge("pool.idle", 4)
+        received = [listener.recv(1024) for i in range(3)]
+        self.assertEquals(received, ["homer.Test.pool.checkout:12|ms", "homer.Test.pool.created:1|c", "homer.Test.pool.idle:4|g"])
+        self.assertTrue(sinkFor({}) is None)
+
+
+class TestPoolStats(TestCase):
+    '''Shows what connection pools measure'''
+
+    def setUp(self):
+        self.server, address = serve()
+        options = Settings.namespaces()[Settings.default()]
+        options.update(servers = [address], size = 2, timeout = 0.1)
+        self.pool = RoundRobinPool(options)
+        self.received = []
+        self.pool.metrics = Callback(lambda kind, name, value: self.received.append((kind, name)))
+
+    def tearDown(self):
+        self.pool.disposeAll()
+
+    def testStats(self):
+        '''Shows that checkouts, connections, waiters and timeouts are counted'''
+        first, second = self.pool.get(), self.pool.get()
+        stats = self.pool.stats()
+        self.assertEquals((stats["open"], stats["busy"], stats["idle"], stats["created"]), (2, 2, 0, 2))
+        with self.assertRaises(TimedOutException):
+            self.pool.get()
+        self.pool.put(first)
+        second.dispose()
+        stats = self.pool.stats()
+        self.assertEquals((stats["open"], stats["idle"], stats["disposed"], stats["timeouts"]), (1, 1, 1, 1))
+        self.assertEquals(stats["checkouts"], 2)
+        self.assertEquals(stats["wait"]["count"], 2)
+        self.assertEquals(stats["connect"]["count"], 2)
+        self.assertEquals(stats["servers"], {self.pool.servers[0]: 1})
+        self.pool.publish()
+        for measurement in [("timing", "pool.checkout"), ("increment", "pool.created"), ("timing", "pool.connect"),
+                ("increment", "pool.timeouts"), ("increment", "pool.disposed"), ("gauge", "pool.waiters")]:
+            self.assertTrue(measurement in self.received, measurement)
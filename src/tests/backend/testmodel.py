@@ -157,6 +157,39 @@ class TestModel(BaseTestCase):
         self.assertTrue(b.isbn == "12345")
         print ">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>"
     
+    def testReadMany(self):
+        '''Shows that reading many Models at once works'''
+        @key("name")
+        class Book(Model):
+            name = String(required = True, indexed = True)
+            author = String(indexed = True)
+        
+        for name in ["Pride", "Prejudice", "Persuasion"]:
+            Book(name=name, author="Jane Austen").save()
+        
+        found = Book.readMany("Persuasion", "Emma", "Pride")
+        self.assertTrue(found[1] is None)
+        self.assertTrue(found[0].name == "Persuasion")
+        self.assertTrue(found[2].name == "Pride")
+        self.assertTrue(found[2].author == "Jane Austen")
+    
+    def testAsync(self):
+        '''Shows that Models can be saved and read on worker threads'''
+        @key("name")
+        class Book(Model):
+            name = String(required = True, indexed = True)
+            author = String(indexed = True)
+
+        futures = [Book(name = str(i), author = "Jane Austen").saveAsync() for i in range(20)]
+        for future in futures:
+            future.result(10)
+        futures = [Book.readAsync(str(i)) for i in range(20)]
+        for i, future in enumerate(futures):
+            self.assertTrue(future.result(10).name == str(i))
+        self.assertTrue(Book.readAsync("Emma").result(10) is None)
+        future = Lisa.submit(Lisa.read, Key(Settings.default(), "Book", "1"), FetchMode.All)
+        self.assertTrue(future.result(10).author == "Jane Austen")
+    
     def testQuery(self):
         '''Shows that CQL Queries work'''
         @key("name")
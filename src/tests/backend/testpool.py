@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Tests for the maintenance of connection pools, against an in-process
+FakeCassandra.
+"""
+import gc
+import time
+from weakref import ref
+from unittest import TestCase
+from homer.options import Settings
+from homer.backend import RoundRobinPool, Lisa
+from homer.backend.db import scheduler, poolFor, SWEEP
+from .fakeserver import serve
+
+
+class TestMaintenance(TestCase):
+    '''Shows how pools close and open connections on their own'''
+
+    def setUp(self):
+        self.server, address = serve()
+        self.options = Settings.namespaces()[Settings.default()]
+        self.options.update(servers = [address], size = 5, idle = 3, idletime = 60, recycle = 3600)
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.disposeAll()
+
+    def create(self, **options):
+        '''Creates a pool with @options'''
+        self.options.update(options)
+        pool = RoundRobinPool(self.options)
+        self.pools.append(pool)
+        return pool
+
+    def testIdle(self):
+        '''Shows that connections that are unused or above the idle limit are closed'''
+        pool = self.create(warm = 1)
+        connections = [pool.get() for i in range(5)]
+        for connection in connections:
+            pool.put(connection)
+        self.assertEquals(pool.maintain(), 2)
+        self.assertEquals(pool.qsize(), 3)
+        for connection in pool.idle:
+            connection.returned -= 120
+        self.assertEquals(pool.maintain(), 2)
+        self.assertEquals((pool.count, pool.qsize()), (1, 1))
+
+    def testLifetime(self):
+        '''Shows that connections are recycled after their lifetime'''
+        pool = self.create()
+        connection = pool.get()
+        connection.created -= 7200
+        pool.put(connection)
+        self.assertFalse(connection.open)
+        self.assertEquals(pool.count, 0)
+        connection = pool.get()
+        pool.put(connection)
+        connection.created -= 7200
+        self.assertEquals(pool.maintain(), 1)
+        self.assertEquals(pool.qsize(), 0)
+
+    def testWarm(self):
+        '''Shows that pools keep warm connections open, and can open them when they are created'''
+        pool = self.create(warm = 2, prewarm = True)
+        self.assertEquals((pool.count, pool.qsize()), (2, 2))
+        pool.idle[0].dispose()
+        pool.idle.popleft()
+        pool.maintain()
+        self.assertEquals((pool.count, pool.qsize()), (2, 2))
+        self.assertTrue(pool in scheduler().pools)
+
+    def testClear(self):
+        '''Shows that Lisa.clear disposes its pools, which leave the Scheduler and stop keeping connections warm'''
+        configuration = Settings.__configuration__
+        Settings.configure(dict = {"Homer": {"debug": False, "default": "Warm",
+            "namespaces": {"Warm": dict(self.options, warm = 2, prewarm = True)}}})
+        try:
+            Lisa.clear()
+            pool = poolFor("Warm")
+            self.assertEquals(pool.qsize(), 2)
+            Lisa.clear()
+            self.assertFalse(pool in scheduler().pools)
+            self.assertEquals(pool.qsize(), 0)
+            time.sleep(SWEEP * 1.5)
+            self.assertEquals((pool.count, pool.qsize()), (0, 0))
+        finally:
+            Lisa.clear()
+            Settings.__configuration__ = configuration
+
+    def testCollected(self):
+        '''Shows that pools that are dropped are garbage collected, and no longer maintained'''
+        pool = RoundRobinPool(self.options)
+        found = ref(pool)
+        del pool
+        gc.collect()
+        self.assertTrue(found() is None)
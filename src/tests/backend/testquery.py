@@ -89,3 +89,40 @@ class TestCqlQuery(BaseTestCase):
         self.assertTrue(result == correct) 
         
    
+
+    def testAllInPages(self):
+        '''Shows that Model.all() streams every row one page at a time'''
+        @key("name")
+        class Book(Model):
+            name = String(required = True, indexed = True)
+            author = String(indexed = True)
+        
+        for i in range(95):
+            book = Book(name = i, author="Anne Rice")
+            book.save()
+        Book.delete("3")
+        
+        query = Book.all(page = 10)
+        assert isinstance(query, RangeQuery)
+        names = [book.name for book in query]
+        self.assertEquals(len(names), 94)
+        self.assertEquals(len(set(names)), 94)
+        self.assertTrue("3" not in names)
+
+    def testScan(self):
+        '''Shows that Model.scan() reads every row on many threads'''
+        @key("name")
+        class Book(Model):
+            name = String(required = True, indexed = True)
+            author = String(indexed = True)
+        
+        for i in range(300):
+            book = Book(name = i, author="Anne Rice")
+            book.save()
+        
+        names = [book.name for book in Book.scan(workers = 3, page = 25)]
+        self.assertEquals(len(names), 300)
+        self.assertEquals(len(set(names)), 300)
+        rows = dict(Book.scan(workers = 2, raw = True))
+        self.assertEquals(len(rows), 300)
+        self.assertEquals(rows["42"]["author"], "Anne Rice")
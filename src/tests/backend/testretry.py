@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Tests for RetryPolicies and retried operations, servers are in-process
+FakeCassandras that fail when they are told to.
+"""
+import socket
+from unittest import TestCase
+from cql import OperationalError
+from cql.cassandra.ttypes import TimedOutException, UnavailableException, NotFoundException
+from homer.options import Settings
+from homer.core.models import key, Model, Key, Schema
+from homer.core.commons import String
+from homer.backend import db, RetryPolicy, Lisa, CqlQuery, FetchMode, store, policyFor, READ, WRITE
+from .fakeserver import serve
+
+
+class TestRetryPolicy(TestCase):
+    '''Behavioural contract for RetryPolicies'''
+
+    def testConfiguration(self):
+        '''Shows that the 'retry' options of a namespace configure its RetryPolicy'''
+        policy = policyFor({"retry": {"read": 5, "backoff": 0.1}})
+        self.assertEquals(policy.retries[READ], 5)
+        self.assertEquals(policy.retries[WRITE], 3)
+        self.assertEquals(policy.backoff, 0.1)
+        self.assertEquals(policyFor({}).retries[READ], 3)
+
+    def testRetryable(self):
+        '''Shows that only failures are retried, and only safe ones once the request was sent'''
+        policy = RetryPolicy()
+        self.assertTrue(policy.retryable(TimedOutException(), True, True))
+        self.assertTrue(policy.retryable(socket.error(), False, False))
+        self.assertTrue(policy.retryable(UnavailableException(), False, True))
+        self.assertFalse(policy.retryable(TimedOutException(), False, True))
+        self.assertFalse(policy.retryable(NotFoundException(), True, True))
+        self.assertFalse(policy.retryable(ValueError(), True, False))
+
+    def testBackoff(self):
+        '''Shows that waits are random, grow with every attempt and stay below the limit'''
+        policy = RetryPolicy(backoff = 0.1, limit = 0.5)
+        for attempt in range(1, 6):
+            for i in range(20):
+                delay = policy.delay(attempt)
+                self.assertTrue(0 <= delay <= min(0.5, 0.1 * 2 ** attempt))
+
+    def testBudget(self):
+        '''Shows that retries stop when the budget runs out, and that requests refill it'''
+        policy = RetryPolicy(read = 10, budget = 0.5, minimum = 2)
+        error = TimedOutException()
+        allowed = [policy.allows(READ, 0, error, True, True) for i in range(4)]
+        if allowed.count(True) > 2: # The second changed, so the reserve was refilled.
+            allowed = [policy.allows(READ, 0, error, True, True) for i in range(4)]
+        self.assertEquals(allowed.count(True), 2)
+        policy.reserve = 0
+        policy.deposit(), policy.deposit()
+        self.assertTrue(policy.withdraw())
+        self.assertFalse(policy.withdraw())
+        self.assertFalse(policy.allows(READ, 10, error, True, True))
+        self.assertTrue(policy.stats()["exhausted"] > 0)
+
+
+class TestRetries(TestCase):
+    '''Shows that Lisa and CqlQuery retry failed operations on other servers'''
+
+    @classmethod
+    def setUpClass(cls):
+        '''Configures a namespace with two FakeCassandras'''
+        cls.first, first = serve()
+        cls.second, second = serve()
+        cls.addresses = [first, second]
+        cls.configuration = Settings.__configuration__
+        options = Settings.namespaces()[Settings.default()]
+        options.update(servers = [first, second], size = 4, retry = {"backoff": 0.01, "minimum": 100})
+        Settings.configure(dict = {"Homer": {"debug": False, "default": "Retried", "namespaces": {"Retried": options}}})
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Restores the configuration'''
+        store.clear()
+        Settings.__configuration__ = cls.configuration
+
+    def setUp(self):
+        @key("name")
+        class Book(Model):
+            name = String(required = True)
+            title = String()
+        self.Book = Book
+        self.pool = db.poolFor("Retried")
+        for server in (self.first, self.second):
+            server.errors.clear()
+            server.calls.clear()
+
+    def tearDown(self):
+        Schema.Clear()
+
+    def assertBalanced(self):
+        '''Asserts that every Connection the pool opened was returned or disposed'''
+        stats = self.pool.stats()
+        self.assertEquals(stats["busy"], 0)
+
+    def testTimeout(self):
+        '''Shows that a read that timed out is retried on the other server'''
+        Lisa.save(self.Book(name = "Emma", title = "Emma"))
+        for server in (self.first, self.second):
+            server.data[("Homer", "Book")]["Emma"] = dict(self.first.data[("Homer", "Book")].get("Emma") or
+                self.second.data[("Homer", "Book")]["Emma"])
+        for i in range(4):
+            self.first.errors["get_slice"].append(TimedOutException())
+            self.second.errors["get_slice"].append(TimedOutException())
+            self.assertEquals(Lisa.read(Key("Retried", "Book", "Emma"), FetchMode.All).title, "Emma")
+        self.assertEquals(self.first.calls["get_slice"] + self.second.calls["get_slice"], 12)
+        self.assertTrue(self.pool.retry.stats()["retried"] >= 8)
+        self.assertBalanced()
+
+    def testColumns(self):
+        '''Shows that reads of many columns are retried too'''
+        for server in (self.first, self.second):
+            server.data[("Homer", "Book")]["Emma"] = {}
+            server.errors["get_slice"].append(TimedOutException())
+        self.assertEquals(Lisa.readManyColumns("Retried", "Book", "Emma", "title"), [])
+        self.assertEquals(self.first.calls["get_slice"] + self.second.calls["get_slice"], 3)
+        self.assertBalanced()
+
+    def testBroken(self):
+        '''Shows that broken Connections are disposed, and the write is retried'''
+        disposed = self.pool.stats()["disposed"]
+        self.first.errors["batch_mutate"].append(RuntimeError("Crashed"))
+        self.second.errors["batch_mutate"].append(RuntimeError("Crashed"))
+        Lisa.save(self.Book(name = "Persuasion", title = "Persuasion"))
+        self.assertTrue(self.pool.stats()["disposed"] > disposed)
+        stored = [server.data[("Homer", "Book")].get("Persuasion") for server in (self.first, self.second)]
+        self.assertTrue(any(stored))
+        self.assertBalanced()
+
+    def testGiveUp(self):
+        '''Shows that an operation fails after its retries, and that other errors aren't retried'''
+        for server in (self.first, self.second):
+            server.errors["get"].extend([TimedOutException() for i in range(5)])
+        with self.assertRaises(TimedOutException):
+            Lisa.readColumn(Key("Retried", "Book", "Emma"), "title")
+        self.assertEquals(self.first.calls["get"] + self.second.calls["get"], 4)
+        for server in (self.first, self.second):
+            server.errors.clear()
+            server.calls.clear()
+        with self.assertRaises(NotFoundException):
+            Lisa.readColumn(Key("Retried", "Book", "Missing"), "title")
+        self.assertEquals(self.first.calls["get"] + self.second.calls["get"], 1)
+        self.assertBalanced()
+
+    def testQueries(self):
+        '''Shows that SELECTs are retried, and other statements aren't once they were sent'''
+        Lisa.create(self.Book)
+        for server in (self.first, self.second):
+            server.errors["execute_cql_query"].append(TimedOutException())
+        CqlQuery(self.Book, "SELECT * FROM Book;").execute()
+        self.assertEquals(self.first.calls["execute_cql_query"] + self.second.calls["execute_cql_query"], 3)
+        for server in (self.first, self.second):
+            server.errors.clear()
+            server.calls.clear()
+            server.errors["execute_cql_query"].append(TimedOutException())
+        with self.assertRaises(OperationalError):
+            CqlQuery(self.Book, "UPDATE Book SET title = 'Emma' WHERE KEY = 'Emma';").execute()
+        self.assertEquals(self.first.calls["execute_cql_query"] + self.second.calls["execute_cql_query"], 1)
+        self.assertBalanced()
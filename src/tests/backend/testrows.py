@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Tests for bulk reads of read-only Rows, the server is an in-process
+FakeCassandra.
+"""
+import cPickle as pickle
+from unittest import TestCase
+from homer.options import Settings
+from homer.core.models import key, Model, Key, Row, Schema
+from homer.core.commons import String, Integer
+from homer.backend import Lisa, store
+from .fakeserver import serve
+
+
+class TestKey(TestCase):
+    '''Shows that Keys are immutable values'''
+
+    def testValue(self):
+        '''Shows that equal Keys hash alike, and that Keys can't change'''
+        first, second = Key("Rows", "Book", "Emma"), Key("Rows", "Book", "Emma")
+        self.assertEquals(first, second)
+        self.assertFalse(first != second)
+        self.assertNotEquals(first, Key("Rows", "Book", "Persuasion"))
+        self.assertNotEquals(first, ("Rows", "Book", "Emma"))
+        self.assertEquals(len(set([first, second])), 1)
+        self.assertEquals(pickle.loads(pickle.dumps(first)), first)
+        with self.assertRaises(AttributeError):
+            first.id = "Persuasion"
+        first.saved = True
+        self.assertTrue(first.saved)
+
+
+class TestRows(TestCase):
+    '''Shows that bulk reads can return Rows instead of Models'''
+
+    @classmethod
+    def setUpClass(cls):
+        '''Configures a namespace on a FakeCassandra'''
+        cls.server, address = serve()
+        cls.configuration = Settings.__configuration__
+        options = dict(Settings.namespaces()[Settings.default()], servers = [address], size = 4)
+        Settings.configure(dict = {"Homer": {"debug": False, "default": "Rows", "namespaces": {"Rows": options}}})
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Restores the configuration'''
+        store.clear()
+        Settings.__configuration__ = cls.configuration
+
+    def setUp(self):
+        @key("name")
+        class Book(Model):
+            name = String(required = True)
+            pages = Integer()
+        self.Book = Book
+        self.server.data.clear()
+        for name, pages in [("Emma", 474), ("Persuasion", 249)]:
+            book = Book(name = name, pages = pages)
+            book["author"] = "Austen"
+            book.save()
+
+    def tearDown(self):
+        Schema.Clear()
+
+    def testReadMany(self):
+        '''Shows that readMany decodes Rows like Models, and that Rows are read-only'''
+        emma, missing = self.Book.readMany("Emma", "Missing", rows = True)
+        self.assertTrue(isinstance(emma, Row))
+        self.assertEquals(missing, None)
+        self.assertEquals(emma.key, Key("Rows", "Book", "Emma"))
+        self.assertEquals((emma.name, emma.pages, emma["author"]), ("Emma", 474, "Austen"))
+        self.assertEquals(emma.get("title", "Emma"), "Emma")
+        with self.assertRaises(AttributeError):
+            emma.pages = 500
+        with self.assertRaises(AttributeError):
+            emma.title
+
+    def testRange(self):
+        '''Shows that range reads yield Rows'''
+        rows = list(Lisa.readRange("Rows", "Book", rows = True))
+        self.assertEquals(sorted((row.name, row.pages) for row in rows), [("Emma", 474), ("Persuasion", 249)])
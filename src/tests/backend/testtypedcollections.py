@@ -154,9 +154,25 @@ class TestSet(TestCase):
         print found.books
 
 
+class TestResolver(BaseTestCase):
+    '''Unittests for bulk reads of the Models in Typed Collections'''
 
+    def testPrefetch(self):
+        '''Tests that the Models in a List are read in bulk, and aren't pickled'''
+        import cPickle as pickle
+        user = User(id="2", books=[])
+        for i in range(10):
+            b = Book(id=str(i), name=str(i))
+            b.save()
+            user.books.append(b)
+        user.save()
 
-
-
-
+        found = User.read("2")
+        found.books.prefetch()
+        self.assertEquals(len(found.books.memo()), 10)
+        self.assertTrue(found.books[3] is list(found.books)[3])
+        self.assertEquals([b.name for b in found.books], [str(i) for i in range(10)])
+        copied = pickle.loads(pickle.dumps(found.books))
+        self.assertEquals(copied.memo(), {})
+        self.assertEquals(copied, found.books)
 
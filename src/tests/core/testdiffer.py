@@ -10,8 +10,8 @@ Unittests for the Differ Module...
 """
 from unittest import TestCase
 from homer.core.differ import Differ
-from homer.core.models import Model, key
-from homer.core.commons import Integer, Float, String
+from homer.core.models import Model, key, Key, Lazy, Reference
+from homer.core.commons import Integer, Float, String, Blob, List, Map, Set
 
 
 class TestDiffer(TestCase):
@@ -54,3 +54,65 @@ class TestDiffer(TestCase):
         
             
     
+
+    def testReferences(self):
+        '''Shows that committed values are referenced, not copied, and only set names are compared'''
+        class Simple(Model):
+            name = String()
+            avatar = Blob()
+        simple = Simple(name = "Hello", avatar = "x" * 1024)
+        simple.differ.commit()
+        self.assertTrue(simple.differ.replica["avatar"] is simple.avatar)
+        self.assertEquals(simple.differ.copies, {})
+        simple.name = "Hello"
+        simple.name = "Another-name"
+        self.assertEquals(list(simple.differ.modified()), ["name"])
+
+    def testCollections(self):
+        '''Shows that in-place changes to Typed Collections are tracked, and rolled back'''
+        class Simple(Model):
+            tags = List(String)
+            scores = Map(String, Integer)
+        simple = Simple(tags = ["a", "b"], scores = {"a": 1})
+        simple.differ.commit()
+        self.assertEquals(list(simple.differ.modified()), [])
+        simple.tags.append("c")
+        simple.scores["b"] = 2
+        self.assertEquals(sorted(simple.differ.modified()), ["scores", "tags"])
+        simple.rollback()
+        self.assertEquals(list(simple.tags), ["a", "b"])
+        self.assertEquals(dict(simple.scores), {"a": 1})
+        self.assertEquals(list(simple.differ.modified()), [])
+
+    def testFailedChanges(self):
+        '''Shows that changes to Typed Collections that fail or change nothing are not counted'''
+        class Simple(Model):
+            tags = List(String)
+            scores = Map(String, Integer)
+            labels = Set(String)
+        simple = Simple(tags = ["a"], scores = {"a": 1}, labels = set(["a"]))
+        simple.differ.commit()
+        with self.assertRaises(KeyError):
+            del simple.scores["b"]
+        with self.assertRaises(IndexError):
+            del simple.tags[5]
+        simple.labels.discard("b")
+        simple.labels.add("a")
+        self.assertEquals(list(simple.differ.modified()), [])
+        simple.rollback()
+        self.assertEquals(list(simple.differ.modified()), [])
+        simple.labels.discard("a")
+        self.assertEquals(list(simple.differ.modified()), ["labels"])
+
+    def testLazies(self):
+        '''Shows that commits keep References to Lazies, without reading the Models they refer to'''
+        class Person(Model):
+            name = String()
+        class Book(Model):
+            author = Reference(Person)
+        lazy = Lazy(Person, Key("Homer", "Person", "Anne"))
+        book = Book(author = lazy)
+        book.differ.commit()
+        self.assertFalse(lazy.resolved())
+        self.assertTrue(book.differ.replica["author"] is lazy)
+        self.assertEquals(book.differ.copies, {})
@@ -8,11 +8,13 @@ Copyright 2011, June inc.
 Description:
 Unittests for the Models module...
 """
+import cPickle as pickle
+from copy import copy, deepcopy
 from unittest import TestCase,expectedFailure,skip
 from datetime import datetime, date
 from homer.core.builtins import fields
-from homer.core.models import key, Model, Property, Type, READONLY, READWRITE, Reference, Key
-from homer.core.models import BadValueError, BadKeyError, NamespaceCollisionError, Schema, UnIndexable
+from homer.core.models import key, Model, Property, Type, READONLY, READWRITE, Reference, Key, properties, converters
+from homer.core.models import BadValueError, BadKeyError, BadModelError, NamespaceCollisionError, Schema, UnIndexable
     
 class TestKeyAndModel(TestCase):
     """Keys and Model where built to work together; they should be tested together"""
@@ -33,6 +35,16 @@ class TestKeyAndModel(TestCase):
         self.assertTrue(person.name == "JohnBull")
         print "'" + str(person.key()) + "'"
         
+    def testKeyCopies(self):
+        """Shows that copied and pickled Keys are equal to the original, and remember if it was saved"""
+        original = Key("Homer", "Person", "iroiso", columns = ["name"])
+        original.saved = True
+        for found in (copy(original), deepcopy(original), pickle.loads(pickle.dumps(original, 2)), pickle.loads(pickle.dumps(original))):
+            self.assertEquals(found, original)
+            self.assertEquals(found.columns, ("name",))
+            self.assertTrue(found.saved)
+        self.assertFalse(deepcopy(Key("Homer", "Person", "emeka")).saved)
+
     def testkeyAcceptsOnlyModels(self):
         """Asserts that @key only works on subclasses of Model"""
         with self.assertRaises(TypeError):
@@ -76,6 +88,40 @@ class TestKeyAndModel(TestCase):
         for name in diction:
             self.assertEqual(getattr(person,name), diction[name])
 
+    def testCodec(self):
+        """Shows that @key compiles a Codec that converts properties and dynamic columns"""
+        @key("name")
+        class Person(Model):
+            name = Property()
+
+        codec = Schema.CodecFor(Person)
+        self.assertTrue(Schema.CodecFor(Person()) is codec)
+        self.assertEquals(codec.key, "name")
+        name, value = codec.encode(Person, "nickname", "I.I")
+        person = Person()
+        codec.decode(person, "name", codec.encode(person, "name", "iroiso")[1])
+        codec.decode(person, name, value)
+        self.assertEquals(person.name, "iroiso")
+        self.assertEquals(person["nickname"], "I.I")
+        with self.assertRaises(BadModelError):
+            Schema.CodecFor(Model)
+
+    def testPropertiesAreCached(self):
+        """Shows that the Properties of a Model are cached, until a Property is added or removed"""
+        @key("name")
+        class Person(Model):
+            name = Property()
+        class Student(Person):
+            school = Property()
+
+        self.assertTrue(properties(Student) is properties(Student(name = "iroiso")))
+        self.assertEquals(set(properties(Student)) - set(["default"]), set(["name", "school"]))
+        Person.nickname = Property()
+        self.assertTrue("nickname" in properties(Student))
+        self.assertTrue("nickname" in Schema.CodecFor(Person).properties)
+        del Person.nickname
+        self.assertFalse("nickname" in properties(Student))
+
 class TestModelDictability(TestCase):
     '''Proves that a Model behaves like a dictionary'''
     def setUp(self):
@@ -98,6 +144,18 @@ class TestModelDictability(TestCase):
         self.assertTrue("issue_number" in self.bug)
         self.assertTrue("name" in self.bug)
         
+    def testConverters(self):
+        '''Shows that the Converters of dynamic columns are created once per class, or come from the Codec'''
+        self.bug["house"] = "Blue house"
+        self.assertTrue(converters(self.bug) is converters(type(self.bug)))
+        @key("name")
+        class Person(Model):
+            name = Property()
+        Person(name = "iroiso")["nickname"] = "I.I"
+        self.assertEquals(converters(Person), Schema.CodecFor(Person).converters(Person))
+        self.assertTrue(Person.__dict__.get("__converters__", None) is None)
+        Schema.Clear()
+
     def testRemove(self):
         '''Shows that dict-like subtraction of properties work'''
         self.bug["house"] = "blue"
@@ -257,7 +315,23 @@ class TestProperty(TestCase):
             avatar = UnIndexable()
         self.assertFalse(Bug.name.indexed())
         self.assertFalse(Bug.avatar.indexed())
-        
+
+    def testNames(self):
+        """Shows that Models name their Properties when they are created, and other classes find them"""
+        class Bug(Model):
+            name = Property()
+        self.assertEquals(Bug.__dict__["name"].name, "name")
+        Bug.reporter = Property()
+        self.assertEquals(Bug.__dict__["reporter"].name, "reporter")
+        class Ancestor(object):
+            name = Property()
+        class Grandchild(type("Child", (Ancestor,), {})):
+            pass
+        bug = Grandchild()
+        bug.name = "Emeka"
+        self.assertEquals(bug.name, "Emeka")
+
+
     def testSetDeleteSetGetWorks(self):
         """Tests this sequence, Delete,Set,Get does it work; Yup I know its crap"""
         setattr(self.bug,"name","First name")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+#
+# Copyright 2011 June Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Author : Iroiso .I (iroiso@live.com)
+Project: Homer SDK
+License: Apache License 2.0
+Copyright 2011, June inc.
+
+Description:
+Tests for Bootstrap, against an in-process FakeCassandra.
+"""
+from unittest import TestCase
+from cql.cassandra.ttypes import KsDef, CfDef
+from homer.options import Settings, ConfigurationError
+from homer.core.models import key, Model, Schema
+from homer.core.commons import String
+from homer.backend import store
+from homer.backend import db
+from homer.util import Bootstrap
+from backend.fakeserver import serve
+
+
+class TestBootstrap(TestCase):
+    '''Behavioural contract for Bootstrap.warmup'''
+
+    def setUp(self):
+        '''Points a namespace at a FakeCassandra'''
+        self.server, address = serve()
+        self.configuration = Settings.__configuration__
+        options = Settings.namespaces()[Settings.default()]
+        options.update(servers = [address], size = 5)
+        Settings.configure(dict = {"Homer": {"debug": False, "default": "Warm", "namespaces": {"Warm": options}}})
+        @key("name", namespace = "Warm")
+        class Book(Model):
+            name = String(required = True)
+        self.Book = Book
+
+    def tearDown(self):
+        '''Restores the configuration'''
+        Schema.Clear()
+        store.clear()
+        Settings.__configuration__ = self.configuration
+
+    def testWarmup(self):
+        '''Shows that warmup checks the schema, and opens connections in their keyspace'''
+        self.server.keyspaces["Homer"] = KsDef(name = "Homer", cf_defs = [])
+        with self.assertRaises(ConfigurationError):
+            Bootstrap.warmup(connections = 3)
+        self.server.keyspaces["Homer"].cf_defs.append(CfDef(keyspace = "Homer", name = "Book"))
+        definitions = Bootstrap.warmup(namespaces = ["Warm"], connections = 3)
+        self.assertEquals(definitions["Warm"].name, "Homer")
+        self.assertTrue("Book" in db.__COLUMNFAMILIES__ and "Warm" in db.__KEYSPACES__)
+        pool = db.poolFor("Warm")
+        self.assertEquals((pool.count, pool.qsize()), (3, 3))
+        self.assertEquals(set(connection.keyspace for connection in pool.idle), set(["Homer"]))
+        self.assertEquals(self.server.calls["set_keyspace"], 3)